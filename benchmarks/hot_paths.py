@@ -0,0 +1,392 @@
+"""Times the hot paths of StructOpt on synthetic clusters and glasses.
+
+Usage: python benchmarks/hot_paths.py [--sizes 55 309 1000 5000 20000] [--repeat 3]
+                                      [--only PATTERN] [--max-seconds 10]
+                                      [--save] [--compare COMMIT]
+
+Every case is timed on the synthetic systems in systems.py (Au and ZrCu
+clusters and a periodic ZrCu glass) of each size, and the best of `repeat`
+runs is reported. The selections, predators and population pickling are
+timed on populations instead, where the size is the number of individuals
+(for pickling, 20 individuals of that many atoms). Once a case takes longer
+than `max-seconds` on a system, the larger sizes of that system are skipped,
+and cases whose memory grows quadratically have a size limit. Operators that
+modify their input get a fresh copy for every run, outside of the timing.
+
+With --save the results are written to benchmarks/results/<commit>.json, so
+each commit keeps its own timings, and --compare prints the ratio of the
+timings to those saved for another commit, marking the cases that got more
+than 25% slower. Only compare results from the same machine.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import pickle
+import shutil
+import random
+import inspect
+import argparse
+import platform
+import tempfile
+import subprocess
+
+import numpy as np
+import ase.io
+
+from structopt.tools.dictionaryobject import DictionaryObject
+from structopt.cluster import Cluster
+from structopt.common.crossmodule import CoordinationNumbers, NeighborList, repair_cluster
+from structopt.common.crossmodule.similarity import get_offset, get_chi2_column
+from structopt.common.crossmodule.lammps import LAMMPS
+from structopt.common.individual.fitnesses import STEM
+from structopt.common.individual.relaxations.STEM import STEM as STEMRelaxation
+from structopt.common.population import Population, selections, predators
+from structopt.common.population.crossovers.rotate import rotate as common_rotate
+from structopt.cluster.individual.generators.fcc import fcc
+from structopt.cluster.individual.mutations import Mutations
+from structopt.cluster.population.crossovers.rotate import rotate
+from structopt.io.write_data import write_data
+import gparameters
+
+from systems import CLUSTERS, GLASSES, build
+from operators import SELECTIONS, PREDATORS
+
+RESULTS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+SLOWER = 1.25
+
+ALL = sorted(CLUSTERS) + sorted(GLASSES)
+POPULATION = ['population']
+
+# name -> (systems, max_size, factory). A factory takes the system and its
+# size and returns (prepare, run): prepare() returns the arguments of run and
+# is not timed, and prepare may be None.
+CASES = {}
+
+
+def case(name, systems, max_size=None):
+    def decorator(factory):
+        CASES[name] = (systems, max_size, factory)
+        return factory
+    return decorator
+
+
+def individual(atoms):
+    """Returns `atoms` as a Cluster, which the operators expect."""
+    structure = Cluster(id=0)
+    structure.extend(atoms)
+    structure.set_cell(atoms.get_cell())
+    structure.set_pbc(atoms.get_pbc())
+    return structure
+
+
+def copies(atoms, n=1):
+    """Returns a prepare function that makes `n` fresh copies of `atoms`."""
+    return lambda: tuple(atoms.copy() for _ in range(n))
+
+
+def STEM_parameters(atoms, path):
+    """Returns STEM parameters whose target image is that of `atoms`. Each
+    system gets its own logging path, because the STEM modules cache their
+    target image there."""
+    gparameters.logging.path = path
+    target = os.path.join(path, 'target.xyz')
+    if not os.path.exists(target):
+        os.makedirs(path, exist_ok=True)
+        ase.io.write(target, atoms, parallel=False)
+    length = float(atoms.get_cell()[0, 0])
+    kwargs = {'HWHM': 0.4, 'resolution': 2.0, 'dimensions': [length, length], 'target': target}
+    # The fitness module reads the kwargs and some of the mutations read the top level
+    parameters = DictionaryObject(kwargs)
+    parameters['kwargs'] = DictionaryObject(kwargs)
+    return parameters
+
+
+@case('analysis.CoordinationNumbers', ALL)
+def coordination_numbers(atoms, path):
+    return None, lambda: CoordinationNumbers(atoms)
+
+
+@case('analysis.NeighborList', ALL)
+def neighbor_list(atoms, path):
+    return None, lambda: NeighborList(atoms)
+
+
+@case('STEM.get_image', ['Au'])
+def STEM_get_image(atoms, path):
+    module = STEM(STEM_parameters(atoms, path))
+    module.generate_target()
+    return None, lambda: module.get_image(atoms)
+
+
+@case('STEM.cross_correlate', ['Au'])
+def STEM_cross_correlate(atoms, path):
+    module = STEM(STEM_parameters(atoms, path))
+    module.generate_target()
+    shifted = atoms.copy()
+    shifted.translate([1.3, -0.7, 0])
+    image = module.get_image(shifted)
+    return None, lambda: module.cross_correlate(image)
+
+
+@case('STEM.align', ['Au'])
+def STEM_align(atoms, path):
+    module = STEMRelaxation(STEM_parameters(atoms, path))
+    module.generate_target()
+    shifted = atoms.copy()
+    shifted.translate([1.3, -0.7, 0])
+    return copies(shifted), module.align
+
+
+@case('similarity.get_offset', CLUSTERS)
+def similarity_get_offset(atoms, path):
+    shifted = atoms.copy()
+    shifted.translate([1.3, -0.7, 0.4])
+    return None, lambda: get_offset(shifted, atoms)
+
+
+@case('similarity.get_chi2_column', CLUSTERS, max_size=5000)
+def similarity_get_chi2_column(atoms, path):
+    shifted = atoms.copy()
+    shifted.translate([1.3, -0.7, 0.4])
+    return (lambda: (shifted.copy(), atoms)), get_chi2_column
+
+
+@case('generators.fcc', CLUSTERS)
+def generators_fcc(atoms, path):
+    symbols = atoms.get_chemical_symbols()
+    atomlist = [[symbol, symbols.count(symbol)] for symbol in sorted(set(symbols))]
+    return None, lambda: fcc(atomlist, cell=np.diag(atoms.get_cell()).tolist(), a=4.08)
+
+
+@case('repair_cluster', CLUSTERS)
+def repair(atoms, path):
+    # A child that lost 5% of its atoms from one side
+    symbols = atoms.get_chemical_symbols()
+    atomlist = [[symbol, symbols.count(symbol)] for symbol in sorted(set(symbols))]
+    order = np.argsort(atoms.get_positions()[:, 2])
+    child = atoms[np.sort(order[len(atoms) // 20:])]
+    return (lambda: (individual(child), atomlist)), repair_cluster
+
+
+@case('crossovers.rotate', CLUSTERS)
+def crossovers_rotate(atoms, path):
+    mother = atoms.copy()
+    mother.rattle(0.1, seed=1)
+    return None, lambda: rotate(individual(atoms), individual(mother))
+
+
+@case('crossovers.rotate (common)', ALL)
+def crossovers_common_rotate(atoms, path):
+    mother = atoms.copy()
+    mother.rattle(0.1, seed=1)
+    return None, lambda: common_rotate(individual(atoms), individual(mother))
+
+
+def mutation_case(name):
+    def factory(atoms, path):
+        mutation = getattr(Mutations, name)
+        kwargs = {}
+        if 'STEM_parameters' in inspect.signature(mutation).parameters:
+            kwargs['STEM_parameters'] = STEM_parameters(atoms, path)
+        return (lambda: (individual(atoms),)), lambda structure: mutation(structure, **kwargs)
+    return factory
+
+
+for name in sorted(dir(Mutations)):
+    if not name.startswith('_') and name not in ['select_mutation', 'mutate', 'post_processing']:
+        case('mutations.{}'.format(name), CLUSTERS)(mutation_case(name))
+
+
+@case('io.write_data', ALL)
+def io_write_data(atoms, path):
+    filename = os.path.join(path, 'data.lammps')
+    os.makedirs(path, exist_ok=True)
+    return (lambda: (filename, individual(atoms))), write_data
+
+
+@case('LAMMPS.read_trj_file', ALL)
+def lammps_read_trj_file(atoms, path):
+    os.makedirs(path, exist_ok=True)
+    filename = os.path.join(path, 'trj.lammps')
+    species = sorted(set(atoms.get_chemical_symbols()))
+    types = [species.index(symbol) + 1 for symbol in atoms.get_chemical_symbols()]
+    with open(filename, 'w') as f:
+        f.write('ITEM: TIMESTEP\n0\nITEM: NUMBER OF ATOMS\n{}\n'.format(len(atoms)))
+        f.write('ITEM: BOX BOUNDS pp pp pp\n')
+        for length in np.diag(atoms.get_cell()):
+            f.write('0.0 {}\n'.format(length))
+        f.write('ITEM: ATOMS id type x y z c_pe\n')
+        for i, (type, position) in enumerate(zip(types, atoms.get_positions())):
+            f.write('{} {} {} {} {} -3.9\n'.format(i + 1, type, *position))
+    calculator = LAMMPS({}, calcdir=path)
+
+    def run(structure):
+        calculator.atoms = structure
+        calculator.read_trj_file(filename)
+    return copies(atoms), run
+
+
+@case('population pickling', POPULATION)
+def population_pickling(n, path):
+    parameters = DictionaryObject({'structure_type': 'cluster'})
+    for operation in ['generators', 'crossovers', 'selections', 'predators', 'fingerprinters',
+                      'fitnesses', 'relaxations', 'mutations', 'pso_moves']:
+        parameters[operation] = None
+    atoms = build('Au', n)
+    individuals = []
+    for id in range(20):
+        structure = individual(atoms)
+        structure.id = id
+        individuals.append(structure)
+    population = Population(parameters, individuals=individuals)
+    return None, lambda: pickle.loads(pickle.dumps(population, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def operator_case(module, name, kwargs, predator):
+    def factory(n, path):
+        function = getattr(module, name.split()[0])
+        # Crossovers roughly double the population before the predator runs
+        size = 2 * n if predator else n
+        ids, fitnesses = np.arange(size), np.random.random_sample(size)
+        if predator:
+            return None, lambda: function(ids, fitnesses, n, **kwargs)
+        return None, lambda: function(ids, fitnesses, **kwargs)
+    return factory
+
+
+for name, kwargs in sorted(SELECTIONS.items()):
+    case('selections.{}'.format(name), POPULATION)(operator_case(selections, name, kwargs, False))
+for name, kwargs in sorted(PREDATORS.items()):
+    case('predators.{}'.format(name), POPULATION)(operator_case(predators, name, kwargs, True))
+
+
+def time_case(prepare, run, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        args = prepare() if prepare is not None else ()
+        start = time.perf_counter()
+        run(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def commit():
+    """Returns the abbreviated hash of HEAD, marked if the tree has changes."""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    try:
+        head = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=directory).decode().strip()
+        dirty = subprocess.check_output(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=directory).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return head + '-dirty' if dirty else head
+
+
+def load_results(reference):
+    """Reads the results saved for the commit `reference` (or a prefix of it)."""
+    filenames = sorted(filename for filename in os.listdir(RESULTS_DIRECTORY)
+                       if filename.startswith(reference) and filename.endswith('.json'))
+    if not filenames:
+        raise ValueError("No results saved for '{}' in {}".format(reference, RESULTS_DIRECTORY))
+    with open(os.path.join(RESULTS_DIRECTORY, filenames[0])) as f:
+        return json.load(f)
+
+
+def format_time(t):
+    if t is None:
+        return '{:>12s}'.format('-')
+    if isinstance(t, str):
+        return '{:>12s}'.format('error')
+    return '{:12.4f}'.format(t)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[55, 309, 1000, 5000, 20000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', default=None, help='only run the cases matching this regular expression')
+    parser.add_argument('--max-seconds', type=float, default=10.0)
+    parser.add_argument('--save', action='store_true', help='save the results for the current commit')
+    parser.add_argument('--compare', default=None, help='compare to the results saved for this commit')
+    args = parser.parse_args()
+
+    reference = load_results(args.compare)['results'] if args.compare is not None else None
+    directory = tempfile.mkdtemp(prefix='structopt-benchmarks-')
+    gparameters.update(DictionaryObject({'mpi': {'rank': 0, 'ncores': 1}, 'logging': {'path': directory},
+                                         'generation': 0, 'seed': args.seed}))
+
+    try:
+        results = run_cases(args, directory, reference)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    errors = {key: {n: t for n, t in times.items() if isinstance(t, str)} for key, times in results.items()}
+    for key, times in sorted(errors.items()):
+        for n, error in sorted(times.items(), key=lambda item: int(item[0])):
+            print('{} ({} atoms): {}'.format(key, n, error))
+
+    if args.save:
+        os.makedirs(RESULTS_DIRECTORY, exist_ok=True)
+        revision = commit()
+        filename = os.path.join(RESULTS_DIRECTORY, '{}.json'.format(revision))
+        with open(filename, 'w') as f:
+            json.dump({'commit': revision,
+                       'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+                       'machine': platform.node(),
+                       'processor': platform.processor(),
+                       'python': platform.python_version(),
+                       'numpy': np.__version__,
+                       'sizes': args.sizes,
+                       'repeat': args.repeat,
+                       'results': results}, f, indent=1, sort_keys=True)
+        print('Saved the results to {}'.format(filename))
+
+
+def run_cases(args, directory, reference):
+    """Times the cases selected by `args` and prints a line per case and system."""
+    print('{:50s}'.format('case') + ''.join('{:>12d}'.format(n) for n in args.sizes))
+    results = {}
+    for name in sorted(CASES):
+        if args.only is not None and not re.search(args.only, name):
+            continue
+        systems, max_size, factory = CASES[name]
+        for system in systems:
+            key = '{}[{}]'.format(name, system)
+            results[key] = {}
+            too_slow = False
+            for n in args.sizes:
+                if too_slow or (max_size is not None and n > max_size):
+                    results[key][str(n)] = None
+                    continue
+                random.seed(args.seed)
+                np.random.seed(args.seed)
+                path = os.path.join(directory, system, str(n))
+                try:
+                    subject = n if system == 'population' else build(system, n, args.seed)
+                    prepare, run = factory(subject, path)
+                    t = time_case(prepare, run, args.repeat)
+                except Exception as error:
+                    results[key][str(n)] = 'error: {}: {}'.format(type(error).__name__, error)
+                    continue
+                results[key][str(n)] = t
+                too_slow = t > args.max_seconds
+            line = '{:50s}'.format(key) + ''.join(format_time(results[key][str(n)]) for n in args.sizes)
+            if reference is not None and key in reference:
+                ratios = []
+                for n in args.sizes:
+                    new, old = results[key][str(n)], reference[key].get(str(n))
+                    if isinstance(new, float) and isinstance(old, float) and old > 0:
+                        ratios.append('{:.2f}{}'.format(new / old, '!' if new / old > SLOWER else ''))
+                    else:
+                        ratios.append('-')
+                line += '   x ' + ' '.join(ratios)
+            print(line)
+            sys.stdout.flush()
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+"""A stand-in for LAMMPS for measuring how StructOpt scales.
+
+Usage: LAMMPS_COMMAND=/path/to/benchmarks/mock_lammps.py python structopt/optimizers/genetic.py input.json
+
+It reads the LAMMPS input StructOpt writes from stdin and the data file the
+input reads, sleeps for as long as a cost model says the calculation would
+take, and writes the thermo output (to stdout and log.lammps) and the dump
+file StructOpt reads back. A relaxation moves every atom by a small random
+displacement; a single point calculation (``minimize`` with no iterations, as
+the LAMMPS fitness uses) leaves the atoms where they are. The energy is that
+of a Lennard-Jones potential, so that the optimizer has something sensible to
+select on.
+
+Everything is seeded by the structure in the data file (not the file itself,
+whose header names a temporary directory), so the same structure always gives
+the same result, on any core and in any order. The cost model is set by
+environment variables:
+
+* ``MOCK_LAMMPS_TIME_PER_ATOM``: seconds per atom for a relaxation (0.001)
+* ``MOCK_LAMMPS_TIME_OFFSET``: seconds for starting up (0.05)
+* ``MOCK_LAMMPS_SINGLE_POINT``: the cost of a single point calculation as a
+  fraction of a relaxation (0.1)
+* ``MOCK_LAMMPS_NOISE``: the relative standard deviation of the cost (0.1)
+* ``MOCK_LAMMPS_DISPLACEMENT``: the standard deviation of the displacements
+  of a relaxation, in Angstrom (0.02)
+"""
+
+import os
+import sys
+import time
+import hashlib
+
+import numpy as np
+
+END_MARK = '__end_of_ase_invoked_calculation__'
+
+# Lennard-Jones parameters, roughly those of a late transition metal
+EPSILON = 0.4
+SIGMA = 2.6
+CUTOFF = 3 * SIGMA
+
+
+def setting(name, default):
+    return float(os.environ.get('MOCK_LAMMPS_{}'.format(name), default))
+
+
+def parse_input(lines):
+    """Returns the data file, dump file, thermo args and whether the input
+    relaxes the structure."""
+    data_file = dump_file = None
+    thermo_args = []
+    relax = False
+    for line in lines:
+        fields = line.split()
+        if not fields:
+            continue
+        if fields[0] == 'read_data':
+            data_file = fields[1]
+        elif fields[:2] == ['thermo_style', 'custom']:
+            thermo_args = fields[2:]
+        elif fields[0] == 'dump':
+            dump_file = fields[5]
+        elif fields[0] == 'minimize':
+            # minimize etol ftol maxiter maxeval
+            relax = len(fields) < 5 or int(float(fields[3])) > 0
+    return data_file, dump_file, thermo_args, relax
+
+
+def read_data(filename):
+    """Reads a LAMMPS data file written by structopt.io.write_data."""
+    with open(filename) as f:
+        lines = f.readlines()
+    bounds = []
+    tilt = (0.0, 0.0, 0.0)
+    natoms = 0
+    atoms_start = None
+    for i, line in enumerate(lines):
+        fields = line.split()
+        if len(fields) >= 2 and fields[1] == 'atoms':
+            natoms = int(fields[0])
+        elif len(fields) == 4 and fields[2] in ('xlo', 'ylo', 'zlo'):
+            bounds.append((float(fields[0]), float(fields[1])))
+        elif len(fields) == 6 and fields[3:] == ['xy', 'xz', 'yz']:
+            tilt = tuple(float(x) for x in fields[:3])
+        elif fields and fields[0] == 'Atoms':
+            atoms_start = i + 1
+            break
+    rows = [line.split() for line in lines[atoms_start:] if line.strip()][:natoms]
+    ids = np.array([int(row[0]) for row in rows])
+    types = np.array([int(row[1]) for row in rows])
+    positions = np.array([[float(x) for x in row[2:5]] for row in rows])
+    return ids, types, positions, bounds, tilt
+
+
+def structure_seed(ids, types, positions, bounds, tilt):
+    """Returns a seed that depends only on the structure, not on the name of
+    the data file (which write_data puts in the header, and which is a fresh
+    temporary directory every time)."""
+    digest = hashlib.sha1()
+    for array in (ids, types, positions, bounds, tilt):
+        digest.update(np.ascontiguousarray(array, dtype=float).tobytes())
+    return int(digest.hexdigest()[:8], 16)
+
+
+def lennard_jones(positions, chunk=1000):
+    """Returns the per-atom Lennard-Jones energies of `positions`."""
+    energies = np.zeros(len(positions))
+    for start in range(0, len(positions), chunk):
+        d = np.linalg.norm(positions[start:start + chunk, None, :] - positions[None, :, :], axis=2)
+        with np.errstate(divide='ignore'):
+            s6 = np.where((d > 0) & (d < CUTOFF), (SIGMA / np.where(d > 0, d, 1.0)) ** 6, 0.0)
+        energies[start:start + chunk] = 2 * EPSILON * (s6 ** 2 - s6).sum(axis=1)
+    return energies
+
+
+def main():
+    input_lines = sys.stdin.read().splitlines()
+    data_file, dump_file, thermo_args, relax = parse_input(input_lines)
+    ids, types, positions, bounds, tilt = read_data(data_file)
+    natoms = len(ids)
+
+    random_state = np.random.RandomState(structure_seed(ids, types, positions, bounds, tilt))
+
+    cost = setting('TIME_OFFSET', 0.05) + setting('TIME_PER_ATOM', 0.001) * natoms
+    if not relax:
+        cost *= setting('SINGLE_POINT', 0.1)
+    cost *= max(0.0, 1 + setting('NOISE', 0.1) * random_state.standard_normal())
+    time.sleep(cost)
+
+    if relax:
+        positions = positions + random_state.normal(0, setting('DISPLACEMENT', 0.02), positions.shape)
+    pea = lennard_jones(positions)
+    pe = float(pea.sum())
+
+    # The thermo output StructOpt parses; everything but pe is made up
+    lo = np.array([b[0] for b in bounds])
+    hi = np.array([b[1] for b in bounds])
+    values = {'step': 0, 'temp': 0.0, 'press': 0.0, 'cpu': cost, 'ke': 0.0, 'pe': pe, 'etotal': pe,
+              'vol': float(np.prod(hi - lo)), 'lx': hi[0] - lo[0], 'ly': hi[1] - lo[1], 'lz': hi[2] - lo[2],
+              'atoms': natoms}
+    header = ' '.join(arg.capitalize() for arg in thermo_args)
+    row = ' '.join('{:.10g}'.format(values.get(arg, 0.0)) for arg in thermo_args)
+    output = ['LAMMPS (mock)', header, row, 'Loop time of {:.6f} on 1 procs for 1 steps with {} atoms'.format(cost, natoms), END_MARK]
+    with open('log.lammps', 'w') as f:
+        f.write('\n'.join(output) + '\n')
+    sys.stdout.write('\n'.join(output) + '\n')
+
+    with open(dump_file, 'w') as f:
+        f.write('ITEM: TIMESTEP\n0\n')
+        f.write('ITEM: NUMBER OF ATOMS\n{}\n'.format(natoms))
+        if any(tilt):
+            f.write('ITEM: BOX BOUNDS xy xz yz pp pp pp\n')
+            for (low, high), t in zip(bounds, tilt):
+                f.write('{} {} {}\n'.format(low, high, t))
+        else:
+            f.write('ITEM: BOX BOUNDS pp pp pp\n')
+            for low, high in bounds:
+                f.write('{} {}\n'.format(low, high))
+        f.write('ITEM: ATOMS id type x y z c_pea\n')
+        for id, type, (x, y, z), e in zip(ids, types, positions, pea):
+            f.write('{} {} {:.8f} {:.8f} {:.8f} {:.8f}\n'.format(id, type, x, y, z, e))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Times the selection and predator kernels on synthetic populations.
+
+Usage: python benchmarks/operators.py [--sizes 100 1000 10000 100000] [--repeat 3]
+
+The fitnesses are random numbers, so the timings only reflect the cost of
+choosing parents and survivors, which is what dominates screening runs with
+cheap fitness functions and large populations.
+"""
+
+import argparse
+import time
+import numpy as np
+
+from structopt.common.population import selections, predators
+
+
+SELECTIONS = {
+    'random_selection': {},
+    'best': {},
+    'rank': {},
+    'rank (unique_parents)': {'unique_parents': True},
+    'roulette': {},
+    'roulette (unique_pairs)': {'unique_pairs': True},
+    'tournament': {'tournament_size': 5},
+    'tournament (unique_parents)': {'tournament_size': 5, 'unique_parents': True},
+}
+
+PREDATORS = {
+    'best': {},
+    'rank': {},
+    'roulette': {},
+    'tournament': {'tournament_size': 5},
+    'fuss': {},
+}
+
+
+def time_call(function, repeat, *args, **kwargs):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    np.random.seed(args.seed)
+    print('{:40s}'.format('operator') + ''.join('{:>12d}'.format(n) for n in args.sizes))
+
+    populations = {}
+    for n in args.sizes:
+        # Crossovers roughly double the population before the predator runs
+        populations[n] = (np.arange(2*n), np.random.random_sample(2*n))
+
+    for name, kwargs in sorted(SELECTIONS.items()):
+        function = getattr(selections, name.split()[0])
+        times = [time_call(function, args.repeat, populations[n][0][:n], populations[n][1][:n], **kwargs)
+                 for n in args.sizes]
+        print('{:40s}'.format('selections.' + name) + ''.join('{:12.4f}'.format(t) for t in times))
+
+    for name, kwargs in sorted(PREDATORS.items()):
+        function = getattr(predators, name)
+        times = [time_call(function, args.repeat, populations[n][0], populations[n][1], n, **kwargs)
+                 for n in args.sizes]
+        print('{:40s}'.format('predators.' + name) + ''.join('{:12.4f}'.format(t) for t in times))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""Measures the strong and weak scaling of the genetic algorithm.
+
+Usage: python benchmarks/scaling.py [--cores 1 2 4 8] [--natoms 55] [--population 16]
+                                    [--generations 5] [--modes strong weak] [--pipeline staged]
+                                    [--mpiexec mpiexec] [--mpiexec-args="--oversubscribe"]
+
+Runs ``structopt/optimizers/genetic.py`` under ``mpiexec -n <cores>`` for
+each number of cores, with benchmarks/mock_lammps.py standing in for LAMMPS
+(set its cost model with the ``MOCK_LAMMPS_*`` environment variables, see
+mock_lammps.py). In strong scaling the population has ``--population``
+individuals on any number of cores; in weak scaling it has ``--population``
+individuals per core. The time of a run is the sum of the ``step`` times of
+its generations in the run store, so starting Python and MPI is not counted,
+and the time of every phase is reported next to it. The efficiency is
+``T(1) / (n T(n))`` for strong scaling and ``T(1) / T(n)`` for weak scaling,
+relative to the smallest number of cores that was run.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+from structopt.io.run_store import RunStore
+
+GENETIC = os.path.join(ROOT, 'structopt', 'optimizers', 'genetic.py')
+MOCK_LAMMPS = os.path.join(HERE, 'mock_lammps.py')
+PHASES = ['selection', 'crossover', 'mutation', 'relax', 'fitness', 'fingerprinter', 'predator']
+
+
+def parameters(natoms, population, generations, pipeline, seed):
+    """Returns the input of a run on Au clusters of `natoms` atoms."""
+    lammps = {'min_style': 'cg',
+              'minimize': '1e-8 1e-8 5000 10000',
+              'keep_files': False}
+    length = 4 * natoms ** (1.0 / 3.0) + 10
+    return {'structure_type': 'cluster',
+            'seed': seed,
+            'pipeline': pipeline,
+            'convergence': {'max_generations': generations},
+            'generators': {'sphere': {'number_of_individuals': population,
+                                      'kwargs': {'atomlist': [['Au', natoms]],
+                                                 'cell': [length, length, length]}}},
+            'relaxations': {'LAMMPS': {'order': 0, 'use_mpi4py': True, 'kwargs': lammps}},
+            'fitnesses': {'LAMMPS': {'weight': 1.0, 'use_mpi4py': True,
+                                     'kwargs': dict(lammps, minimize='1e-8 1e-8 0 0')}},
+            'crossovers': {'rotate': {'probability': 0.7}},
+            'mutations': {'move_atoms': {'probability': 0.1},
+                          'rotate_cluster': {'probability': 0.1}},
+            'selections': {'rank': {'probability': 1.0}},
+            'predators': {'best': {'probability': 1.0}},
+            'post_processing': {'XYZs': -1, 'structures': 'archive'}}
+
+
+def run(cores, input, args):
+    """Runs the genetic algorithm with `input` on `cores` cores and returns
+    the wall time and the time of every phase, summed over the generations."""
+    directory = tempfile.mkdtemp(prefix='structopt-scaling-')
+    try:
+        with open(os.path.join(directory, 'input.json'), 'w') as f:
+            json.dump(input, f)
+        env = dict(os.environ, LAMMPS_COMMAND=MOCK_LAMMPS)
+        env['PYTHONPATH'] = os.pathsep.join([ROOT] + [path for path in [env.get('PYTHONPATH')] if path])
+        command = [args.mpiexec] + args.mpiexec_args.split() + ['-n', str(cores), sys.executable, GENETIC, 'input.json']
+        start = time.time()
+        process = subprocess.run(command, cwd=directory, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        wall = time.time() - start
+        output = process.stdout.decode(errors='replace')
+        if process.returncode != 0:
+            raise RuntimeError('{} failed:\n{}'.format(' '.join(command), output[-3000:]))
+
+        logs = [line.split(':', 1)[1].strip() for line in output.splitlines() if line.startswith('Logging directory:')]
+        timing = RunStore(logs[0]).read('timing')
+        times = {phase: float(np.sum(timing[phase])) for phase in PHASES + ['step']}
+        times['wall'] = wall
+        return times
+    finally:
+        if not args.keep:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def report(mode, results, cores):
+    """Prints the times and efficiencies of `mode` ('strong' or 'weak')."""
+    base_cores = cores[0]
+    base = results[base_cores]['step']
+    print('{:6s} {:>9s} {:>9s} {:>8s} {:>10s}'.format('cores', 'wall', 'step', 'speedup', 'efficiency') +
+          ''.join('{:>14s}'.format(phase) for phase in PHASES))
+    for n in cores:
+        times = results[n]
+        speedup = base / times['step'] if times['step'] > 0 else float('nan')
+        if mode == 'strong':
+            efficiency = speedup * base_cores / n
+        else:
+            efficiency = speedup
+        print('{:<6d} {:8.2f}s {:8.2f}s {:8.2f} {:9.1f}%'.format(n, times['wall'], times['step'], speedup, 100 * efficiency) +
+              ''.join('{:13.2f}s'.format(times[phase]) for phase in PHASES))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cores', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--natoms', type=int, default=55)
+    parser.add_argument('--population', type=int, default=16,
+                        help='the number of individuals, per core for weak scaling')
+    parser.add_argument('--generations', type=int, default=5)
+    parser.add_argument('--modes', nargs='+', default=['strong', 'weak'], choices=['strong', 'weak'])
+    parser.add_argument('--pipeline', default='staged', choices=['staged', 'fused'])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--mpiexec', default='mpiexec')
+    parser.add_argument('--mpiexec-args', default='', help='extra arguments for mpiexec, e.g. "--oversubscribe"')
+    parser.add_argument('--keep', action='store_true', help='keep the run directories')
+    args = parser.parse_args()
+
+    cores = sorted(args.cores)
+    for mode in args.modes:
+        print('{} scaling: {} individuals{} of {} atoms, {} generations, {} pipeline'.format(
+              mode.title(), args.population, ' per core' if mode == 'weak' else '', args.natoms,
+              args.generations, args.pipeline))
+        results = {}
+        for n in cores:
+            population = args.population * n if mode == 'weak' else args.population
+            input = parameters(args.natoms, population, args.generations, args.pipeline, args.seed)
+            results[n] = run(n, input, args)
+        report(mode, results, cores)
+        print('')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Synthetic structures for the benchmarks.
+
+The clusters are the ``natoms`` sites of an fcc lattice closest to a point
+near the middle of a cubic cell, so they are compact, roughly spherical and
+have realistic surfaces and coordination numbers. The glasses are periodic
+cubes filled with a jittered simple cubic lattice at the number density of a
+metallic glass, so no two atoms overlap. All of them are deterministic for a
+given seed.
+"""
+
+import numpy as np
+from ase import Atoms
+
+# Symbols, fractions and fcc lattice constants of the clusters
+CLUSTERS = {
+    'Au': ([('Au', 1.0)], 4.08),
+    'ZrCu': ([('Zr', 0.5), ('Cu', 0.5)], 3.90),
+}
+# Symbols, fractions and number densities (atoms / A^3) of the glasses
+GLASSES = {
+    'ZrCu-glass': ([('Zr', 0.5), ('Cu', 0.5)], 0.058),
+}
+# Vacuum between a cluster and the faces of its cell
+VACUUM = 10.0
+
+
+def symbols_for(composition, natoms, random_state):
+    """Returns `natoms` symbols in the ratios of `composition`, shuffled."""
+    counts = [int(round(fraction * natoms)) for _, fraction in composition]
+    counts[-1] = natoms - sum(counts[:-1])
+    symbols = np.repeat([symbol for symbol, _ in composition], counts)
+    random_state.shuffle(symbols)
+    return list(symbols)
+
+
+def cluster(name, natoms, seed=0):
+    """Returns a synthetic cluster `name` (see CLUSTERS) with `natoms` atoms."""
+    composition, a = CLUSTERS[name]
+    random_state = np.random.RandomState(seed)
+
+    # An fcc lattice big enough to hold the cluster
+    n = int(np.ceil((natoms / 4.0) ** (1.0 / 3.0))) + 2
+    cells = np.indices((2 * n, 2 * n, 2 * n)).reshape(3, -1).T - n
+    basis = np.array([[0, 0, 0], [0, 0.5, 0.5], [0.5, 0, 0.5], [0.5, 0.5, 0]])
+    sites = (cells[:, None, :] + basis[None, :, :]).reshape(-1, 3) * a
+
+    # Off-center, so that the surface is not perfectly symmetric
+    center = np.array([0.11, 0.07, 0.03]) * a
+    order = np.argsort(np.linalg.norm(sites - center, axis=1), kind='stable')
+    positions = sites[order[:natoms]]
+
+    length = np.ptp(positions, axis=0).max() + 2 * VACUUM
+    atoms = Atoms(symbols_for(composition, natoms, random_state), positions=positions,
+                  cell=[length, length, length], pbc=False)
+    atoms.center()
+    return atoms
+
+
+def glass(name, natoms, seed=0):
+    """Returns a periodic cube `name` (see GLASSES) of `natoms` atoms."""
+    composition, density = GLASSES[name]
+    random_state = np.random.RandomState(seed)
+
+    n = int(np.ceil(natoms ** (1.0 / 3.0)))
+    length = (natoms / density) ** (1.0 / 3.0)
+    spacing = length / n
+    sites = np.indices((n, n, n)).reshape(3, -1).T[:natoms] * spacing
+    positions = sites + random_state.uniform(-0.15, 0.15, sites.shape) * spacing
+
+    atoms = Atoms(symbols_for(composition, natoms, random_state), positions=positions,
+                  cell=[length, length, length], pbc=True)
+    atoms.wrap()
+    return atoms
+
+
+def build(name, natoms, seed=0):
+    """Returns the synthetic system `name`, a key of CLUSTERS or GLASSES."""
+    if name in CLUSTERS:
+        return cluster(name, natoms, seed)
+    return glass(name, natoms, seed)
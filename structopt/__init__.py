@@ -15,6 +15,9 @@ from structopt import common
 def setup(parameter_file):
     # Read in the parameters
     parameters = read_parameters(parameter_file)
+    if parameters.islands is not None:
+        from structopt.tools.islands import split_islands
+        split_islands(parameters)
     sys.modules['gparameters'].update(parameters)
 
     # Setup all the loggers
@@ -43,6 +46,16 @@ def setup(parameter_file):
         debug_logger = initialize_logger_for_root(rank=rank, filename=os.path.join(path, 'debug.log'), name="debug", level=logging_level)
         debug_logger_by_rank = initialize_logger(filename=os.path.join(path, 'debug-by-rank-{}.log'.format(rank)), name="debug-by-rank", level=logging_level)
 
+    if parameters.tracing:
+        from structopt.tools import tracing
+        tracing.enable(path, rank=rank, ncores=parameters.mpi.ncores)
+    if parameters.mpi_accounting:
+        from structopt.tools import communication
+        communication.enable()
+    if parameters.profiling is not None:
+        from structopt.tools import profiling
+        profiling.enable(parameters.profiling, path, rank=rank)
+
     # Write parameters to both the output logger and copy it to a file in the logging directory
     write_parameters(parameters)
     if parameters.logging.path is not None and os.path.isdir(parameters.logging.path):
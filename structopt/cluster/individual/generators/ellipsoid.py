@@ -1,9 +1,9 @@
 import random
-from ase import Atom, Atoms
+from ase import Atoms
 
-from structopt.common.crossmodule import get_particle_radius
+from structopt.common.crossmodule import get_particle_radius, random_points_in_ellipsoid
 
-def ellipsoid(atomlist, fill_factor=0.74, radii=None, ratio=[1, 1, 1], cell=None):
+def ellipsoid(atomlist, fill_factor=0.74, radii=None, ratio=[1, 1, 1], cell=None, min_dist=None):
     """Generates a random ellipsoid by rejection sampling.
 
     Parameters
@@ -24,6 +24,9 @@ def ellipsoid(atomlist, fill_factor=0.74, radii=None, ratio=[1, 1, 1], cell=None
     cell : list
         The size, in angstroms, of the dimensions that holds the
         atoms object. Must be an orthogonal box.
+    min_dist : float
+        The minimum distance, in angstroms, between two atoms. If None,
+        atoms can be placed arbitrarily close to each other.
     """
     
 
@@ -42,12 +45,8 @@ def ellipsoid(atomlist, fill_factor=0.74, radii=None, ratio=[1, 1, 1], cell=None
         chemical_symbols += [atom[0]] * atom[1]
     random.shuffle(chemical_symbols)
 
-    # Add atoms iteratively only if they fall inside the ellipsoid
-    indiv = Atoms()
-    while len(chemical_symbols) > 0:
-        x, y, z = random.uniform(-a, a), random.uniform(-b, b), random.uniform(-c, c)
-        if x**2/a**2 + y**2/b**2 + z**2/c**2 <= 1:
-            indiv.extend(Atom(chemical_symbols.pop(), [x, y, z]))
+    positions = random_points_in_ellipsoid(len(chemical_symbols), [a, b, c], min_dist)
+    indiv = Atoms(symbols=chemical_symbols, positions=positions)
 
     if cell is not None:
         indiv.set_cell(cell)
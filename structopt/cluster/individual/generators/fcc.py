@@ -62,65 +62,62 @@ def fcc(atomlist, cell, a, shape=[1, 1, 1], orientation=None, size=21,
 
     dists_array = get_norm_dists(grid, center, shape, a, v=v, angle=angle)
 
+    # The coordination number of every grid point and the frontier (the
+    # flattened indices of the vacancies with at least one neighbor, in
+    # increasing order) are updated as atoms are added, so each step only
+    # works on the frontier instead of the whole grid
+    coords = get_coordination_numbers(grid)
+    frontier = np.flatnonzero((grid == 0) & (coords > 0))
+
     for i in range(n - 1):
 
-        # Get an array of 0 - 1 fitnesses that depend on the vacancy coord
+        # Get 0 - 1 fitnesses that depend on the vacancy coord
         # Fitness close to 1 corresponds to high fitness (high CN)
-        coords = get_coordination_numbers(grid)
-        vac_coords = (1 - grid) * coords
+        vac_coords = coords.flat[frontier]
 
         # Do not consider coordination numbers less than 3
         if np.max(vac_coords) >= 3:
-            np.place(vac_coords, vac_coords < 3, 0)
+            vac_coords = np.where(vac_coords < 3, 0, vac_coords)
+        nonzero = vac_coords > 0
         max_coord = np.max(vac_coords)
-        min_coord = np.min(vac_coords[np.nonzero(vac_coords)])
+        min_coord = np.min(vac_coords[nonzero])
 
         if max_coord != min_coord:
-            max_array = max_coord * vac_coords.astype(bool).astype(float)
-            min_array = min_coord * vac_coords.astype(bool).astype(float)
-            coord_fit = np.nan_to_num((vac_coords-min_array) / (max_array-min_array))
+            coord_fit = np.where(nonzero, (vac_coords - float(min_coord)) / (float(max_coord) - float(min_coord)), 0.0)
         else:
-            coord_fit = vac_coords // np.max(vac_coords)        
+            coord_fit = vac_coords // max_coord
 
-        # Get an array 0 - 1 fitness that depend on the distance
+        # Get 0 - 1 fitnesses that depend on the distance
         # From the center of the atom. Fitness close to 1 corresponds
         # to high fitness (close to center)
-        vac_grid = (1 - grid) * coords.astype(bool).astype(int)
-        vac_dists = dists_array * vac_coords
+        vac_dists = dists_array.flat[frontier] * vac_coords
 
         max_dist = np.max(vac_dists)
-        min_dist = np.min(vac_dists[np.nonzero(vac_dists)])
+        min_dist = np.min(vac_dists[nonzero])
         if max_dist != min_dist:
-            dists_fit = min_dist / vac_dists
-            dists_fit[dists_fit == np.inf] = 0
+            dists_fit = np.where(nonzero, min_dist / np.where(nonzero, vac_dists, 1.0), 0.0)
         else:
-            dists_fit = vac_dists.astype(bool).astype(float)
+            dists_fit = nonzero.astype(float)
 
         # Combine fitnesses using a roundness parameter. Weight highest
-        # fitnesses according to a polynomial distribution
+        # fitnesses according to a polynomial distribution. Every occupied
+        # or isolated grid point has a fitness of 0, so that is the minimum
         total_fit = roundness*dists_fit + (1 - roundness)*coord_fit
-        max_fit = np.nanmax(total_fit)
-        min_fit = np.nanmin(total_fit)
-        if max_fit != min_fit:
-            total_fit = ((total_fit - min_fit) / (max_fit - min_fit))**(alpha)
+        max_fit = np.max(total_fit)
+        if max_fit != 0:
+            total_fit = (total_fit / max_fit)**(alpha)
         else:
             total_fit = total_fit.astype(bool).astype(float)
 
-        # Normalize the probabilities and flatten the array
-        sum_fit = np.nansum(total_fit)
-        grow_prob = total_fit.flatten()
-        grow_prob = (grow_prob / sum_fit)
-
-        # Choose vacancy with the fitness and back calculate the [z, y, x]
-        # index using the flattened index. Finally add the atom
-        add_ind = np.random.choice(np.arange(len(grow_prob))[grow_prob > 0],
-                                   p=grow_prob[grow_prob > 0])
-        nz, ny, nx = np.shape(grid)
-        add_ind_x = add_ind % (nx * ny) % nx
-        add_ind_y = (add_ind % (nx * ny) - add_ind_x) / nx
-        add_ind_z = (add_ind - add_ind_x - add_ind_y * nx) / (nx * ny)
-        add_ind = np.asarray((add_ind_z, add_ind_y, add_ind_x), dtype=int)
-        grid[add_ind[0], add_ind[1], add_ind[2]] = 1
+        # Normalize the probabilities
+        grow_prob = total_fit / np.sum(total_fit)
+
+        # Choose vacancy with the fitness, back calculate the [z, y, x]
+        # index using the flattened index and add the atom
+        possible = grow_prob > 0
+        add_ind = np.random.choice(frontier[possible], p=grow_prob[possible])
+        add_ind = np.asarray(np.unravel_index(add_ind, grid.shape), dtype=int)
+        add_atom(grid, coords, add_ind)
 
         # Expand the grid if it's not large enough
         if (0 in add_ind or size - 1 in add_ind):
@@ -133,9 +130,44 @@ def fcc(atomlist, cell, a, shape=[1, 1, 1], orientation=None, size=21,
             
             center = [i + 1 for i in center]
             dists_array = get_norm_dists(grid, center, shape, a, v=v, angle=angle)
+            coords = get_coordination_numbers(grid)
+            frontier = np.flatnonzero((grid == 0) & (coords > 0))
+        else:
+            frontier = update_frontier(frontier, grid, coords, add_ind)
 
     return get_atoms(grid, atomlist, cell, a, v=v, angle=angle)
 
+# The offsets of the 12 nearest neighbors of a point in the fcc grid
+NEIGHBORS = np.array([[0, 0, -1], [0, 0, 1], [0, -1, 0], [0, 1, 0],
+                      [-1, 0, 0], [1, 0, 0], [0, -1, 1], [-1, 0, 1],
+                      [0, 1, -1], [-1, 1, 0], [1, -1, 0], [1, 0, -1]])
+
+def get_neighbors(grid, index):
+    '''Returns the indices of the neighbors of `index` that are inside the grid'''
+
+    neighbors = index + NEIGHBORS
+    inside = ((neighbors >= 0) & (neighbors < grid.shape)).all(axis=1)
+    return neighbors[inside]
+
+def add_atom(grid, coords, index):
+    '''Places an atom at `index` and updates the coordination numbers'''
+
+    grid[tuple(index)] = 1
+    neighbors = get_neighbors(grid, index)
+    coords[tuple(neighbors.T)] += 1
+
+def update_frontier(frontier, grid, coords, index):
+    '''Returns the frontier after an atom was added at `index`: the site
+    itself is removed, and its vacant neighbors that had no other neighbors
+    before are added'''
+
+    site = np.ravel_multi_index(tuple(index), grid.shape)
+    frontier = np.delete(frontier, np.searchsorted(frontier, site))
+    neighbors = get_neighbors(grid, index)
+    new = (grid[tuple(neighbors.T)] == 0) & (coords[tuple(neighbors.T)] == 1)
+    new = np.sort(np.ravel_multi_index(tuple(neighbors[new].T), grid.shape))
+    return np.insert(frontier, np.searchsorted(frontier, new), new)
+
 def get_coordination_numbers(grid):
     '''Returns the coordination number of every position in a fcc grid'''
 
@@ -239,7 +271,7 @@ def get_norm_dists(grid, center, shape, a, v=[0, 0, 1], angle=0.0):
 
     # Get the coordinates of each grid point in real space
     size = np.shape(grid)
-    inds = np.array([i for i in np.ndindex(size[0], size[1], size[2])])
+    inds = np.indices(size).reshape(3, -1).T
     coords = np.dot(inds, cell) - np.dot(center, cell)
 
     # Now reweight these x,y,z distances by the dimensions of the box
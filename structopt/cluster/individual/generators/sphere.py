@@ -5,10 +5,9 @@ from ase import Atom, Atoms
 from ase.visualize import view
 from ase.data import atomic_numbers, reference_states
 
-from structopt.tools import random_three_vector
-from structopt.common.crossmodule import get_particle_radius
+from structopt.common.crossmodule import get_particle_radius, random_points_in_ellipsoid
 
-def sphere(atomlist, cell, fill_factor=0.74, radius=None):
+def sphere(atomlist, cell, fill_factor=0.74, radius=None, min_dist=None):
     """Generates a random sphere of particles given an
     atomlist and radius.
 
@@ -24,6 +23,9 @@ def sphere(atomlist, cell, fill_factor=0.74, radius=None):
     radius : float
         The radius of the sphere. If None, estimated from the
         atomic radii
+    min_dist : float
+        The minimum distance between two atoms. If None, atoms
+        can be placed arbitrarily close to each other.
     """
 
     if radius is None:
@@ -36,9 +38,7 @@ def sphere(atomlist, cell, fill_factor=0.74, radius=None):
 
     random.shuffle(chemical_symbols)
 
-    unit_vec = np.array([random_three_vector() for i in range(len(chemical_symbols))])
-    D = radius * np.random.sample(size=len(chemical_symbols)) ** (1.0/3.0)
-    positions = np.array([D]).T * unit_vec
+    positions = random_points_in_ellipsoid(len(chemical_symbols), [radius] * 3, min_dist)
 
     indiv = Atoms(symbols=chemical_symbols, positions=positions)
 
@@ -3,3 +3,5 @@ from .get_avg_radii import get_avg_radii
 from .get_particle_radius import get_particle_radius
 from .analysis import CoordinationNumbers, NeighborList, NeighborElements
 from .repair_cluster import repair_cluster
+from .random_points import random_points_in_ellipsoid
+from .resolve_overlaps import resolve_overlaps
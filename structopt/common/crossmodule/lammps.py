@@ -9,6 +9,8 @@ from subprocess import Popen, PIPE, TimeoutExpired
 from ase.calculators.lammpsrun import Prism
 
 from structopt.io import write_data
+from structopt.tools import profiling
+from structopt.tools.tracing import span, traced
 
 # "End mark" used to indicate that the calculation is done
 CALCULATION_END_MARK = '__end_of_ase_invoked_calculation__'
@@ -60,6 +62,7 @@ class LAMMPS(object):
         return
 
 
+    @traced()
     def calculate(self, atoms, tmp_dir=None, data_file=None, input_file=None, trj_file=None, overwrite_data=True):
         self.atoms = atoms
 
@@ -82,28 +85,31 @@ class LAMMPS(object):
             trj_file = os.path.join(self.tmp_dir, 'trj.lammps')
         self.trj_file = trj_file
 
-        self.setup_dir(self.tmp_dir, self.parameters)
-        os.chdir(self.tmp_dir)
+        with span('LAMMPS.write', 'io'):
+            self.setup_dir(self.tmp_dir, self.parameters)
+            os.chdir(self.tmp_dir)
 
-        if overwrite_data or not os.path.exists(self.data_file):
-            self.write_data(self.data_file, atoms)
+            if overwrite_data or not os.path.exists(self.data_file):
+                self.write_data(self.data_file, atoms)
 
-        self.write_input(self.input_file, atoms, self.parameters, self._custom_thermo_args, self.trj_file, self.data_file)
+            self.write_input(self.input_file, atoms, self.parameters, self._custom_thermo_args, self.trj_file, self.data_file)
 
-        errors = self.run(self.parameters, self.input_file)
+        with span('LAMMPS.run', 'subprocess', natoms=len(atoms)):
+            errors = self.run(self.parameters, self.input_file)
         if errors:
             self.process_error(errors)  # This will raise an exception, stopping runtime
 
         # Read the thermodynamic and atom data
         # we are still in the tmp directory
-        self.read_log_file(filename=os.path.join(self.tmp_dir, 'log.lammps'))
-        self.read_trj_file(filename=self.trj_file)
+        with span('LAMMPS.read', 'io'):
+            self.read_log_file(filename=os.path.join(self.tmp_dir, 'log.lammps'))
+            self.read_trj_file(filename=self.trj_file)
 
-        os.chdir(self.cwd)
-        
-        if self.parameters['keep_files'] == True:
-            self.copy_files(self.tmp_dir, self.calcdir)
-        shutil.rmtree(self.tmp_dir)
+            os.chdir(self.cwd)
+
+            if self.parameters['keep_files'] == True:
+                self.copy_files(self.tmp_dir, self.calcdir)
+            shutil.rmtree(self.tmp_dir)
 
         return
 
@@ -223,12 +229,13 @@ class LAMMPS(object):
             raise RuntimeError('Set LAMMPS_COMMAND environment variable')
 
         input_file = open(input_file)
-        p = Popen([lammps_cmd_line], stdin=input_file, stdout=PIPE, stderr=PIPE)
-        try:
-            output, error = p.communicate(timeout=parameters['timeout'])
-        except TimeoutExpired:
-            print("Timed out!")    
-            return "Timed out!"
+        with profiling.subprocess('LAMMPS'):
+            p = Popen([lammps_cmd_line], stdin=input_file, stdout=PIPE, stderr=PIPE)
+            try:
+                output, error = p.communicate(timeout=parameters['timeout'])
+            except TimeoutExpired:
+                print("Timed out!")
+                return "Timed out!"
 
         self.output = output.decode('utf-8').split('\n')[:-1]
 
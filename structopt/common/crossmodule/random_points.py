@@ -0,0 +1,68 @@
+import numpy as np
+
+from structopt.tools.cell_list import pairs_within
+
+
+def random_points_in_ellipsoid(n, radii, min_dist=None, max_attempts=100):
+    """Draws `n` uniformly distributed random points inside an ellipsoid
+    centered at the origin by rejection sampling.
+
+    The candidate points are drawn from the bounding box in batches and
+    accepted with a mask. If `min_dist` is given, a candidate is also
+    rejected if it is closer than `min_dist` to a point that has already been
+    accepted or to an earlier candidate in the same batch.
+
+    Parameters
+    ----------
+    n : int
+        The number of points.
+    radii : list
+        The semi-axes of the ellipsoid in the x, y and z direction.
+    min_dist : float
+        The minimum distance between two points. If None, the points
+        are not checked against each other.
+    max_attempts : int
+        The number of batches in a row that may be completely rejected
+        before giving up.
+
+    Output
+    ------
+    out : np.ndarray
+        An (n, 3) array of points.
+    """
+
+    radii = np.asarray(radii, dtype=float)
+    points = np.empty((0, 3))
+    failed = 0
+    while len(points) < n:
+        need = n - len(points)
+        # An ellipsoid fills pi/6 of its bounding box. With a minimum distance
+        # most candidates are rejected once the ellipsoid fills up, so the
+        # batches are kept large to avoid a long tail of small batches.
+        nbatch = 2 * need + 8
+        if min_dist is not None:
+            nbatch = max(nbatch, n // 4)
+        candidates = np.random.uniform(-1.0, 1.0, size=(nbatch, 3)) * radii
+        candidates = candidates[np.sum((candidates / radii)**2, axis=1) <= 1.0]
+
+        if min_dist is not None and len(candidates) > 0:
+            keep = np.ones(len(candidates), dtype=bool)
+            i, _, _ = pairs_within(candidates, min_dist, points)
+            keep[i] = False
+            candidates = candidates[keep]
+            # Of two candidates that are too close, the later one is rejected
+            keep = np.ones(len(candidates), dtype=bool)
+            _, j, _ = pairs_within(candidates, min_dist)
+            keep[j] = False
+            candidates = candidates[keep]
+
+        if len(candidates) == 0:
+            failed += 1
+            if failed >= max_attempts:
+                raise ValueError("Could only place {} of {} points {} apart in an ellipsoid with radii {}"
+                                 .format(len(points), n, min_dist, radii.tolist()))
+            continue
+        failed = 0
+        points = np.concatenate((points, candidates[:need]))
+
+    return points
@@ -0,0 +1,73 @@
+import numpy as np
+
+from structopt.tools.cell_list import pairs_within
+
+
+def resolve_overlaps(atoms, cutoff, tol=1e-3, max_sweeps=100):
+    """Pushes apart atoms that are closer than `cutoff` to each other.
+
+    Every sweep finds the pairs of atoms that are closer than `cutoff` with a
+    cell list (after the first sweep, only around the atoms that were moved in
+    the previous one) and moves both atoms of each pair by half of the
+    overlap along the line between them, as Atoms.set_distance(..., fix=0.5)
+    would.
+    The corrections for all of the pairs are added up and applied at the same
+    time. The sweeps stop once no pair is closer than `cutoff - tol`. Periodic
+    images are not considered. The atoms are wrapped into the cell at the end.
+
+    Parameters
+    ----------
+    atoms : Atoms
+        The atoms to modify in place.
+    cutoff : float
+        The minimum distance between two atoms.
+    tol : float
+        How far below `cutoff` a pair may still be when the sweeps stop.
+    max_sweeps : int
+        The maximum number of sweeps.
+
+    Output
+    ------
+    out : bool
+        True if the overlaps were resolved within `max_sweeps` sweeps.
+    """
+
+    positions = atoms.get_positions()
+    converged = False
+    moved = None
+    for sweep in range(max_sweeps + 1):
+        if moved is None:
+            i, j, distances = pairs_within(positions, cutoff - tol)
+        else:
+            # Only the atoms that moved in the last sweep can overlap now
+            active = np.flatnonzero(moved)
+            k, j, distances = pairs_within(positions[active], cutoff - tol, positions)
+            i = active[k]
+            unique = (i != j) & (~moved[j] | (i < j))
+            i, j, distances = i[unique], j[unique], distances[unique]
+        if len(i) == 0:
+            converged = True
+            break
+        if sweep == max_sweeps:
+            break
+
+        vectors = positions[j] - positions[i]
+        # Atoms on top of each other are pushed apart in a random direction
+        coincident = distances < 1e-8
+        if np.any(coincident):
+            vectors[coincident] = np.random.normal(size=(np.count_nonzero(coincident), 3))
+            distances[coincident] = 0.0
+        vectors /= np.linalg.norm(vectors, axis=1)[:, np.newaxis]
+        shifts = vectors * ((cutoff - distances) / 2.0)[:, np.newaxis]
+
+        displacements = np.zeros_like(positions)
+        np.add.at(displacements, i, -shifts)
+        np.add.at(displacements, j, shifts)
+        positions += displacements
+        moved = np.zeros(len(positions), dtype=bool)
+        moved[i] = True
+        moved[j] = True
+
+    atoms.set_positions(positions)
+    atoms.wrap()
+    return converged
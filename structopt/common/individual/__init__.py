@@ -30,6 +30,7 @@ class Individual(ase.Atoms):
         self._fitted = False
         self._relaxed = False
         self._fitness = None
+        self.fidelity = None
         self._Q_l = np.array([])
 
         cls_name = self.__class__.__name__.lower()
@@ -295,6 +296,7 @@ class Individual(ase.Atoms):
         new.crossover_tag = self.crossover_tag
         new._fitted = self._fitted
         new._relaxed = self._relaxed
+        new.fidelity = self.fidelity
         new._fitness = self._fitness
         new._Q_l = self._Q_l
         if self.fitnesses is not None:
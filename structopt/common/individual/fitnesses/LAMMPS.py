@@ -6,6 +6,7 @@ from ase.calculators.lammpsrun import LAMMPS as lammps
 
 from structopt.tools import root, single_core, parallel
 from structopt.tools.dictionaryobject import DictionaryObject
+from structopt.io.structure_archive import archiving
 import gparameters
 
 
@@ -77,7 +78,10 @@ class LAMMPS(object):
                 #  ase.get_potential_energy -> lammps.get_potential_energy -> lammps.update -> lammps.calculate
                 #  but we want to run it with a custom trajectory file output location, so we manually call calculate.
                 #  Then, when ase calls calculate, it won't run because it's already been finished.
-                trj_file = os.path.join(gparameters.logging.path, "modelfiles", "individual{}.trj".format(individual.id))
+                # With an archive, the trajectory is left in the temporary directory
+                trj_file = None
+                if not archiving():
+                    trj_file = os.path.join(gparameters.logging.path, "modelfiles", "individual{}.trj".format(individual.id))
                 calc.calculate(individual, trj_file=trj_file)
                 E = individual.get_potential_energy()
                 print("Finished calculating fitness of individual {} on rank {} with LAMMPS".format(individual.id, rank))
@@ -9,6 +9,7 @@ from scipy.optimize import fmin
 from ase.io import read
 
 from structopt.tools import root, single_core, parallel
+from structopt.tools.tracing import traced
 from structopt.tools.dictionaryobject import DictionaryObject
 import gparameters
 
@@ -63,6 +64,7 @@ class STEM(object):
 
         return chi
 
+    @traced(category='STEM')
     def cross_correlate(self, image):
         convolution = fftconvolve(self.target, image[::-1, ::-1], mode='full')
         y_max, x_max = np.unravel_index(np.argmax(convolution), convolution.shape)
@@ -159,6 +161,7 @@ class STEM(object):
 
         return V
 
+    @traced(category='STEM')
     def generate_psf(self):
         """Generates a psf array built from a gaussian function. The relevant 
         parameters specified in the parameters dictionary are below."""
@@ -238,6 +241,7 @@ class STEM(object):
 
         return target
 
+    @traced(category='STEM')
     def get_image(self, individual):
         """Calculates the z-contrasted STEM image of an individual"""
 
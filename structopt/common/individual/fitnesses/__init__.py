@@ -28,16 +28,16 @@ class Fitnesses(object):
             individual (Individual): the individual to evaluate
         """
         fit = 0.0
-        # Run each fitness module on the population. Create sorted
-        # module list so all cores run modules in the same order
-        modules_module_names = [[module, module.__name__.split('.')[-1]] for module in self.modules]
-        modules_module_names.sort(key=lambda i: i[1])
-        for module, module_name in modules_module_names:
-            module_parameters = self.parameters[module_name]
-            weight = getattr(module_parameters, 'weight')
-            fit += module.calculate_fitness(individual) * weight
+        # Run each fitness module on the individual in the same (sorted)
+        # order that the population uses
+        for module_name in sorted(self.module_names):
+            module = getattr(self, module_name)
+            weight = getattr(self.parameters[module_name], 'weight')
+            value = module.calculate_fitness(individual)
+            setattr(individual, module_name, value)
+            fit += value * weight
         individual._fitness = fit
-        self._fitted = True
+        individual._fitted = True
         return fit
 
 
@@ -7,6 +7,8 @@ from collections import defaultdict
 
 import structopt
 from structopt.tools import root, single_core, parallel
+from structopt.common.crossmodule import resolve_overlaps
+from structopt.common.population import adaptive
 
 from .swap_positions import swap_positions
 from .swap_species import swap_species
@@ -26,7 +28,7 @@ rotate_all.tag = 'RoAl'
 permutation.tag = 'Pe'
 rattle.tag = 'Rat'
 
-NOT_MUTATIONS = ['preserve_best', 'keep_original', 'keep_original_best']
+NOT_MUTATIONS = ['preserve_best', 'keep_original', 'keep_original_best', 'overlap_cutoff']
 
 class Mutations(object):
     """ """
@@ -48,12 +50,13 @@ class Mutations(object):
         assert total_probability <= 1.0
         self.mutations[None] = 1.0 - total_probability
         self.selected_mutation = None
+        self.overlap_cutoff = self.parameters.get('overlap_cutoff', None)
 
 
     @single_core
     def select_mutation(self):
         # Implementation from https://docs.python.org/3/library/random.html -- Ctrl+F "weights"
-        choices, weights = zip(*self.mutations.items())
+        choices, weights = zip(*adaptive.weights('mutations', self.mutations).items())
         cumdist = list(accumulate(weights))
         x = random.random() * cumdist[-1]
         self.selected_mutation = choices[bisect(cumdist, x)]
@@ -69,12 +72,16 @@ class Mutations(object):
         print("Performing mutation {} on individual {}".format(self.selected_mutation.__name__, individual.id or getattr(individual, "mutated_from", None)))
 
         kwargs = self.kwargs[self.selected_mutation]
-        result = self.selected_mutation(individual, **kwargs)
+        with adaptive.timed('mutations', self.selected_mutation.__name__):
+            result = self.selected_mutation(individual, **kwargs)
 
         # If the mutation "failed" and therefore did not modify the individual, do not update the below attributes
         if result is False:
             return individual
 
+        if self.overlap_cutoff is not None:
+            resolve_overlaps(individual, self.overlap_cutoff)
+
         individual._relaxed = False
         individual._fitted = False
         self.post_processing(individual)
@@ -4,6 +4,7 @@ import numpy as np
 from structopt.common.crossmodule.lammps import LAMMPS as lammps
 from structopt.tools import root, single_core, parallel
 from structopt.cluster.individual.mutations.move_surface_atoms import move_surface_atoms
+from structopt.io.structure_archive import archiving
 import gparameters
 
 
@@ -52,18 +53,26 @@ class LAMMPS(object):
 
 
     @parallel
-    def relax(self, individual):
+    def relax(self, individual, minimize=None):
         """Relax an individual.
 
         Args:
             individual (Individual): the individual to relax
+            minimize (str): the convergence criteria of the minimization, if
+                not the ``minimize`` parameter. Used for the loose
+                relaxations of the multi-fidelity schedule.
         """
 
         calcdir = os.path.join(self.output_dir, 'relaxation/LAMMPS/generation{}/individual{}'.format(gparameters.generation, individual.id))
+        parameters = self.parameters
+        if minimize is not None:
+            calcdir += '-loose'
+            parameters = parameters.copy()
+            parameters['minimize'] = minimize
         rank = gparameters.mpi.rank
         print("Relaxing individual {} on rank {} with LAMMPS".format(individual.id, rank))
 
-        calc = lammps(self.parameters, calcdir=calcdir)
+        calc = lammps(parameters, calcdir=calcdir)
         individual.set_calculator(calc)
         try:
             # We will manually run the lammps calculator's calculate.
@@ -71,7 +80,10 @@ class LAMMPS(object):
             #  ase.get_potential_energy -> lammps.get_potential_energy -> lammps.update -> lammps.calculate
             #  but we want to run it with a custom trajectory file output location, so we manually call calculate.
             #  Then, when ase calls calculate, it won't run because it's already been finished.
-            trj_file = os.path.join(gparameters.logging.path, "modelfiles", "individual{}.trj".format(individual.id))
+            # With an archive, the trajectory is left in the temporary directory
+            trj_file = None
+            if not archiving():
+                trj_file = os.path.join(gparameters.logging.path, "modelfiles", "individual{}.trj".format(individual.id))
             calc.calculate(individual, trj_file=trj_file)
             E = individual.get_potential_energy()
             print("Finished relaxing individual {} on rank {} with LAMMPS".format(individual.id, rank))
@@ -80,6 +92,7 @@ class LAMMPS(object):
             print("Error relaxing individual {} on rank {} with LAMMPS".format(individual.id, rank))
 
         individual.LAMMPS = E
+        individual.fidelity = 'tight' if minimize is None else 'loose'
 
         if 'repair' in self.parameters and self.parameters['repair']:
             E = self.repair(individual, gparameters.generation)
@@ -113,7 +126,10 @@ class LAMMPS(object):
             #  ase.get_potential_energy -> lammps.get_potential_energy -> lammps.update -> lammps.calculate
             #  but we want to run it with a custom trajectory file output location, so we manually call calculate.
             #  Then, when ase calls calculate, it won't run because it's already been finished.
-            trj_file = os.path.join(gparameters.logging.path, "modelfiles", "individual{}.trj".format(individual.id))
+            # With an archive, the trajectory is left in the temporary directory
+            trj_file = None
+            if not archiving():
+                trj_file = os.path.join(gparameters.logging.path, "modelfiles", "individual{}.trj".format(individual.id))
             calc.calculate(individual, trj_file=trj_file)
             E = individual.get_potential_energy()
             print("Finished repairing individual {} on rank {} with LAMMPS".format(individual.id, rank))
@@ -12,7 +12,8 @@ class Relaxations(object):
         self.parameters = parameters
         self.modules = []
 
-        for module in self.parameters:
+        # Run the modules in their specified order, like the population does
+        for module in sorted(self.parameters, key=lambda module: self.parameters[module].get('order', 0)):
             # Initialize the class that was imported at the top of the file and append it to the modules list
             parameters = getattr(self.parameters[module], 'kwargs')
             setattr(self, module, globals()[module](parameters=parameters))
@@ -27,7 +28,7 @@ class Relaxations(object):
             individual (Individual): the individual to relax
         """
         for module in self.modules:
-            module.relax(individual, generation)
+            module.relax(individual)
         individual._relaxed = True
         individual._fitted = False
         return None
@@ -1,5 +1,4 @@
-from ase.neighborlist import NeighborList
-
+from structopt.common.crossmodule import resolve_overlaps
 from structopt.tools import root, single_core, parallel
 import gparameters
 
@@ -7,13 +6,24 @@ import gparameters
 class hard_sphere_cutoff(object):
     """A relaxation module to ensure atoms in an individual are not too close together.
     This is often a preliminary relaxation before LAMMPS for VASP to ensure the models do not explode.
+
+    Parameters
+    ----------
+    cutoff : float
+        The minimum distance between two atoms.
+    tol : float
+        How far below the cutoff two atoms may still be once the relaxation stops.
+    max_sweeps : int
+        The maximum number of times all of the overlaps are corrected.
     """
 
     @single_core
     def __init__(self, parameters, cutoff=0.7):
         # These variables never change
-        self.cutoff = cutoff
         self.parameters = parameters
+        self.cutoff = parameters.get('cutoff', cutoff)
+        self.tol = parameters.get('tol', 1e-3)
+        self.max_sweeps = parameters.get('max_sweeps', 100)
 
 
     @single_core
@@ -24,23 +34,5 @@ class hard_sphere_cutoff(object):
         """
         rank = gparameters.mpi.rank
         print("Relaxing individual {} on rank {} with hard-sphere cutoff method".format(individual.id, rank))
-        radii = [2.0 for atom in individual]
-        nl = NeighborList(radii, bothways=True, self_interaction=False)
-        nl.update(individual)
-
-        ntries = 0
-        modified = True
-        while modified and ntries < 100:
-            modified = False
-            for atom in individual:
-                indices, offsets = nl.get_neighbors(atom.index)
-                for neigh in indices:
-                    if individual.get_distance(atom.index, neigh) < self.cutoff:
-                        individual.set_distance(atom.index, neigh, self.cutoff, fix=0.5)
-                        modified = True
-            nl.update(individual)
-            individual.wrap()
-            ntries += 1
-        if ntries == 100:
-            print("WARNING! Iterated through the hard-sphere cutoff relaxation 100 times and it still did not converge!")
-
+        if not resolve_overlaps(individual, self.cutoff, self.tol, self.max_sweeps):
+            print("WARNING! Iterated through the hard-sphere cutoff relaxation {} times and it still did not converge!".format(self.max_sweeps))
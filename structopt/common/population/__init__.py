@@ -4,17 +4,48 @@ from collections import Counter
 from reprlib import recursive_repr as _recursive_repr
 
 import structopt
+import gparameters
 from ..individual import Individual
-from structopt.tools import root, single_core, parallel, allgather
-from structopt.tools import SortedDict
+from . import pipeline
+from structopt.tools import root, single_core, parallel, allgather, get_comm
+from structopt.tools import IndexedDict
+from structopt.tools.random_streams import seeded, stream_seed, run_seed
+from structopt.io.generator_cache import generator_key, load_generated, save_generated
 
 POPULATION_MODULES = ['crossovers', 'selections', 'predators', 'fingerprinters', 'fitnesses', 'relaxations', 'mutations', 'pso_moves']
 
-class Population(SortedDict):
-    """A list-like class that contains the Individuals and the operations to be run on them."""
+# The dtype of the columns returned by Population.get_column. Any attribute
+# not listed here (e.g. the per-module fitnesses) is a float column.
+COLUMN_DTYPES = {'id': int,
+                 '_fitted': bool,
+                 '_relaxed': bool,
+                 'fidelity': object,
+                 'crossover_tag': object,
+                 'mutation_tag': object}
 
-    @single_core
+
+def _empty_population(cls):
+    """Creates an empty population without calling __init__. Used for unpickling."""
+    population = IndexedDict.__new__(cls)
+    IndexedDict.__init__(population)
+    return population
+
+
+class Population(IndexedDict):
+    """A list-like class that contains the Individuals and the operations to be run on them.
+
+    Individuals are stored by id and iterated over in order of increasing id.
+    The position of an individual is kept in an index, so positional access
+    is O(1), and per-individual attributes (fitnesses, flags and tags) can be
+    retrieved and set for the whole population at once as NumPy columns with
+    `get_column` and `set_column`.
+    """
+
+    @parallel
     def __init__(self, parameters, individuals=None):
+        """Creates the population from `individuals` or, if that is None, with
+        the generators in the parameters. The generators are run in parallel
+        over the cores."""
         super().__init__()
 
         self.parameters = parameters
@@ -30,7 +61,9 @@ class Population(SortedDict):
             module = importlib.import_module('structopt.{}'.format(self.structure_type))
             Structure = getattr(module, self.structure_type.title())
 
-            # Generate/load initial structures
+            # Generate/load initial structures. Each core generates every
+            # ncores-th structure, and the structures are gathered afterwards
+            to_generate = []
             starting_id = 0
             for generator in sorted(self.parameters.generators.keys()):
                 n = self.parameters.generators[generator].number_of_individuals
@@ -42,35 +75,84 @@ class Population(SortedDict):
                     if generator in ['read_xyz', 'read_extxyz']:
                         kwargs = {'filename': kwargs[j]}
 
-                    generator_parameters = {generator: kwargs}
-
-                    structure = Structure(id=starting_id + j,
-                                          relaxation_parameters=self.parameters.relaxations,
-                                          fitness_parameters=self.parameters.fitnesses,
-                                          mutation_parameters=self.parameters.mutations,
-                                          pso_moves_parameters=self.parameters.pso_moves,
-                                          generator_parameters=generator_parameters)
-                    self.add(structure)
+                    to_generate.append((starting_id + j, generator, kwargs))
                 starting_id += n
+
+            ncores = gparameters.mpi.ncores
+            rank = gparameters.mpi.rank
+            seed = run_seed()
+            structures = [self.generate_individual(Structure, id, generator, kwargs, seed)
+                          for id, generator, kwargs in to_generate[rank::ncores]]
+            if ncores > 1:
+                structures = [structure for structures in get_comm().allgather(structures) for structure in structures]
+            self.update(sorted(structures, key=lambda structure: structure.id))
         else:
             self.update(individuals)
 
         self.initial_number_of_individuals = len(self)
 
+
+    @single_core
+    def generate_individual(self, Structure, id, generator, kwargs, seed):
+        """Creates an individual with a generator. The generator draws from a
+        random stream seeded by `seed` and the id, so the individual does not
+        depend on which core generates it. If the ``generator_cache`` parameter
+        is set to a directory, the structure is loaded from there when the same
+        generator was run with the same kwargs and seed before, and saved there
+        otherwise.
+
+        Args:
+            Structure (class): the Individual subclass for the structure type
+            id (int): the id of the new individual
+            generator (str): the name of the generator
+            kwargs (dict): the kwargs of the generator
+            seed (int): the seed of the run
+        """
+        seed = stream_seed(seed, 'generate', id)
+        cache = self.parameters.get('generator_cache')
+        if generator in ['read_xyz', 'read_extxyz']:
+            cache = None  # Reading the file is as fast as reading the cache
+
+        cached = None
+        if cache is not None:
+            key = generator_key(self.structure_type, generator, kwargs, seed)
+            cached = load_generated(cache, key)
+
+        generator_parameters = {generator: kwargs}
+        if cached is None:
+            with seeded(seed):
+                structure = Structure(id=id,
+                                      relaxation_parameters=self.parameters.relaxations,
+                                      fitness_parameters=self.parameters.fitnesses,
+                                      mutation_parameters=self.parameters.mutations,
+                                      pso_moves_parameters=self.parameters.pso_moves,
+                                      generator_parameters=generator_parameters)
+            if cache is not None:
+                save_generated(cache, key, structure)
+        else:
+            structure = Structure(id=id,
+                                  relaxation_parameters=self.parameters.relaxations,
+                                  fitness_parameters=self.parameters.fitnesses,
+                                  mutation_parameters=self.parameters.mutations,
+                                  pso_moves_parameters=self.parameters.pso_moves,
+                                  generator_parameters=None)
+            structure.generator_parameters = generator_parameters
+            structure.set_cell(cached.pop('cell'))
+            structure.set_pbc(cached.pop('pbc'))
+            structure.arrays = cached
+        return structure
+
     def __iter__(self):
-        iterable = super().__iter__()
-        curr = next(iterable)
-        while curr is not StopIteration:
-            yield self[curr]
-            curr = next(iterable)
+        for id in super().__iter__():
+            yield self[id]
 
 
     def __reduce__(self):
         'Return state information for pickling'
-        inst_dict = vars(self).copy()
-        for k in vars(SortedDict()):
+        inst_dict = self.__getstate__()
+        for k in vars(IndexedDict()):
             inst_dict.pop(k, None)
-        return self.__class__, (), inst_dict or None, None, iter(self.items())
+        return _empty_population, (self.__class__,), inst_dict or None, None, iter(self.items())
 
 
     @_recursive_repr()
@@ -109,17 +191,49 @@ class Population(SortedDict):
     @single_core
     def position(self, individual):
         """Returns the position of the individual in the population."""
-        for i, _individual in enumerate(self):
-            if _individual is individual:
-                return i
+        try:
+            return super().position(individual.id)
+        except KeyError:
+            return None
 
 
     @single_core
     def get_by_position(self, position):
         """Returns the individual at position `position`."""
-        for i, individual in enumerate(self):
-            if i == position:
-                return individual
+        return self[self.key_at(position)]
+
+
+    @single_core
+    def get_column(self, name):
+        """Returns the attribute `name` of every individual, in population order,
+        as a NumPy array. Missing values (None) in float columns are returned as NaN.
+
+        Args:
+            name (str): the attribute, e.g. 'id', '_fitness', '_fitted', '_relaxed',
+                'fidelity', 'crossover_tag', 'mutation_tag' or a fitness module name like 'LAMMPS'
+        """
+        dtype = COLUMN_DTYPES.get(name, float)
+        if dtype is float:
+            values = [getattr(individual, name, None) for individual in self]
+            return np.array([np.nan if value is None else value for value in values], dtype=float)
+        elif name == 'id':
+            return np.fromiter(super().__iter__(), dtype=int, count=len(self))
+        else:
+            return np.array([getattr(individual, name, None) for individual in self], dtype=dtype)
+
+
+    @single_core
+    def set_column(self, name, values):
+        """Sets the attribute `name` of every individual from `values`, which
+        must be in population order. A scalar is broadcast to every individual."""
+        if np.ndim(values) == 0:
+            values = [values] * len(self)
+        if len(values) != len(self):
+            raise ValueError("Got {} values for a population of {} individuals".format(len(values), len(self)))
+        for individual, value in zip(self, values):
+            if isinstance(value, np.generic):
+                value = value.item()
+            setattr(individual, name, value)
 
 
     @parallel
@@ -141,8 +255,7 @@ class Population(SortedDict):
     @parallel
     def bcast(self):
         """Performs and MPI.bcast on self."""
-        from mpi4py import MPI
-        correct_individuals = MPI.COMM_WORLD.bcast([individual for individual in self], root=0)
+        correct_individuals = get_comm().bcast([individual for individual in self], root=0)
         self.replace(correct_individuals)
 
 
@@ -150,7 +263,7 @@ class Population(SortedDict):
     def add(self, individual):
         """Adds an Individual to the population."""
         assert isinstance(individual, Individual)
-        assert individual.id not in [_individual.id for _individual in self]
+        assert individual.id not in self
         self.update([individual])
 
 
@@ -197,7 +310,15 @@ class Population(SortedDict):
         return children
 
 
-    @root
+    @parallel
+    def breed(self, pairs):
+        """Create, mutate, relax and evaluate the offspring of `pairs` with the
+        fused pipeline and add them to the population. See
+        structopt.common.population.pipeline for details."""
+        return pipeline.breed(self, pairs)
+
+
+    @parallel
     def mutate(self):
         """Perform mutations on the population."""
         self.mutations.mutate(self)
@@ -0,0 +1,301 @@
+"""Adaptive selection of the operators.
+
+The mutations, crossovers, predators and fingerprinters are normally chosen
+with the fixed probabilities of the parameter file. When the
+``adaptive_operators`` parameters are given, the probabilities of the
+operators of each of the ``modules`` are instead updated every generation by
+a multi-armed bandit rule, based on how much each operator improved the
+fitness per second of wall time it took:
+
+* A crossover or mutation is credited with the improvement of each child it
+  made over the best of the child's parents (or the individual it mutated),
+  ``max(0, parent fitness - child fitness)``, and with the time it took to
+  run, which is measured on every core where it ran.
+* The predator or fingerprinter that was selected in a generation is
+  credited with the improvement of the best fitness of the population over
+  the generation, and with the time of its phase.
+
+The reward of an operator in a generation is its improvement per second,
+and its quality is an exponential moving average of its rewards with weight
+``decay``. With the ``"probability_matching"`` method the operators are
+scored by their qualities; with ``"ucb"`` each quality (relative to the best
+one) gets the upper confidence bound bonus ``exploration * sqrt(2 ln(n) /
+n_i)``, where ``n_i`` is the number of times the operator was used and ``n``
+the number of times all of them were. In either case each operator gets
+``floor`` of the total probability of the operators in the parameter file
+plus a part of the rest proportional to its score, but no more than
+``ceiling``, and the probability that no operator is chosen stays as
+configured. Until an operator of a module has
+been rewarded, the module keeps its configured probabilities.
+
+The probabilities are the same on every core. They are updated on the root
+and broadcast, and the ``select_*`` methods of the modules look them up with
+:func:`weights`.
+"""
+
+import math
+import time
+import logging
+from collections import defaultdict
+
+import numpy as np
+
+import gparameters
+from structopt.tools import root, single_core, parallel, get_comm
+from structopt.io.run_store import split_tags
+from structopt.io.parameters import EXCEPTION_FUNCTIONS
+
+MODULES = ['mutations', 'crossovers', 'predators', 'fingerprinters']
+METHODS = ['probability_matching', 'ucb']
+
+# The adaptive probabilities of the operators of each module, by name
+_probabilities = {}
+# The number of times each (module, operator) ran on this core, and how long it took
+_times = None
+
+
+def weights(module, operators):
+    """Returns the {operator: probability} dictionary `operators` of a
+    select_* method, with the adaptive probabilities of `module` if there
+    are any."""
+    probabilities = _probabilities.get(module)
+    if probabilities is None:
+        return operators
+    return {operator: (probability if operator is None else probabilities.get(operator.__name__, probability))
+            for operator, probability in operators.items()}
+
+
+def record(module, operator, elapsed):
+    """Records that `operator` of `module` ran for `elapsed` seconds on this core."""
+    if _times is not None:
+        times = _times[(module, operator)]
+        times[0] += 1
+        times[1] += elapsed
+
+
+class timed(object):
+    """Records the time of the block as a run of `operator` of `module`."""
+
+    __slots__ = ['module', 'operator', 'start']
+
+    def __init__(self, module, operator):
+        self.module = module
+        self.operator = operator
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, type, value, traceback):
+        record(self.module, self.operator, time.time() - self.start)
+
+
+@parallel
+def collect_times():
+    """Sums up the operator times of all of the cores since the last call and
+    returns them on the root. This must be called on every core."""
+    global _times
+    times = dict(_times)
+    _times = defaultdict(lambda: [0, 0.0])
+    if gparameters.mpi.ncores > 1:
+        all_times = get_comm().gather(times, root=0)
+        if gparameters.mpi.rank != 0:
+            return None
+    else:
+        all_times = [times]
+    totals = defaultdict(lambda: [0, 0.0])
+    for times in all_times:
+        for key, (uses, elapsed) in times.items():
+            totals[key][0] += uses
+            totals[key][1] += elapsed
+    return dict(totals)
+
+
+def project(shares, floor, ceiling):
+    """Returns `shares` (which sum to 1) with a share of at least `floor` and
+    at most `ceiling` each. Every share first gets `floor` plus its part of
+    the rest, as in adaptive pursuit, and the excess of the shares above
+    `ceiling` is then spread over the others in proportion to how far they
+    are below it."""
+    shares = np.asarray(shares, dtype=float)
+    n = len(shares)
+    floor = min(floor, 1.0 / n)
+    ceiling = max(ceiling, 1.0 / n)
+    shares = floor + (1 - n * floor) * shares
+    excess = np.maximum(shares - ceiling, 0).sum()
+    if excess > 0:
+        shares = np.minimum(shares, ceiling)
+        room = ceiling - shares
+        shares += excess * room / room.sum()
+    return shares
+
+
+class AdaptiveOperators(object):
+    """Adapts the probabilities of the operators of a population.
+
+    Args:
+        parameters (dict): the ``adaptive_operators`` parameters
+        population (Population): the population whose operators are adapted
+    """
+
+    @single_core
+    def __init__(self, parameters, population):
+        global _times
+        self.parameters = parameters
+        self.method = parameters['method']
+        if self.method not in METHODS:
+            raise ValueError("'method' of 'adaptive_operators' must be one of {}, got '{}'".format(METHODS, self.method))
+        self.floor = parameters['floor']
+        self.ceiling = parameters['ceiling']
+        self.decay = parameters['decay']
+        self.exploration = parameters['exploration']
+
+        # The configured probabilities of the operators of each module
+        self.configured = {}
+        for module in parameters['modules']:
+            if module not in MODULES:
+                raise ValueError("'modules' of 'adaptive_operators' must be in {}, got '{}'".format(MODULES, module))
+            operators = population.parameters.get(module)
+            if not operators:
+                continue
+            self.configured[module] = {name: operators[name]['probability'] for name in sorted(operators)
+                                       if name not in EXCEPTION_FUNCTIONS}
+        self.quality = {module: {name: 0.0 for name in operators} for module, operators in self.configured.items()}
+        self.uses = {module: {name: 0 for name in operators} for module, operators in self.configured.items()}
+        self.rewarded = {module: False for module in self.configured}
+
+        self.before = {}
+        self.best_before = None
+        self.credits = defaultdict(float)
+        _times = defaultdict(lambda: [0, 0.0])
+        self.set_probabilities({module: dict(operators) for module, operators in self.configured.items()})
+
+    @staticmethod
+    def set_probabilities(probabilities):
+        """Sets the probabilities the select_* methods use on this core."""
+        _probabilities.clear()
+        _probabilities.update(probabilities)
+
+    @single_core
+    def start_generation(self, population):
+        """Remembers the fitnesses of the population before its offspring are made."""
+        self.before = {individual.id: individual.fitness for individual in population
+                       if individual._fitted and individual.fitness is not None and np.isfinite(individual.fitness)}
+        self.best_before = min(self.before.values()) if self.before else None
+        self.credits = defaultdict(float)
+
+    @single_core
+    def credit_offspring(self, population):
+        """Credits the crossovers and mutations with the improvement of the
+        individuals they made in this generation. This must be called after
+        the fitnesses are calculated and before the genealogy tags are reset."""
+        tags = {}
+        crossovers = getattr(population, 'crossovers', None)
+        if crossovers is not None:
+            tags.update({('crossovers', operator.tag): operator.__name__ for operator in crossovers.crossovers if operator is not None})
+        for individual in population:
+            if individual.mutations is not None:
+                tags.update({('mutations', operator.tag): operator.__name__ for operator in individual.mutations.mutations if operator is not None})
+                break
+
+        for individual in population:
+            if individual.id in self.before or not individual._fitted:
+                continue
+            crossover, parent1, parent2, mutation, mutated_from = split_tags(individual)
+            parents = [self.before[id] for id in (parent1, parent2, mutated_from) if id in self.before]
+            if not parents or individual.fitness is None or not np.isfinite(individual.fitness):
+                continue
+            improvement = max(0.0, min(parents) - individual.fitness)
+            for module, tag in [('crossovers', crossover), ('mutations', mutation)]:
+                name = tags.get((module, tag))
+                if name is not None:
+                    self.credits[(module, name)] += improvement
+
+    @parallel
+    def update(self, population, timing):
+        """Updates the probabilities with the credits and times of this
+        generation and sets them on every core. This must be called on every
+        core at the end of a generation.
+
+        Args:
+            population (Population): the population after the predators
+            timing (dict): the timing of the optimizer, for the times of the
+                predators and fingerprinters
+
+        Returns:
+            dict: the probabilities of the operators of each module
+        """
+        times = collect_times()
+        probabilities = self._update(population, times, timing['predator'][-1], timing['fingerprinter'][-1])
+        self.set_probabilities(probabilities)
+        return probabilities
+
+    @root
+    def _update(self, population, times, t_predator, t_fingerprinter):
+        """Updates the qualities on the root and returns the new probabilities."""
+        times = dict(times)
+        # The predator and fingerprinter are credited with the improvement of the best individual
+        fitnesses = [individual.fitness for individual in population
+                     if individual.fitness is not None and np.isfinite(individual.fitness)]
+        if self.best_before is not None and fitnesses:
+            improvement = max(0.0, self.best_before - min(fitnesses))
+            for module, attribute, elapsed in [('predators', 'selected_predator', t_predator),
+                                               ('fingerprinters', 'selected_fingerprinter', t_fingerprinter)]:
+                operator = getattr(getattr(population, module, None), attribute, None)
+                if operator is not None:
+                    self.credits[(module, operator.__name__)] += improvement
+                    times[(module, operator.__name__)] = [1, elapsed]
+
+        for (module, name), (uses, elapsed) in times.items():
+            if module not in self.quality or name not in self.quality[module] or uses == 0:
+                continue
+            reward = self.credits.get((module, name), 0.0) / max(elapsed, 1e-6)
+            self.quality[module][name] = (1 - self.decay) * self.quality[module][name] + self.decay * reward
+            self.uses[module][name] += uses
+            self.rewarded[module] = self.rewarded[module] or reward > 0
+
+        probabilities = {}
+        for module, configured in self.configured.items():
+            probabilities[module] = self.probabilities(module) if self.rewarded[module] else dict(configured)
+        return probabilities
+
+    @single_core
+    def probabilities(self, module):
+        """Returns the probabilities of the operators of `module` from their qualities."""
+        names = sorted(self.configured[module])
+        total = sum(self.configured[module].values())
+        quality = np.array([self.quality[module][name] for name in names])
+        if self.method == 'ucb':
+            uses = np.array([self.uses[module][name] for name in names], dtype=float)
+            n = max(uses.sum(), 1)
+            scores = quality / quality.max() if quality.max() > 0 else quality
+            scores = scores + self.exploration * np.sqrt(2 * math.log(n) / np.maximum(uses, 1))
+        else:
+            scores = quality
+        shares = scores / scores.sum() if scores.sum() > 0 else np.full(len(names), 1.0 / len(names))
+        shares = project(shares, self.floor, self.ceiling)
+        return {name: float(share * total) for name, share in zip(names, shares)}
+
+    @single_core
+    def log(self, probabilities):
+        """Writes the probabilities of the generation to the default log."""
+        logger = logging.getLogger('default')
+        for module in sorted(probabilities):
+            line = 'Generation {} {} probabilities: {}'.format(
+                gparameters.generation, module,
+                ', '.join('{} {:.3f}'.format(name, p) for name, p in sorted(probabilities[module].items())))
+            logger.info(line)
+            if gparameters.mpi.rank == 0:
+                print(line)
+
+    def state(self):
+        """Returns the state of the adaptation for a checkpoint."""
+        return {'quality': self.quality, 'uses': self.uses, 'rewarded': self.rewarded,
+                'probabilities': {module: dict(probabilities) for module, probabilities in _probabilities.items()}}
+
+    def restore(self, state):
+        """Restores the state returned by state()."""
+        self.quality = state['quality']
+        self.uses = state['uses']
+        self.rewarded = state['rewarded']
+        self.set_probabilities(state['probabilities'])
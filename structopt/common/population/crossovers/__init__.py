@@ -4,12 +4,26 @@ from itertools import accumulate
 from bisect import bisect
 
 from structopt.tools import root, single_core, parallel, allgather
+from structopt.tools.random_streams import seeded, stream_seed, run_seed
+from structopt.common.crossmodule import resolve_overlaps
+from structopt.common.population import adaptive
 import gparameters
 
 from .rotate import rotate
 
 rotate.tag = 'Ro'
 
+NOT_CROSSOVERS = ['overlap_cutoff']
+
+
+def set_mutation_streams(children, i):
+    """Keys the random streams that the `children` of the `i`th pair of a
+    generation will be mutated with by their pair, since they do not have
+    ids yet in the fused pipeline (see Mutations.stream_keys)."""
+    for k, child in enumerate(children):
+        if child is not None:
+            child._mutation_stream = ('crossover', i, k)
+
 
 class Crossovers(object):
     """ """
@@ -19,30 +33,37 @@ class Crossovers(object):
         self.parameters = parameters
 
         # self.crossovers is a dictionary containing {function: probability} pairs
-        self.crossovers = {getattr(self, name): self.parameters[name]['probability'] for name in self.parameters}
+        self.crossovers = {getattr(self, name): self.parameters[name]['probability'] for name in self.parameters
+                           if name not in NOT_CROSSOVERS}
 
         # self.kwargs is a dictionary containing {function: kwargs} pairs
-        self.kwargs = {getattr(self, name): self.parameters[name]['kwargs'] for name in self.parameters}
+        self.kwargs = {getattr(self, name): self.parameters[name]['kwargs'] for name in self.parameters
+                       if name not in NOT_CROSSOVERS}
 
         self.total_probability = sum(self.crossovers.values())
-        assert total_probability <= 1.0
+        assert self.total_probability <= 1.0
         self.crossovers[None] = 1.0 - self.total_probability
         self.selected_crossover = None
+        self.overlap_cutoff = self.parameters.get('overlap_cutoff', None)
 
 
     @single_core
     def select_crossover(self):
         # Implementation from https://docs.python.org/3/library/random.html -- Ctrl+F "weights"
-        choices, weights = zip(*self.crossovers.items())
+        choices, weights = zip(*adaptive.weights('crossovers', self.crossovers).items())
         cumdist = list(accumulate(weights))
         x = random.random() * cumdist[-1]
         self.selected_crossover = choices[bisect(cumdist, x)]
 
     @parallel
     def crossover(self, pairs):
-        """ """
+        """Performs a crossover on every pair. Each pair is mated with its own
+        random stream (seeded by the run's seed, the generation and the
+        position of the pair), so the children do not depend on the number
+        of cores or on the pipeline."""
         ncores = gparameters.mpi.ncores
         rank = gparameters.mpi.rank
+        seed = run_seed()
 
         # Assign which pairs to mate on which cores
         pairs_per_core = {rank: [] for rank in range(ncores)}
@@ -51,16 +72,20 @@ class Crossovers(object):
 
         # Perform the designated crossovers by rank
         children = []
-        for individual1, individual2 in pairs_per_core[rank]:
-            self.select_crossover()  # Choose a new crossover to perform for every pair
-            if self.selected_crossover is not None:
-                kwargs = self.kwargs[self.selected_crossover]
-                child1, child2 = self._crossover(individual1, individual2, self.selected_crossover, kwargs)
-                children.append(child1)
-                children.append(child2)
-            else:
-                children.append(None)
-                children.append(None)
+        for i, (individual1, individual2) in enumerate(pairs):
+            if i % ncores != rank:
+                continue
+            with seeded(stream_seed(seed, gparameters.generation, 'crossover', i)):
+                self.select_crossover()  # Choose a new crossover to perform for every pair
+                if self.selected_crossover is not None:
+                    kwargs = self.kwargs[self.selected_crossover]
+                    child1, child2 = self._crossover(individual1, individual2, self.selected_crossover, kwargs)
+                    set_mutation_streams((child1, child2), i)
+                    children.append(child1)
+                    children.append(child2)
+                else:
+                    children.append(None)
+                    children.append(None)
 
         children_per_core = {r: [] for r in range(ncores)}
         all_children = []
@@ -95,13 +120,14 @@ class Crossovers(object):
         if crossfunction is None:
             raise ValueError("Tried to perform a crossover but the selected crossover was `None`.")
         print("Performing crossover {} on individuals {} and {}".format(crossfunction.__name__, individual1, individual2))
-        child1, child2 = crossfunction(individual1, individual2, **crosskwargs)
-        if child1 is not None:
-            child1._fitted = False
-            child1._relaxed = False
-        if child2 is not None:
-            child2._fitted = False
-            child2._relaxed = False
+        with adaptive.timed('crossovers', crossfunction.__name__):
+            child1, child2 = crossfunction(individual1, individual2, **crosskwargs)
+        for child in (child1, child2):
+            if child is not None:
+                if self.overlap_cutoff is not None:
+                    resolve_overlaps(child, self.overlap_cutoff)
+                child._fitted = False
+                child._relaxed = False
         self.post_processing((individual1, individual2), (child1, child2))
         return child1, child2
 
@@ -2,9 +2,9 @@ import functools
 import random
 from itertools import accumulate, combinations
 from bisect import bisect
-from mpi4py import MPI
 from structopt.tools import root, single_core, parallel, disjoint_set_merge
-from structopt.tools.parallel import allgather
+from structopt.tools.parallel import allgather, get_comm
+from structopt.common.population import adaptive
 import gparameters
 from .all_close_atom_positions import all_close_atom_positions
 from .diversify_module import diversify_module
@@ -27,7 +27,7 @@ class Fingerprinters(object):
     @single_core
     def select_fingerprinter(self):
         # Implementation from https://docs.python.org/3/library/random.html -- Ctrl+F "weights"
-        choices, weights = zip(*self.fingerprinters.items())
+        choices, weights = zip(*adaptive.weights('fingerprinters', self.fingerprinters).items())
         cumdist = list(accumulate(weights))
         x = random.random() * cumdist[-1]
         self.selected_fingerprinter = choices[bisect(cumdist, x)]
@@ -69,11 +69,11 @@ class Fingerprinters(object):
             check = False
             while len(population) - len(killed) < nkeep:
                 rand = random.choice(range(len(killed)))
-                rand = MPI.COMM_WORLD.bcast(rand, root=0)
+                rand = get_comm().bcast(rand, root=0)
                 killed.pop(rand)
                 check = True
             if check:  # Make sure each core is killing the same individuals
-                all_killed = MPI.COMM_WORLD.allgather(tuple(id for id in killed))
+                all_killed = get_comm().allgather(tuple(id for id in killed))
                 assert len(set(all_killed)) <= 1
 
             new_population = [individual for individual in population if individual.id not in killed]
@@ -104,8 +104,8 @@ class Fingerprinters(object):
                 equivalent_pairs_by_core.append(pair)
         if len(equivalent_pairs_by_core) > 0:
             print("Found {} equivalent pairs on rank {}".format(len(equivalent_pairs_by_core), rank))
-        count = MPI.COMM_WORLD.allgather(len(equivalent_pairs_by_core))
-        all_equivalent_pairs = MPI.COMM_WORLD.allgather(equivalent_pairs_by_core)
+        count = get_comm().allgather(len(equivalent_pairs_by_core))
+        all_equivalent_pairs = get_comm().allgather(equivalent_pairs_by_core)
         all_equivalent_pairs = [pair for pairs in all_equivalent_pairs for pair in pairs]
         assert sum(count) == len(all_equivalent_pairs)
 
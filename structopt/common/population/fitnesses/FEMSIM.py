@@ -3,6 +3,7 @@ import math
 from collections import defaultdict
 
 from structopt.tools.parallel import root, single_core, parallel, parse_MPMD_cores_per_structure
+from structopt.tools import profiling
 import gparameters
 
 
@@ -71,13 +72,14 @@ def fitness(population, parameters):
                 individuals_this_iteration = len(to_fit) % individuals_per_iteration
                 cores_per_individual = ncores // individuals_this_iteration # All the cores available should be used
             print("Spawning {} femsim processes, each with {} cores".format(individuals_this_iteration, cores_per_individual))
-            intercomm = MPI.COMM_SELF.Spawn_multiple(command=multiple_spawn_args['command'][j:j+individuals_this_iteration],
-                                                     args=multiple_spawn_args['args'][j:j+individuals_this_iteration],
-                                                     maxprocs=[cores_per_individual]*individuals_this_iteration,
-                                                     info=infos[j:j+individuals_this_iteration]
-                                                     )
-            # Disconnect the child processes
-            intercomm.Disconnect()
+            with profiling.subprocess('FEMSIM'):
+                intercomm = MPI.COMM_SELF.Spawn_multiple(command=multiple_spawn_args['command'][j:j+individuals_this_iteration],
+                                                         args=multiple_spawn_args['args'][j:j+individuals_this_iteration],
+                                                         maxprocs=[cores_per_individual]*individuals_this_iteration,
+                                                         info=infos[j:j+individuals_this_iteration]
+                                                         )
+                # Disconnect the child processes
+                intercomm.Disconnect()
 
             # Collect the results for each chisq and return them
             for i, individual in enumerate(to_fit[j:j+individuals_this_iteration]):
@@ -21,7 +21,7 @@ def fitness(population, parameters):
     to_fit = [individual for individual in population if not individual._fitted]
 
     if not to_fit:
-        return [individual.LAMMPS for individual in population]
+        return population.get_column('LAMMPS')
 
     if parameters.use_mpi4py:
         ncores = gparameters.mpi.ncores
@@ -38,14 +38,13 @@ def fitness(population, parameters):
         individual.LAMMPS = energy
         logger.info('Individual {0} after LAMMPS evaluation has energy {1}'.format(individual.id, energy))
 
-    fits = [individual.LAMMPS for individual in population]
-    positions_per_core = {rank: [population.position(individual) for individual in individuals] for rank, individuals in individuals_per_core.items()}
     if parameters.use_mpi4py:
+        fits = [individual.LAMMPS for individual in population]
+        positions_per_core = {rank: [population.position(individual) for individual in individuals] for rank, individuals in individuals_per_core.items()}
         fits = allgather(fits, positions_per_core)
 
-    # Save the fitness value for the module to each individual after they have been allgathered
-    for i, fit in enumerate(fits):
-        population.get_by_position(i).LAMMPS = fit
+        # Save the fitness value for the module to each individual after they have been allgathered
+        population.set_column('LAMMPS', fits)
 
-    return [individual.LAMMPS for individual in population]
+    return population.get_column('LAMMPS')
 
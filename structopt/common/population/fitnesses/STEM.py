@@ -34,21 +34,13 @@ def fitness(population, parameters):
         individual.STEM = chi2
         logger.info('Individual {0} after STEM evaluation has chi^2 {1}'.format(individual.id, chi2))
 
-    positions_per_core = {rank: [population.position(individual) for individual in individuals] for rank, individuals in individuals_per_core.items()}
-
-    fits = []
-    for individual in population:
-        if hasattr(individual, 'STEM'):
-            fits.append(individual.STEM)
-        else:
-            fits.append(None)
-
     if parameters.use_mpi4py:
+        fits = [getattr(individual, 'STEM', None) for individual in population]
+        positions_per_core = {rank: [population.position(individual) for individual in individuals] for rank, individuals in individuals_per_core.items()}
         fits = allgather(fits, positions_per_core)
 
-    # Save the fitness value for the module to each individual after they have been allgathered
-    for i, fit in enumerate(fits):
-        population.get_by_position(i).STEM = fit
+        # Save the fitness value for the module to each individual after they have been allgathered
+        population.set_column('STEM', fits)
 
-    return [individual.STEM for individual in population]    
+    return population.get_column('STEM')
 
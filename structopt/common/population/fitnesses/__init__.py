@@ -22,11 +22,10 @@ class Fitnesses(object):
         Args:
             population (Population): the population to evaluate
         """
-        to_fit = [individual for individual in population if not individual._fitted]
-        if not to_fit:
-            return [individual.fitness for individual in population]
+        if population.get_column('_fitted').all():
+            return population.get_column('_fitness')
 
-        fitnesses = np.zeros((len(population),), dtype=np.float)
+        fitnesses = np.zeros((len(population),), dtype=float)
         # Run each fitness module on the population. Create sorted
         # module list so all cores run modules in the same order
         modules_module_names = [[module, module.__name__.split('.')[-1]] for module in self.modules]
@@ -46,9 +45,8 @@ class Fitnesses(object):
 
         # Store the individuals total fitness for each individual and set each individual to
         # unmodified so that the fitnesses won't be recalculated
-        for i, individual in enumerate(population):
-            individual._fitness = fitnesses[i]
-            individual._fitted = True
+        population.set_column('_fitness', fitnesses)
+        population.set_column('_fitted', True)
 
         self.post_processing(fitnesses)
         return fitnesses
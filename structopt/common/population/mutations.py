@@ -1,6 +1,8 @@
 import numpy as np
 
-from structopt.tools import root, single_core, parallel
+from structopt.tools import root, single_core, parallel, get_comm
+from structopt.tools.random_streams import seeded, stream_seed, run_seed
+import gparameters
 
 
 class Mutations(object):
@@ -17,42 +19,98 @@ class Mutations(object):
         self.keep_original = parameters.get('keep_original', False)
         self.keep_original_best = parameters.get('keep_original_best', False)
 
-    @single_core
+    @parallel
     def mutate(self, population):
+        """Mutates the population. The individuals are divided among the cores,
+        and each individual is mutated with its own random stream (seeded by
+        the run's seed, the generation and the individual's id, see
+        stream_keys), so the result does not depend on the number of cores
+        or on the pipeline. Only the mutated
+        individuals are exchanged between the cores afterwards.
+        """
+        ncores = gparameters.mpi.ncores
+        rank = gparameters.mpi.rank
+        seed = run_seed()
+
+        mutated_on_core = []
+        for i, individual in enumerate(population):
+            if i % ncores != rank:
+                continue
+            with seeded(stream_seed(seed, gparameters.generation, *self.stream_keys(individual))):
+                mutated = self.mutate_individual(individual)
+            if mutated is not None:
+                mutated_on_core.append(mutated)
+        population.set_column('_mutation_stream', None)
+
+        if ncores > 1:
+            all_mutated = get_comm().allgather(mutated_on_core)
+            all_mutated = [mutated for mutated_on_core in all_mutated for mutated in mutated_on_core]
+        else:
+            all_mutated = mutated_on_core
+
+        self.insert(population, all_mutated)
+        return population
+
+
+    @single_core
+    def insert(self, population, mutated_individuals):
+        """Adds mutated individuals to the population and removes the
+        individuals they were mutated from, unless `keep_original` (or
+        `keep_original_best` for the fittest individual) is set. The
+        population is updated in population order, so every core that calls
+        this with the same individuals assigns them the same new ids.
+        """
         if self.keep_original or self.keep_original_best:
             fits = {individual.id: (individual.fitness if individual._fitted else np.inf) for individual in population}
             min_fit_id = min(fits, key=fits.get)
 
-        # Make sure not to edit the population in the for loop!
+        mutated_individuals = sorted(mutated_individuals, key=lambda mutated: population.position(population[mutated.mutated_from]))
         to_remove = []
-        to_add = []
-        for individual in population:
-            individual.mutations.select_mutation()
-
-            if individual.mutations.selected_mutation is not None:
-                # Duplicate the individual and reset some values
-                mutated = individual.copy()
-                mutated.mutated_from = individual.id
-                mutated.mutations.selected_mutation = individual.mutations.selected_mutation
-                individual.mutations.selected_mutation = None
-
-                # Perform the mutation
-                mutated.mutate(select_new=False)
-
-                # Replace the individual with the mutated one
-                if not self.keep_original and not (self.keep_original_best and individual.id == min_fit_id):
-                    to_remove.append(individual)
-                to_add.append(mutated)
+        for mutated in mutated_individuals:
+            individual = population[mutated.mutated_from]
+            # Replace the individual with the mutated one
+            if not self.keep_original and not (self.keep_original_best and individual.id == min_fit_id):
+                to_remove.append(individual)
 
         for individual in to_remove:
             population.remove(individual)
-        for mutated in to_add:
+        for mutated in mutated_individuals:
             population.add(mutated)
 
-        return population
+
+    @staticmethod
+    def stream_keys(individual):
+        """Returns the keys of the random stream that `individual` is mutated
+        with in this generation: its id, or for a new child the pair it was
+        created from (see crossovers.set_mutation_streams)."""
+        return getattr(individual, '_mutation_stream', None) or (individual.id,)
+
+    @single_core
+    def mutate_individual(self, individual):
+        """Selects a mutation for `individual` and, if one was selected,
+        performs it on a copy of the individual. The individual itself is not
+        modified.
+
+        Returns:
+            Individual: the mutated copy (without an id), or None if no mutation was selected
+        """
+        if individual.mutations is None:
+            return None
+        individual.mutations.select_mutation()
+        if individual.mutations.selected_mutation is None:
+            return None
+
+        # Duplicate the individual and reset some values
+        mutated = individual.copy()
+        mutated.mutated_from = individual.id
+        mutated.mutations.selected_mutation = individual.mutations.selected_mutation
+        individual.mutations.selected_mutation = None
+
+        # Perform the mutation
+        mutated.mutate(select_new=False)
+        return mutated
 
 
     @single_core
     def post_processing(self):
         pass
-
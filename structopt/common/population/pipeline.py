@@ -0,0 +1,164 @@
+"""The fused offspring pipeline.
+
+In the default (staged) pipeline every operator is run on the whole population
+before the next one starts: the crossovers are run on all cores and
+allgathered, the mutations are run and allgathered, and the relaxations and
+fitnesses are each run round-robin and allgathered again. In the fused
+pipeline the work of a generation is instead split into independent tasks,
+one per selected pair of parents and one per individual already in the
+population. A core runs the whole pipeline for its tasks (crossover, mutation,
+relaxation and fitness evaluation) and only the finished offspring are
+exchanged, in a single allgather.
+
+Every task runs with its own random stream (see
+:mod:`structopt.tools.random_streams`), so the offspring do not depend on the
+number of cores. The crossover of a pair and the mutation of an individual
+use the same random streams as in the staged pipeline, and the offspring are
+added to the population in the same order, so for the same seed both
+pipelines create the same offspring with the same ids and genealogy tags.
+"""
+
+import time
+
+import gparameters
+from structopt.tools import parallel, single_core, get_comm
+from structopt.tools.random_streams import seeded, stream_seed, run_seed
+from structopt.common.population.crossovers import set_mutation_streams
+
+PIPELINES = ['staged', 'fused']
+OPERATIONS = ['crossover', 'mutation', 'relax', 'fitness']
+
+
+@parallel
+def breed(population, pairs):
+    """Creates, relaxes and evaluates the offspring of a generation and adds
+    them to the population.
+
+    Args:
+        population (Population): the population
+        pairs (list): the (individual1, individual2) pairs of parents returned by
+            Population.select, which must be the same on every core
+
+    Returns:
+        dict: the time spent in each of 'crossover', 'mutation', 'relax' and
+            'fitness', taken as the maximum over the cores
+    """
+    ncores = gparameters.mpi.ncores
+    rank = gparameters.mpi.rank
+    seed = run_seed()
+
+    tasks = [(run_crossover_task, (i, pair)) for i, pair in enumerate(pairs)]
+    tasks += [(run_mutation_task, individual) for individual in population]
+
+    timing = {operation: 0.0 for operation in OPERATIONS}
+    results = []
+    for i, (task, argument) in enumerate(tasks):
+        if i % ncores != rank:
+            continue
+        with seeded(stream_seed(seed, gparameters.generation, 'task', i)):
+            results.append((i, task(population, argument, timing)))
+
+    if ncores > 1:
+        gathered = get_comm().allgather((results, timing))
+        results = sorted((result for results, _ in gathered for result in results), key=lambda result: result[0])
+        timing = {operation: max(timing[operation] for _, timing in gathered) for operation in OPERATIONS}
+
+    # Add the children first and then the mutated individuals so that the
+    # ids are assigned in the same order as in the staged pipeline
+    mutated = []
+    for _, offspring in results:
+        for child, mutant in offspring:
+            if child is not None:
+                population.add(child)
+                if mutant is not None:
+                    # The child did not have an id when it was mutated
+                    mutant.mutated_from = child.id
+                    if mutant.mutation_tag is not None:
+                        tag = mutant.mutation_tag.rsplit('(', 1)[0]
+                        mutant.mutation_tag = '{tag}({id})'.format(tag=tag, id=child.id)
+            if mutant is not None:
+                mutated.append(mutant)
+    if mutated:
+        population.mutations.insert(population, mutated)
+    return timing
+
+
+@single_core
+def run_crossover_task(population, pair, timing):
+    """Runs a crossover on the `pair` (i, (individual1, individual2)) of
+    parents and mutates, relaxes and evaluates the children.
+
+    Returns:
+        list: a (child, mutated child) pair for each child, where the mutated
+            child is None if no mutation was selected. A child that was
+            mutated is only relaxed and evaluated if the mutations keep the
+            original, because otherwise it is replaced by the mutated child.
+    """
+    t0 = time.time()
+    i, (individual1, individual2) = pair
+    children = []
+    crossovers = getattr(population, 'crossovers', None)
+    if crossovers is not None:
+        # The same stream as Crossovers.crossover uses for the pair
+        with seeded(stream_seed(run_seed(), gparameters.generation, 'crossover', i)):
+            crossovers.select_crossover()
+            if crossovers.selected_crossover is not None:
+                kwargs = crossovers.kwargs[crossovers.selected_crossover]
+                children = crossovers._crossover(individual1, individual2, crossovers.selected_crossover, kwargs)
+                set_mutation_streams(children, i)
+                children = [child for child in children if child is not None]
+    timing['crossover'] += time.time() - t0
+
+    offspring = [(child, mutate(population, child, timing)) for child in children]
+    for child, mutant in offspring:
+        if mutant is None or population.mutations.keep_original:
+            relax_and_evaluate(child, timing)
+        if mutant is not None:
+            relax_and_evaluate(mutant, timing)
+    return offspring
+
+
+@single_core
+def run_mutation_task(population, individual, timing):
+    """Mutates a copy of `individual` and relaxes and evaluates it.
+
+    Returns:
+        list: the pair (None, mutated individual) if a mutation was selected,
+            otherwise nothing. Only the mutated individual is returned, since
+            the individual itself is already in the population on every core.
+    """
+    mutant = mutate(population, individual, timing)
+    if mutant is None:
+        return []
+    relax_and_evaluate(mutant, timing)
+    return [(None, mutant)]
+
+
+@single_core
+def mutate(population, individual, timing):
+    """Returns a mutated copy of `individual`, or None if no mutation was selected."""
+    mutations = getattr(population, 'mutations', None)
+    if mutations is None:
+        return None
+    t0 = time.time()
+    # The same stream as Mutations.mutate uses for the individual
+    with seeded(stream_seed(run_seed(), gparameters.generation, *mutations.stream_keys(individual))):
+        mutant = mutations.mutate_individual(individual)
+    individual._mutation_stream = None
+    timing['mutation'] += time.time() - t0
+    return mutant
+
+
+@single_core
+def relax_and_evaluate(individual, timing):
+    """Relaxes `individual` and calculates its fitness, unless that has already been done."""
+    t0 = time.time()
+    if not individual._relaxed:
+        if individual.relaxations is not None:
+            individual.relax()
+        individual._relaxed = True
+    t1 = time.time()
+    if not individual._fitted:
+        individual.calculate_fitness()
+    timing['relax'] += t1 - t0
+    timing['fitness'] += time.time() - t1
@@ -6,6 +6,7 @@ from bisect import bisect
 import numpy as np
 
 from structopt.tools import root, single_core, parallel
+from structopt.common.population import adaptive
 from .best import best
 from .roulette import roulette
 from .tournament import tournament
@@ -30,7 +31,7 @@ class Predators(object):
     @single_core
     def select_predator(self):
         # Implementation from https://docs.python.org/3/library/random.html -- Ctrl+F "weights"
-        choices, weights = zip(*self.predators.items())
+        choices, weights = zip(*adaptive.weights('predators', self.predators).items())
         cumdist = list(accumulate(weights))
         x = random.random() * cumdist[-1]
         self.selected_predator = choices[bisect(cumdist, x)]
@@ -54,20 +55,21 @@ class Predators(object):
         if self.selected_predator is None or len(population) <= nkeep:
             return []
 
-        fits = {individual.id: individual.fitness for individual in population}
+        ids = population.get_column('id')
+        fitnesses = population.get_column('_fitness')
         if keep_best:
-            best_id = min(fits, key=fits.get)
-            fits.pop(best_id)
+            best = np.argmin(fitnesses)
+            best_id = ids[best].item()
+            ids = np.delete(ids, best)
+            fitnesses = np.delete(fitnesses, best)
             nkeep -= 1
 
         kwargs = self.kwargs[self.selected_predator]
-        to_keep = self.selected_predator(fits=fits, nkeep=nkeep, **kwargs)
+        to_keep = self.selected_predator(ids=ids, fits=fitnesses, nkeep=nkeep, **kwargs)
         if keep_best:
-            try:
-                to_keep.append(best_id)
-            except AttributeError:
-                to_keep = np.append(to_keep, best_id)
+            to_keep = np.append(to_keep, best_id)
 
+        to_keep = set(np.asarray(to_keep).tolist())
         killed = [individual for individual in population if individual.id not in to_keep]
         new_population = [population[id] for id in to_keep]
         population.replace(new_population)
@@ -82,26 +84,26 @@ class Predators(object):
 
     @staticmethod
     @functools.wraps(best)
-    def best(fits, nkeep):
-        return best(fits, nkeep)
+    def best(ids, fits, nkeep):
+        return best(ids, fits, nkeep)
 
     @staticmethod
     @functools.wraps(roulette)
-    def roulette(fits, nkeep, T=None):
-        return roulette(fits, nkeep, T)
+    def roulette(ids, fits, nkeep, T=None):
+        return roulette(ids, fits, nkeep, T)
 
     @staticmethod
     @functools.wraps(tournament)
-    def tournament(fits, nkeep, tournament_size=5):
-        return tournament(fits, nkeep, tournament_size)
+    def tournament(ids, fits, nkeep, tournament_size=5):
+        return tournament(ids, fits, nkeep, tournament_size)
 
     @staticmethod
     @functools.wraps(rank)
-    def rank(fits, nkeep, p_min=None):
-        return rank(fits, nkeep, p_min)
+    def rank(ids, fits, nkeep, p_min=None):
+        return rank(ids, fits, nkeep, p_min)
 
     @staticmethod
     @functools.wraps(fuss)
-    def fuss(fits, nkeep, nbest=1, fusslimit=10):
-        return fuss(fits, nkeep, nbest=1, fusslimit=10)
+    def fuss(ids, fits, nkeep, nbest=1, fusslimit=10):
+        return fuss(ids, fits, nkeep, nbest, fusslimit)
 
@@ -1,15 +1,18 @@
+import numpy as np
 
-def best(fits, nkeep):
+
+def best(ids, fits, nkeep):
     """Sorts individuals by fitness and keeps the top nkeep fitnesses.
     
     Parameters
     ----------
-    fits : dict<int, float>
-        Dictionary of <individual.id, fitness> pairs.
+    ids : np.ndarray
+        The ids of the individuals in the population.
+    fits : np.ndarray
+        Fitnesses that correspond to `ids`.
     nkeep : int
         The number of individuals to keep. In a GA run, corresponds
         to the sum of each generators number_of_individuals
     """
-    sorted_ids, sorted_fits = zip(*sorted(fits.items(), key=lambda pair: pair[1]))
-    return sorted_ids[:nkeep]
-
+    order = np.argsort(fits, kind='stable')
+    return np.asarray(ids)[order[:nkeep]]
@@ -2,7 +2,7 @@ import random
 import numpy as np
 
 
-def fuss(fits, nkeep, nbest=0, fusslimit=10):
+def fuss(ids, fits, nkeep, nbest=0, fusslimit=10):
     """Fixed uniform selection scheme. Aimed at maintaining diversity
     in the population. In the case where low fit is the highest
     fitness, selects a fitness between min(fits) and min(fits) + fusslimit,
@@ -10,8 +10,10 @@ def fuss(fits, nkeep, nbest=0, fusslimit=10):
 
     Parameters
     ----------
-    fits : dict<int, float>
-        Dictionary of <individual.id, fitness> pairs.
+    ids : np.ndarray
+        The ids of the individuals in the population.
+    fits : np.ndarray
+        Fitnesses that correspond to `ids`.
     nkeep : int
         The number of individuals to keep. In a GA run, corresponds
         to the sum of each generators number_of_individuals
@@ -22,29 +24,25 @@ def fuss(fits, nkeep, nbest=0, fusslimit=10):
         worse than the max fitness will not be considered
     """
 
+    ids = np.asarray(ids)
+    fits = np.asarray(fits, dtype=float)
+
     # Find min and max fitness
-    minf = min(fits.values())
-    maxf = max(fits.values())
+    minf = np.min(fits)
+    maxf = np.max(fits)
     if abs(maxf-minf) > fusslimit:
             maxf = minf + fusslimit
 
     # Select random point on fitness line
     pt = random.uniform(minf, maxf)
 
-    to_keep = []
     # Always keep the top nbest individuals
-    if nbest > 0:
-        fits = sorted(fits.items(), key=lambda pair: pair[1])
-        sorted_ids, sorted_fits = zip(*fits)
-        to_keep.extend(sorted_ids[:nbest])
-
-    # Calculate the distance of each individual's fitness from that point
-    distances = {id: np.absolute(fit - pt) for id, fit in fits.items()}
+    order = np.argsort(fits, kind='stable')
+    keep_best = order[:nbest]
 
     # Select individuals with lowest distance (ie closest to the selected point)
-    distances = sorted(distances.items(), key=lambda pair: pair[1])
-    sorted_ids, sorted_distances = zip(*distances)
-    to_keep.extend(sorted_ids[:nkeep - nbest])
-
-    return to_keep
+    distances = np.absolute(fits - pt)
+    distances[keep_best] = np.inf
+    closest = np.argsort(distances, kind='stable')[:nkeep - len(keep_best)]
 
+    return ids[np.append(keep_best, closest)]
@@ -1,8 +1,9 @@
 import numpy as np
-import scipy
 
+from structopt.tools.sampling import ordinal_ranks
 
-def rank(fits, nkeep, p_min=None):
+
+def rank(ids, fits, nkeep, p_min=None):
     """Selection function that chooses pairs of structures
     based on linear ranking.
 
@@ -10,8 +11,10 @@ def rank(fits, nkeep, p_min=None):
 
     Parameters
     ----------
-    fits : dict<int, float>
-        Dictionary of <individual.id, fitness> pairs.
+    ids : np.ndarray
+        The ids of the individuals in the population.
+    fits : np.ndarray
+        Fitnesses that correspond to `ids`.
     nkeep : int
         The number of individuals to keep. In a GA run, corresponds
         to the sum of each generators number_of_individuals
@@ -27,18 +30,14 @@ def rank(fits, nkeep, p_min=None):
         p_min = 1.0 / len(fits) ** 2
 
     # Get ranks of each individual value based on its fitness
-    ids, fits = zip(*fits.items())
-    ids = list(ids)
-    fits = list(fits)
-    ranks = scipy.stats.rankdata(fits, method='ordinal')
+    ranks = ordinal_ranks(fits) + 1
 
     # Get probabilities based on linear ranking
     N = len(fits)
     eta_min = p_min * N
     eta_max = 2 - eta_min
     p_max = eta_max / N
-    p = p_min + (p_max - p_min)*(N - ranks)/(N - 1)  # `ranks` is a numpy array, so p is too
+    p = p_min + (p_max - p_min)*(N - ranks)/(N - 1)
 
     # Randomly choose `nkeep` values from the list `ids` given probability `p` for each value in `ids` (no duplicates)
-    return  np.random.choice(ids, nkeep, replace=False, p=p)
-
+    return np.random.choice(ids, nkeep, replace=False, p=p)
@@ -4,15 +4,17 @@ from structopt.tools import root, single_core, parallel
 from scipy.constants import physical_constants
 
 @single_core
-def roulette(fits, nkeep, T=None):
+def roulette(ids, fits, nkeep, T=None):
     """Select individuals with a probability proportional to their fitness.
     Fitnesses are renormalized from 0 - 1, which means minimum fitness
     individual is never included in in the new population.
 
     Parameters
     ----------
-    fits : dict<int, float>
-        Dictionary of <individual.id, fitness> pairs.
+    ids : np.ndarray
+        The ids of the individuals in the population.
+    fits : np.ndarray
+        Fitnesses that correspond to `ids`.
     nkeep : int
         The number of individuals to keep. In a GA run, corresponds
         to the sum of each generators number_of_individuals
@@ -21,37 +23,36 @@ def roulette(fits, nkeep, T=None):
         to all fitness values with T.
     """
 
-    ids, fits = zip(*fits.items())
-    ids = list(ids)
-    fits = list(fits)
+    ids = np.asarray(ids)
+    fits = np.asarray(fits, dtype=float)
 
     # Normalize fits from 0 (min fit) to 1 (max fit)
-    fit_max = max(fits)
-    fit_min = min(fits)
-    best_id = ids[fits.index(fit_min)]
+    fit_max = np.max(fits)
+    fit_min = np.min(fits)
 
-    if T is None:
-        fits = np.array([-(fit - fit_max) for fit in fits])
-        fits /= np.nan_to_num(max(fits))
-    else:
-        k = physical_constants['Boltzmann constant in eV/K'][0]
-        fits = np.array([-(fit - fit_min) for fit in fits])
-        fits = np.exp(fits/(k*T))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if T is None:
+            fits = fit_max - fits
+            fits /= np.nan_to_num(np.max(fits))
+        else:
+            k = physical_constants['Boltzmann constant in eV/K'][0]
+            fits = np.exp((fit_min - fits)/(k*T))
 
-    # Generate probabilities and pick individuals
-    p = np.nan_to_num(fits / np.sum(fits))
+        # Generate probabilities and pick individuals
+        p = np.nan_to_num(fits / np.sum(fits))
 
     # If less species have nonzero probability than nkeep, select
     # all nonzero probability and select random zero probability
-    ids_nonzero_p = np.array([i for i, p_i in zip(ids, p) if p_i != 0])
-    ids_zero_p = np.array([i for i, p_i in zip(ids, p) if p_i == 0])
+    nonzero_p = p != 0
+    ids_nonzero_p = ids[nonzero_p]
+    ids_zero_p = ids[~nonzero_p]
 
     if len(ids_nonzero_p) < nkeep:
-        n_zero_p_to_add = nkeep - len(ids_zero_p) - len(ids_nonzero_p)
+        n_zero_p_to_add = nkeep - len(ids_nonzero_p)
         ids_zero_p_keep = np.random.choice(ids_zero_p, n_zero_p_to_add, replace=False)
         to_keep = np.append(ids_nonzero_p, ids_zero_p_keep)
     else:
-        to_keep = np.random.choice(ids_nonzero_p, nkeep, replace=False, p=p)
+        p = p[nonzero_p]
+        to_keep = np.random.choice(ids_nonzero_p, nkeep, replace=False, p=p/np.sum(p))
 
     return to_keep
-
@@ -1,8 +1,9 @@
-import scipy
 import numpy as np
 
+from structopt.tools.sampling import ordinal_ranks, sequential_tournaments
 
-def tournament(fits, nkeep, tournament_size=5):
+
+def tournament(ids, fits, nkeep, tournament_size=5):
     """Selects individuals in seperate "tournaments", where a subset of the
     population are randomly selected and the highest fitness allowed to pass.
     In addition to a population, their fits, and end population size, takes in
@@ -10,8 +11,10 @@ def tournament(fits, nkeep, tournament_size=5):
 
     Parameters
     ----------
-    fits : dict<int, float>
-        Dictionary of <individual.id, fitness> pairs.
+    ids : np.ndarray
+        The ids of the individuals in the population.
+    fits : np.ndarray
+        Fitnesses that correspond to `ids`.
     nkeep : int
         The number of individuals to keep. In a GA run, corresponds
         to the sum of each generators number_of_individuals
@@ -26,23 +29,7 @@ def tournament(fits, nkeep, tournament_size=5):
     # Implementation taken from:  Genetic Algorithms, Tournament Selection, and the Effects of Noise (http://www.complex-systems.com/pdf/09-3-2.pdf)
     # Another reference:  A Comparison of Selection Schemes Used in Evolutionary Algorithms (http://www.tik.ee.ethz.ch/file/6c0e384dceb283cd4301339a895b72b8/TIK-Report11.pdf)
 
-    fits = fits.copy()
-
-    to_keep = []
-    for _ in range(nkeep):
-        # choose k (the tournament size) individuals from the population at random
-        if len(fits) > tournament_size:
-            tournament_ids = np.random.choice(list(fits.keys()),
-                                              size=tournament_size,
-                                              replace=False)
-        else:
-            tournament_ids = list(fits.keys())
-
-        # From a list of fitnesses from the tournament pool, get the id with the lowest fitness
-        best_id = tournament_ids[ np.argmin([fits[id] for id in tournament_ids]) ]
-        # Remove that id from the dictionary so we don't get it again in a later iteration
-        fits.pop(best_id)
-        to_keep.append(best_id)
-
-    return to_keep
-
+    # Each winner is removed from the pool before the next tournament is held
+    ranks = ordinal_ranks(fits)
+    winners = sequential_tournaments(ranks, nkeep, tournament_size)
+    return np.asarray(ids)[winners]
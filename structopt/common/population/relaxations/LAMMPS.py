@@ -1,3 +1,7 @@
+import logging
+
+import numpy as np
+
 from structopt.tools import root, single_core, parallel
 import gparameters
 
@@ -6,21 +10,95 @@ import gparameters
 def relax(population, parameters):
     """Relax the entire population using LAMMPS.
 
+    If the ``fidelity`` parameters are given, every new individual is first
+    relaxed with the loose ``minimize`` criteria of the fidelity parameters.
+    Only the individuals whose loose energy is among the ``top`` best of the
+    loosely relaxed individuals, or within ``margin`` of the energy at which
+    the predators will cut the population, are then relaxed again with the
+    tight ``minimize`` criteria of the kwargs. See ``tighten`` for details.
+
     Args:
         population (Population): the population to relax
     """
 
     to_relax = [individual for individual in population if not individual._relaxed]
+    fidelity = parameters.get('fidelity')
+    if fidelity is None:
+        relax_individuals(population, to_relax, parameters)
+        return
+
+    relax_individuals(population, to_relax, parameters, minimize=fidelity['minimize'])
+    to_tighten = tighten(population, fidelity)
+    relax_individuals(population, to_tighten, parameters)
+
+    message = "Multi-fidelity relaxation: {} loose relaxations, {} tight relaxations".format(len(to_relax), len(to_tighten))
+    logging.getLogger('default').info(message)
+    if gparameters.mpi.rank == 0:
+        print(message)
+
+
+@parallel
+def relax_individuals(population, individuals, parameters, minimize=None):
+    """Relaxes `individuals` of `population` round-robin over the cores and
+    allgathers them."""
     ncores = gparameters.mpi.ncores
     rank = gparameters.mpi.rank
 
     individuals_per_core = {rank: [] for rank in range(ncores)}
-    for i, individual in enumerate(to_relax):
+    for i, individual in enumerate(individuals):
         individuals_per_core[i % ncores].append(individual)
 
     for individual in individuals_per_core[rank]:
-        individual.relaxations.LAMMPS.relax(individual)
+        individual.relaxations.LAMMPS.relax(individual, minimize=minimize)
+        # An individual that already had a fitness has to be evaluated again
+        individual._fitted = False
 
     if parameters.use_mpi4py:
         population.allgather(individuals_per_core)
 
+
+@single_core
+def tighten(population, fidelity):
+    """Returns the loosely relaxed individuals of `population` that need a
+    tight relaxation, in population order.
+
+    The individuals are compared by their LAMMPS energy in the units of the
+    LAMMPS fitness (or per atom if LAMMPS is not a fitness module). An
+    individual is relaxed tightly if it is among the ``top`` loosely relaxed
+    individuals, or if its energy is at most ``margin`` above the energy of
+    the individual the predators would keep last, i.e. the
+    ``initial_number_of_individuals``-th best. Loose survivors of earlier
+    generations are included, so an individual stays loose only as long as
+    it is well behind the rest of the population.
+
+    Args:
+        population (Population): the relaxed population
+        fidelity (dict): the ``fidelity`` parameters
+    """
+    loose = [individual for individual in population if individual.fidelity == 'loose']
+    if not loose:
+        return []
+
+    energies = np.array([energy(individual) for individual in population])
+    nkeep = min(population.initial_number_of_individuals, len(energies))
+    cutoff = np.sort(energies)[nkeep - 1]
+
+    loose_energies = np.array([energy(individual) for individual in loose])
+    top = set(np.argsort(loose_energies, kind='stable')[:fidelity['top']].tolist())
+    return [individual for i, individual in enumerate(loose)
+            if i in top or loose_energies[i] <= cutoff + fidelity['margin']]
+
+
+@single_core
+def energy(individual):
+    """Returns the LAMMPS energy of a relaxed individual in the units of its
+    LAMMPS fitness, or per atom if LAMMPS is not a fitness module."""
+    E = individual.LAMMPS
+    if E is None:
+        return np.inf
+    fitness = getattr(individual.fitnesses, 'LAMMPS', None) if individual.fitnesses is not None else None
+    if fitness is None:
+        return E / len(individual)
+    if individual._fitted:
+        return E  # The fitness has already been referenced and normalized
+    return fitness.normalize(fitness.reference(E, individual), individual)
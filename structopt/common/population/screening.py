@@ -0,0 +1,258 @@
+"""Pre-screening of the offspring before they are relaxed.
+
+Most of the children made by the crossovers and mutations are clearly worse
+than the population, but each of them still costs a full relaxation. When the
+``screening`` parameters are given, the unrelaxed individuals are scored with a
+cheap model after the mutations, and only the best ``fraction`` of them, plus
+a random ``exploration`` fraction of the rest, are kept and relaxed. The others
+are removed from the population before the relaxations run.
+
+The model is chosen with ``model`` and configured with ``kwargs``. The
+built-in models are
+
+* ``pair_potential``: the energy per atom of a short-cutoff Lennard-Jones
+  potential.
+* ``regression``: a ridge regression of the fitness on a histogram of the
+  interatomic distances, trained online on every individual whose fitness was
+  calculated so far. Until ``min_training`` individuals have been seen it
+  does not score anything, and every individual is relaxed.
+
+Any other model can be plugged in by giving its import path, e.g.
+``"mypackage.models.MyModel"``. A model is a class taking the ``kwargs`` that
+subclasses :class:`ScreeningModel`. Scores are compared like fitnesses, so
+lower is better.
+
+The scores are calculated round-robin over the cores and allgathered, and the
+exploration slice is drawn from its own random stream, so every core removes
+the same individuals.
+"""
+
+import math
+import random
+import logging
+import importlib
+
+import numpy as np
+
+import gparameters
+from structopt.tools import parallel, single_core, map_round_robin
+from structopt.tools.cell_list import pairs_within
+from structopt.tools.random_streams import seeded, stream_seed, run_seed
+
+
+def pair_distances(individual, cutoff):
+    """Returns the distances of the pairs of atoms in `individual` closer than
+    `cutoff`, and the weight each pair is counted with. For periodic
+    structures the pairs with the periodic images are found too, and each
+    pair is found from both of its atoms, so it has a weight of 1/2."""
+    positions = individual.get_positions()
+    if not individual.get_pbc().any():
+        i, j, distances = pairs_within(positions, cutoff)
+        return distances, np.ones(len(distances))
+    cell = np.array(individual.get_cell())
+    shifts = [np.dot((a, b, c), cell)
+              for a in ((-1, 0, 1) if individual.pbc[0] else (0,))
+              for b in ((-1, 0, 1) if individual.pbc[1] else (0,))
+              for c in ((-1, 0, 1) if individual.pbc[2] else (0,))]
+    images = np.concatenate([positions + shift for shift in shifts])
+    i, j, distances = pairs_within(positions, cutoff, others=images)
+    distinct = distances > 1e-8
+    distances = distances[distinct]
+    return distances, np.full(len(distances), 0.5)
+
+
+class ScreeningModel(object):
+    """The interface of a screening model."""
+
+    def score(self, individual):
+        """Returns the score of the unrelaxed `individual`, where lower is
+        better, or None if the model cannot score it yet."""
+        raise NotImplementedError
+
+    def train(self, individuals):
+        """Updates the model with `individuals`, which have been relaxed and
+        have a fitness. This is run on every core with the same individuals."""
+        pass
+
+    def state(self):
+        """Returns the state of the model for a checkpoint, as plain Python
+        objects and numpy arrays."""
+        return {}
+
+    def restore(self, state):
+        """Restores the state returned by state()."""
+        pass
+
+
+class PairPotential(ScreeningModel):
+    """Scores an individual with its energy per atom from a Lennard-Jones
+    potential cut off at `cutoff` times `sigma`."""
+
+    def __init__(self, epsilon=0.4, sigma=2.6, cutoff=2.5):
+        self.epsilon = epsilon
+        self.sigma = sigma
+        self.cutoff = cutoff * sigma
+
+    def score(self, individual):
+        if len(individual) == 0:
+            return None
+        distances, weights = pair_distances(individual, self.cutoff)
+        s6 = (self.sigma / distances) ** 6
+        energy = 4 * self.epsilon * np.sum(weights * (s6 ** 2 - s6))
+        return energy / len(individual)
+
+
+class Regression(ScreeningModel):
+    """Predicts the fitness of an individual from a histogram of its
+    interatomic distances with a ridge regression.
+
+    Args:
+        cutoff (float): the longest distance in the histogram
+        bins (int): the number of bins of the histogram
+        alpha (float): the strength of the ridge regularization
+        min_training (int): the number of individuals needed before the model
+            scores anything
+        max_training (int): the number of most recent individuals the model
+            is trained on
+    """
+
+    def __init__(self, cutoff=6.0, bins=30, alpha=1e-3, min_training=20, max_training=2000):
+        self.cutoff = cutoff
+        self.bins = bins
+        self.alpha = alpha
+        self.min_training = min_training
+        self.max_training = max_training
+        self.descriptors = np.zeros((0, bins + 1))
+        self.fitnesses = np.zeros(0)
+        self.weights = None
+
+    def describe(self, individual):
+        """Returns the distance histogram of `individual`, per atom, and a
+        constant term."""
+        distances, weights = pair_distances(individual, self.cutoff)
+        histogram, _ = np.histogram(distances, bins=self.bins, range=(0, self.cutoff), weights=weights)
+        return np.append(histogram / max(len(individual), 1), 1.0)
+
+    def score(self, individual):
+        if self.weights is None:
+            return None
+        return float(np.dot(self.describe(individual), self.weights))
+
+    def train(self, individuals):
+        individuals = [individual for individual in individuals if individual.fitness is not None]
+        if not individuals:
+            return
+        descriptors = map_round_robin(self.describe, individuals)
+        self.descriptors = np.concatenate([self.descriptors, descriptors])[-self.max_training:]
+        self.fitnesses = np.concatenate([self.fitnesses, [individual.fitness for individual in individuals]])[-self.max_training:]
+        if len(self.fitnesses) >= self.min_training:
+            X, y = self.descriptors, self.fitnesses
+            self.weights = np.linalg.solve(np.dot(X.T, X) + self.alpha * np.eye(X.shape[1]), np.dot(X.T, y))
+
+    def state(self):
+        return {'descriptors': self.descriptors, 'fitnesses': self.fitnesses, 'weights': self.weights}
+
+    def restore(self, state):
+        self.descriptors = state['descriptors']
+        self.fitnesses = state['fitnesses']
+        self.weights = state['weights']
+
+
+MODELS = {'pair_potential': PairPotential,
+          'regression': Regression}
+
+
+class Screening(object):
+    """Scores the unrelaxed individuals of a population with a cheap model and
+    removes all but the most promising ones and a random few.
+
+    Args:
+        parameters (dict): the ``screening`` parameters: ``model``, its
+            ``kwargs``, and the ``fraction`` of the individuals kept by
+            score and the ``exploration`` fraction kept at random
+    """
+
+    @single_core
+    def __init__(self, parameters):
+        self.parameters = parameters
+        self.fraction = parameters['fraction']
+        self.exploration = parameters['exploration']
+        self.model = self.load_model(parameters['model'], parameters.get('kwargs') or {})
+        self.screened = 0
+        self.saved = 0
+        self.trained = set()
+
+    @staticmethod
+    def load_model(name, kwargs):
+        """Creates the model `name`, either a built-in model or the import
+        path of a ScreeningModel subclass."""
+        if name in MODELS:
+            Model = MODELS[name]
+        elif '.' in name:
+            module, _, cls = name.rpartition('.')
+            Model = getattr(importlib.import_module(module), cls)
+        else:
+            raise ValueError("Unknown screening model '{}', expected one of {} or an import path".format(name, sorted(MODELS)))
+        return Model(**kwargs)
+
+    @parallel
+    def screen(self, population):
+        """Removes the unrelaxed individuals of `population` that the model
+        does not rank among the best `fraction`, except for a random
+        `exploration` fraction of them.
+
+        Returns:
+            list: the removed individuals
+        """
+        logger = logging.getLogger('default')
+        candidates = [individual for individual in population if not individual._relaxed]
+        if not candidates:
+            return []
+        scores = map_round_robin(self.model.score, candidates)
+        if any(score is None for score in scores):
+            logger.info("Screening: the {} model cannot score yet, relaxing all {} individuals".format(
+                        self.parameters['model'], len(candidates)))
+            return []
+
+        ranked = [candidates[i] for i in np.argsort(scores, kind='stable')]
+        nkeep = min(len(ranked), int(math.ceil(self.fraction * len(ranked))))
+        kept, rest = ranked[:nkeep], ranked[nkeep:]
+        nexplore = min(len(rest), int(round(self.exploration * len(candidates))))
+        with seeded(stream_seed(run_seed(), gparameters.generation, 'screening')):
+            explored = random.sample(rest, nexplore)
+        explored_ids = set(individual.id for individual in explored)
+        removed = [individual for individual in rest if individual.id not in explored_ids]
+        for individual in removed:
+            population.remove(individual)
+
+        self.screened += len(candidates)
+        self.saved += len(removed)
+        message = ("Screening: scored {} individuals, relaxing {} ({} by score, {} explored), "
+                   "saved {} evaluations ({} of {} so far)".format(
+                   len(candidates), len(kept) + len(explored), len(kept), len(explored),
+                   len(removed), self.saved, self.screened))
+        logger.info(message)
+        if gparameters.mpi.rank == 0:
+            print(message)
+        return removed
+
+    @parallel
+    def train(self, population):
+        """Trains the model on the individuals of `population` whose fitness
+        was calculated in this generation."""
+        self.model.train([individual for individual in population if individual.id not in self.trained])
+        self.trained.update(individual.id for individual in population)
+
+    def state(self):
+        """Returns the state of the screening for a checkpoint."""
+        return {'screened': self.screened,
+                'saved': self.saved,
+                'trained': sorted(self.trained),
+                'model': self.model.state()}
+
+    def restore(self, state):
+        """Restores the state returned by state()."""
+        self.screened = state['screened']
+        self.saved = state['saved']
+        self.trained = set(state['trained'])
+        self.model.restore(state['model'])
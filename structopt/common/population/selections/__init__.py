@@ -35,12 +35,17 @@ class Selections(object):
 
 
     @single_core
-    def select(self, population):
-        fits = [individual.fitness for individual in population]
+    def select(self, population, npairs=None):
+        """Returns pairs of parents from `population` chosen with the selected
+        selection. By default half as many pairs as there are individuals
+        are chosen."""
         if self.selected_selection is None:
             return []
+        ids = population.get_column('id')
+        fits = population.get_column('_fitness')
         kwargs = self.kwargs[self.selected_selection]
-        pairs = self.selected_selection(population=population, fits=fits, **kwargs)
+        pairs_id = self.selected_selection(ids=ids, fits=fits, npairs=npairs, **kwargs)
+        pairs = [[population[i], population[j]] for i, j in pairs_id.tolist()]
         self.post_processing(pairs)
         return pairs
 
@@ -52,25 +57,25 @@ class Selections(object):
 
     @staticmethod
     @functools.wraps(random_selection)
-    def random_selection(population, fits):
-        return random_selection(population, fits)
+    def random_selection(ids, fits, npairs=None):
+        return random_selection(ids, fits, npairs)
 
     @staticmethod
     @functools.wraps(rank)
-    def rank(population, fits, p_min=None, unique_pairs=False, unique_parents=False):
-        return rank(population, fits, p_min, unique_pairs, unique_parents)
+    def rank(ids, fits, p_min=None, unique_pairs=False, unique_parents=False, npairs=None):
+        return rank(ids, fits, p_min, unique_pairs, unique_parents, npairs)
 
     @staticmethod
     @functools.wraps(roulette)
-    def roulette(population, fits, unique_pairs=False, unique_parents=False):
-        return roulette(population, fits, unique_pairs, unique_parents)
+    def roulette(ids, fits, unique_pairs=False, unique_parents=False, npairs=None):
+        return roulette(ids, fits, unique_pairs, unique_parents, npairs)
 
     @staticmethod
     @functools.wraps(tournament)
-    def tournament(population, fits, tournament_size=5, unique_pairs=False, unique_parents=False, keep_best=False):
-        return tournament(population, fits, tournament_size, unique_pairs, unique_parents, keep_best)
+    def tournament(ids, fits, tournament_size=5, unique_pairs=False, unique_parents=False, keep_best=False, npairs=None):
+        return tournament(ids, fits, tournament_size, unique_pairs, unique_parents, keep_best, npairs)
 
     @staticmethod
     @functools.wraps(best)
-    def best(population, fits):
-        return best(population, fits)
+    def best(ids, fits, npairs=None):
+        return best(ids, fits, npairs)
@@ -1,31 +1,27 @@
-import scipy.stats
+import numpy as np
 
 
-def best(population, fits):
+def best(ids, fits, npairs=None):
     """Deterministic selection function that chooses adjacently
     ranked individuals as pairs.
 
     Parameters
     ----------
-    population : Population
-        An population of individuals
-    fits : list
-        Fitnesses that corresponds to population
-    """
-
-    # Get ranks of each population value based on its fitness
-    ranks = list(scipy.stats.rankdata(fits, method='ordinal'))
-    ids = [individual.id for individual in population]
-    pairs = []
+    ids : np.ndarray
+        The ids of the individuals in the population
+    fits : np.ndarray
+        Fitnesses that correspond to `ids`
+    npairs : int
+        The number of pairs to select. Defaults to len(ids) // 2.
 
-    for i in range(len(population) // 2):
-        rank_father = 2*i + 1
-        rank_mother = 2*i + 2
-        id_father = ids[ranks.index(rank_father)]
-        id_mother = ids[ranks.index(rank_mother)]
-        father = population[id_father]
-        mother = population[id_mother]
-        pairs.append([father, mother])
-
-    return pairs
+    Returns
+    -------
+    np.ndarray
+        A (npairs, 2) array of the ids of the parents
+    """
 
+    # Sort by fitness; ties keep population order, as ordinal ranking does
+    order = np.argsort(fits, kind='stable')
+    if npairs is None:
+        npairs = len(ids) // 2
+    return np.asarray(ids)[order[:2*npairs]].reshape(npairs, 2)
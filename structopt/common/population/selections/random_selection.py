@@ -1,20 +1,36 @@
-from itertools import combinations
 import random
+import numpy as np
 
 
-def random_selection(population, fits):
+def random_selection(ids, fits, npairs=None):
     """Randomly selects parents
     
     Parameters
     ----------
-    population : Population
-        An population of individuals
-    fits : list
-        Fitnesses that corresponds to population
-    """
+    ids : np.ndarray
+        The ids of the individuals in the population
+    fits : np.ndarray
+        Fitnesses that correspond to `ids`
+    npairs : int
+        The number of pairs to select. Defaults to len(ids) // 2.
 
-    pairs = [pair for pair in combinations(population, 2)]
-    random.shuffle(pairs)
-    pairs = pairs[:len(population) // 2]
-    return pairs
+    Returns
+    -------
+    np.ndarray
+        A (npairs, 2) array of the ids of the parents
+    """
 
+    # Draw npairs distinct pairs out of all N*(N-1)/2 combinations
+    # without building the list of combinations. The index k of a combination
+    # (i, j) in itertools.combinations order is unranked with the offsets at
+    # which each value of i starts.
+    ids = np.asarray(ids)
+    N = len(ids)
+    if npairs is None:
+        npairs = N // 2
+    k = np.array(random.sample(range(N * (N - 1) // 2), npairs), dtype=np.int64)
+    i = np.arange(N - 1, dtype=np.int64)
+    starts = i * (2*N - i - 1) // 2
+    first = np.searchsorted(starts, k, side='right') - 1
+    second = first + 1 + (k - starts[first])
+    return np.column_stack((ids[first], ids[second]))
@@ -1,8 +1,9 @@
 import numpy as np
-from copy import deepcopy
 
+from structopt.tools.sampling import weighted_pairs
 
-def roulette(population, fits, unique_pairs=False, unique_parents=False):
+
+def roulette(ids, fits, unique_pairs=False, unique_parents=False, npairs=None):
     """Selection function that chooses pairs of structures
     based on their fitness. Fitnesses are normalized from 0 to 1.
 
@@ -10,80 +11,36 @@ def roulette(population, fits, unique_pairs=False, unique_parents=False):
 
     Parameters
     ----------
-    population : StructOpt population object
-        An object inherited from list that contains
-        StructOpt individual objects.
-    fits : list
-        A list of fitnesses of the population
+    ids : np.ndarray
+        The ids of the individuals in the population
+    fits : np.ndarray
+        Fitnesses that correspond to `ids`
     unique_pairs : bool
         If True, all combinations of parents are unique.
         True increases the diveristy of the population.
     unique_parents : bool
         If True, all parents can only mate with on other individual.
         True increases the diversity of the population.
-    """
-
-    # Work with indexes of the population instead of the population
-    ids_population = [individual.id for individual in population]
-
-    # Normalize fits from 0 (min fit) to 1 (max fit)
-    fit_max = max(fits)
-    fits = np.array([-(fit - fit_max) for fit in fits])
-    fits /= np.nan_to_num(max(fits))
-
-    # Generate probabilities and pick individuals
-    p = np.nan_to_num(fits / np.sum(fits))
-
-    # Construct list of parents
-    n_pairs = int(len(fits) / 2)
-    pairs_id = []
+    npairs : int
+        The number of pairs to select. Defaults to len(ids) // 2.
 
-    for i in range(n_pairs):
-        # Choose the first parent based on probabilties
-        if np.count_nonzero(p) > 0:
-            id_father = np.random.choice(ids_population, p=p)
-        else:
-            id_father = np.random.choice(ids_population)
-
-        # Choose the second parent based on renormalized probabilities
-        # First remove the father from the population and make a temporary
-        # population for choosing the mother. If unique_parents
-        # is on, remove him from the global population as well.
-        ids_population_temp, p_temp = list(ids_population), list(p)
-        ind_delete = ids_population.index(id_father)
-        del ids_population_temp[ind_delete]
-        p_temp = np.delete(p_temp, ind_delete)
-
-        if unique_parents:
-            del ids_population[ind_delete]
-            p = np.delete(p, ind_delete)
-            p = np.nan_to_num(p / np.sum(p))
-
-        # Now remove mothers that would make repeat father/mother pairs
-        if unique_pairs:
-            for pair in deepcopy(pairs_id):
-                if id_father in pair:
-                    del pair[pair.index(id_father)]
-                    id_mother = pair[0]
-                    ind_delete = ids_population_temp.index(id_mother)
-                    del ids_population_temp[ind_delete]
-                    p_temp = np.delete(p_temp, ind_delete)
-
-        p_temp = np.nan_to_num(p_temp / np.sum(p_temp))
-        if np.count_nonzero(p_temp) > 0:
-            id_mother = np.random.choice(ids_population_temp, p=p_temp)
-        else:
-            id_mother = np.random.choice(ids_population_temp)
-
-        if unique_parents:
-            ind_delete = ids_population.index(id_mother)
-            del ids_population[ind_delete]
-            p = np.delete(p, ind_delete)
-            p = np.nan_to_num(p / np.sum(p))
+    Returns
+    -------
+    np.ndarray
+        A (npairs, 2) array of the ids of the parents
+    """
 
-        pairs_id.append([id_father, id_mother])
+    # Normalize fits from 0 (max fit) to 1 (min fit)
+    fits = np.asarray(fits, dtype=float)
+    fits = np.max(fits) - fits
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fits /= np.nan_to_num(np.max(fits))
 
-    # Construct the parents from the indices
-    pairs = [[population[i], population[j]] for i, j in pairs_id]
+        # Generate probabilities. If every individual has the same fitness the
+        # probabilities are all zero and parents are chosen uniformly.
+        p = np.nan_to_num(fits / np.sum(fits))
 
-    return pairs
+    if npairs is None:
+        npairs = len(fits) // 2
+    pairs = weighted_pairs(p, npairs, unique_pairs, unique_parents)
+    return np.asarray(ids)[pairs]
@@ -1,10 +1,11 @@
-import scipy
 import numpy as np
-from copy import deepcopy
 
+from structopt.tools.sampling import (ordinal_ranks, distinct_rows, tournament_winners,
+                                      sequential_tournaments, redraw_repeated_pairs)
 
-def tournament(population, fits, tournament_size=5, unique_pairs=False,
-               unique_parents=False, keep_best=False):
+
+def tournament(ids, fits, tournament_size=5, unique_pairs=False,
+               unique_parents=False, keep_best=False, npairs=None):
     """Selects pairs in seperate "tournaments", where a subset of the
     population are randomly selected and the highest fitness allowed to pass.
     In addition to a population, their fits, and end population size, takes in
@@ -12,10 +13,10 @@ def tournament(population, fits, tournament_size=5, unique_pairs=False,
 
     Parameters
     ----------
-    population : Population
-        The population of individuals needed to be trimmed
-    fits : list
-        List of fitnesses that correspond to the population.
+    ids : np.ndarray
+        The ids of the individuals in the population
+    fits : np.ndarray
+        Fitnesses that correspond to `ids`
     tournament_size : int
         The number of individuals in each tournament. If 1,
         tournament is the same as random selection. If
@@ -27,64 +28,67 @@ def tournament(population, fits, tournament_size=5, unique_pairs=False,
     unique_parents : bool
         If True, all parents can only mate with on other individual.
         True increases the diversity of the population.
+    keep_best : bool
+        If True, the father of every pair is the best individual that is
+        still available.
+    npairs : int
+        The number of pairs to select. Defaults to len(ids) // 2.
+
+    Returns
+    -------
+    np.ndarray
+        A (npairs, 2) array of the ids of the parents
     """
 
     # Get ranks of each population value based on its fitness
-    ranks = list(scipy.stats.rankdata(fits, method='ordinal'))
-    ids_population = [individual.id for individual in population]
-    id_to_rank = {id: rank for id, rank in zip(ids_population, ranks)}
-    rank_to_id = {rank: id for id, rank in zip(ids_population, ranks)}
-    n_pairs = int(len(fits) / 2)
-    pairs_id = []
-
-    for _ in range(n_pairs):
-        # Perform tournament for father selection
-        if len(ids_population) > tournament_size:
-            tournament_father = np.random.choice(ids_population, tournament_size, replace=False)
-        else:
-            tournament_father = ids_population
-
-        if keep_best:
-            max_rank = min([id_to_rank[id] for id in ids_population])
-        else:
-            max_rank = min([id_to_rank[id] for id in tournament_father])
-        id_father = rank_to_id[max_rank]
-
-        # Choose the second parent based on renormalized probabilities
-        # First remove the father from the population and make a temporary
-        # population for choosing the mother. If unique_parents
-        # is on, remove him from the global population as well.
-        ids_population_temp = deepcopy(ids_population)
-        ind_delete = ids_population.index(id_father)
-        del ids_population_temp[ind_delete]
-
-        if unique_parents:
-            del ids_population[ind_delete]
-
-        # Now remove mothers that would make repeat father/mother pairs
-        if unique_pairs:
-            for pair in deepcopy(pairs_id):
-                if id_father in pair:
-                    del pair[pair.index(id_father)]
-                    id_mother = pair[0]
-                    ind_delete = ids_population_temp.index(id_mother)
-                    del ids_population_temp[ind_delete]
+    ranks = ordinal_ranks(fits)
+    N = len(fits)
+    if npairs is None:
+        npairs = N // 2
 
-        # Using subset, perform tournament to find mother
-        if len(ids_population_temp) > tournament_size:
-            tournament_mother = np.random.choice(ids_population_temp, tournament_size, replace=False)
-        else:
-            tournament_mother = ids_population_temp
-        max_rank = min([id_to_rank[id] for id in tournament_mother])
-        id_mother = rank_to_id[max_rank]
+    if unique_parents:
+        # Every tournament is held among the individuals that have not been
+        # chosen yet, so fathers and mothers are successive tournament winners
+        if not keep_best:
+            pairs = sequential_tournaments(ranks, 2*npairs, tournament_size)
+            return np.asarray(ids)[pairs.reshape(npairs, 2)]
 
-        if unique_parents:
-            ind_delete = ids_population.index(id_mother)
-            del ids_population[ind_delete]
+        order = np.argsort(ranks)
+        removed = np.zeros(N, dtype=bool)
+        pairs = np.empty((npairs, 2), dtype=int)
+        best = 0
+        for i in range(npairs):
+            while removed[order[best]]:
+                best += 1
+            pairs[i, 0] = order[best]
+            removed[pairs[i, 0]] = True
+            pairs[i, 1] = sequential_tournaments(ranks, 1, tournament_size, removed)[0]
+        return np.asarray(ids)[pairs]
 
-        pairs_id.append([id_father, id_mother])
+    # Perform the tournaments for father selection
+    if keep_best:
+        fathers = np.full(npairs, np.argmin(ranks), dtype=int)
+    elif N > tournament_size:
+        fathers = tournament_winners(ranks, distinct_rows(N, tournament_size, npairs))
+    else:
+        fathers = np.full(npairs, np.argmin(ranks), dtype=int)
 
-    pairs = [[population[i], population[j]] for i, j in pairs_id]
+    # Perform the tournaments for mother selection among everyone but the father
+    if N - 1 > tournament_size:
+        candidates = distinct_rows(N - 1, tournament_size, npairs)
+        candidates[candidates >= fathers[:, np.newaxis]] += 1
+        mothers = tournament_winners(ranks, candidates)
+    else:
+        order = np.argsort(ranks)
+        mothers = np.where(fathers == order[0], order[min(1, N - 1)], order[0])
 
-    return pairs
+    pairs = np.column_stack((fathers, mothers))
+    if unique_pairs:
+        def draw_mother(father, excluded):
+            allowed = np.setdiff1d(np.arange(N), excluded)
+            if len(allowed) > tournament_size:
+                allowed = allowed[distinct_rows(len(allowed), tournament_size, 1)[0]]
+            return allowed[np.argmin(ranks[allowed])]
+        redraw_repeated_pairs(pairs, N, draw_mother)
 
+    return np.asarray(ids)[pairs]
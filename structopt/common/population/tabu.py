@@ -0,0 +1,239 @@
+"""A run-wide tabu archive of the structures that have been evaluated.
+
+The fingerprinters only run after the whole population has been relaxed and
+evaluated, so a child that duplicates a structure that was already evaluated
+still costs a full relaxation before it is removed. When the ``tabu``
+parameters are given, the fingerprint of every structure that is relaxed and
+evaluated, both before and after its relaxation, is kept in an archive for
+the rest of the run. Right after the crossovers and mutations every unrelaxed
+individual is looked up in the archive (and among the other unrelaxed
+individuals). A duplicate is mutated again, up to ``retries`` times, and
+removed from the population if it is still a duplicate.
+
+The fingerprint of a structure is its cumulative radial distribution
+function: for every pair of elements, the number of pairs of atoms closer
+than each of ``bins`` distances up to ``cutoff``, per atom. It does not change
+when the structure is translated or rotated or when atoms of the same element
+are exchanged, and it changes little when the atoms move a little. Two
+structures are duplicates if the Euclidean distance between their
+fingerprints is below ``tolerance``. Structures are only compared with
+structures of the same composition.
+
+The fingerprints of each composition are kept in a growing float32 array
+with a k-d tree for the nearest neighbor lookups, which is rebuilt when new
+fingerprints have been added.
+"""
+
+import logging
+from itertools import combinations_with_replacement
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+import gparameters
+from structopt.tools import parallel, single_core, map_round_robin
+from structopt.tools.cell_list import pairs_within
+from structopt.tools.random_streams import seeded, stream_seed, run_seed
+
+
+@single_core
+def fingerprint(individual, cutoff, bins):
+    """Returns the cumulative radial distribution function of `individual`,
+    per atom, for each pair of elements in alphabetical order."""
+    symbols = np.array(individual.get_chemical_symbols())
+    elements = sorted(set(symbols))
+    positions = individual.get_positions()
+    if individual.get_pbc().any():
+        cell = np.array(individual.get_cell())
+        shifts = np.array([np.dot((a, b, c), cell)
+                           for a in ((-1, 0, 1) if individual.pbc[0] else (0,))
+                           for b in ((-1, 0, 1) if individual.pbc[1] else (0,))
+                           for c in ((-1, 0, 1) if individual.pbc[2] else (0,))])
+        images = (positions[None, :, :] + shifts[:, None, :]).reshape(-1, 3)
+        i, j, distances = pairs_within(positions, cutoff, others=images)
+        j = j % len(positions)
+        keep = distances > 1e-8
+        i, j, distances = i[keep], j[keep], distances[keep]
+        weight = 0.5  # Each pair is found from both of its atoms
+    else:
+        i, j, distances = pairs_within(positions, cutoff)
+        weight = 1.0
+
+    edges = np.linspace(0, cutoff, bins + 1)[1:]
+    natoms = max(len(individual), 1)
+    fingerprints = []
+    for a, b in combinations_with_replacement(elements, 2):
+        pair = ((symbols[i] == a) & (symbols[j] == b)) | ((symbols[i] == b) & (symbols[j] == a))
+        counts = np.searchsorted(np.sort(distances[pair]), edges, side='right')
+        fingerprints.append(weight * counts / natoms)
+    return np.concatenate(fingerprints)
+
+
+class FingerprintArchive(object):
+    """The fingerprints of the structures of one composition, in a compact
+    array with a k-d tree for nearest neighbor lookups."""
+
+    def __init__(self, size):
+        self.fingerprints = np.zeros((16, size), dtype=np.float32)
+        self.count = 0
+        self.tree = None
+
+    def add(self, fingerprint):
+        if self.count == len(self.fingerprints):
+            grown = np.zeros((2 * len(self.fingerprints), self.fingerprints.shape[1]), dtype=np.float32)
+            grown[:self.count] = self.fingerprints
+            self.fingerprints = grown
+        self.fingerprints[self.count] = fingerprint
+        self.count += 1
+        self.tree = None
+
+    def distance(self, fingerprint):
+        """Returns the distance from `fingerprint` to the nearest fingerprint
+        in the archive."""
+        if self.count == 0:
+            return np.inf
+        if self.tree is None:
+            self.tree = cKDTree(self.fingerprints[:self.count])
+        distance, _ = self.tree.query(fingerprint.astype(np.float32))
+        return distance
+
+
+class Tabu(object):
+    """Rejects individuals that duplicate a structure that was already evaluated.
+
+    Args:
+        parameters (dict): the ``tabu`` parameters: the ``cutoff`` and number
+            of ``bins`` of the fingerprints, the ``tolerance`` below which two
+            fingerprints are duplicates and the number of ``retries`` to mutate
+            a duplicate before it is removed
+    """
+
+    @single_core
+    def __init__(self, parameters):
+        self.parameters = parameters
+        self.cutoff = parameters['cutoff']
+        self.bins = parameters['bins']
+        self.tolerance = parameters['tolerance']
+        self.retries = parameters['retries']
+        self.archives = {}
+        self.archived = set()
+        self.checked = 0
+        self.avoided = 0
+
+    def fingerprint(self, individual):
+        return fingerprint(individual, self.cutoff, self.bins)
+
+    @single_core
+    def add(self, individual, fingerprint):
+        """Adds the fingerprint of `individual` to the archive."""
+        formula = individual.get_chemical_formula()
+        if formula not in self.archives:
+            self.archives[formula] = FingerprintArchive(len(fingerprint))
+        self.archives[formula].add(fingerprint)
+
+    @single_core
+    def is_duplicate(self, individual, fingerprint, pending):
+        """Returns True if `fingerprint` is within the tolerance of an
+        archived fingerprint or of one of the `pending` (individual,
+        fingerprint) pairs of the individuals accepted so far in this
+        generation."""
+        formula = individual.get_chemical_formula()
+        archive = self.archives.get(formula)
+        if archive is not None and archive.distance(fingerprint) < self.tolerance:
+            return True
+        return any(other.get_chemical_formula() == formula and np.linalg.norm(fingerprint - other_fingerprint) < self.tolerance
+                   for other, other_fingerprint in pending)
+
+    @parallel
+    def screen(self, population):
+        """Mutates or removes the unrelaxed individuals of `population` that
+        duplicate an archived structure or another unrelaxed individual. The
+        individuals are checked in population order, and the mutations use
+        their own random streams, so every core makes the same decisions.
+
+        Returns:
+            list: the removed individuals
+        """
+        candidates = [individual for individual in population if not individual._relaxed]
+        if not candidates:
+            return []
+        fingerprints = map_round_robin(self.fingerprint, candidates)
+
+        seed = run_seed()
+        pending = []
+        removed = []
+        duplicates = 0
+        for individual, fingerprint in zip(candidates, fingerprints):
+            attempt = 0
+            while self.is_duplicate(individual, fingerprint, pending):
+                if attempt == 0:
+                    duplicates += 1
+                if attempt == self.retries or individual.mutations is None or not self.mutate(individual, seed, attempt):
+                    population.remove(individual)
+                    removed.append(individual)
+                    break
+                fingerprint = self.fingerprint(individual)
+                attempt += 1
+            else:
+                pending.append((individual, fingerprint))
+        # Nothing is archived until it has been evaluated (see update), so
+        # the fingerprint before the relaxation is kept on the individual
+        for individual, fingerprint in pending:
+            individual._tabu_fingerprint = fingerprint
+
+        self.checked += len(candidates)
+        self.avoided += duplicates
+        message = ("Tabu: checked {} individuals, found {} duplicates, mutated {} into new structures and removed {}, "
+                   "avoided {} evaluations of duplicates ({} of {} so far)".format(
+                   len(candidates), duplicates, duplicates - len(removed), len(removed), duplicates, self.avoided, self.checked))
+        logging.getLogger('default').info(message)
+        if gparameters.mpi.rank == 0:
+            print(message)
+        return removed
+
+    @single_core
+    def mutate(self, individual, seed, attempt):
+        """Mutates `individual` in place with one of its mutations, chosen
+        from its own random stream. Returns False if no mutation is possible."""
+        mutations = individual.mutations
+        choices = [mutation for mutation, probability in mutations.mutations.items()
+                   if mutation is not None and probability > 0]
+        if not choices:
+            return False
+        with seeded(stream_seed(seed, gparameters.generation, 'tabu', individual.id, attempt)):
+            weights = np.array([mutations.mutations[mutation] for mutation in choices])
+            mutations.selected_mutation = choices[np.random.choice(len(choices), p=weights / weights.sum())]
+            individual.mutate(select_new=False)
+        return True
+
+    @parallel
+    def update(self, population):
+        """Adds the fingerprints of the evaluated individuals of `population`
+        that are not in the archive yet, both before (if it was screened) and
+        after their relaxation."""
+        new = [individual for individual in population if individual._fitted and individual.id not in self.archived]
+        for individual, fingerprint in zip(new, map_round_robin(self.fingerprint, new)):
+            unrelaxed = getattr(individual, '_tabu_fingerprint', None)
+            if unrelaxed is not None:
+                self.add(individual, unrelaxed)
+                individual._tabu_fingerprint = None
+            self.add(individual, fingerprint)
+        self.archived.update(individual.id for individual in new)
+
+    def state(self):
+        """Returns the state of the archive for a checkpoint."""
+        return {'archives': {formula: archive.fingerprints[:archive.count].copy() for formula, archive in self.archives.items()},
+                'archived': sorted(self.archived),
+                'checked': self.checked,
+                'avoided': self.avoided}
+
+    def restore(self, state):
+        """Restores the state returned by state()."""
+        self.archives = {}
+        for formula, fingerprints in state['archives'].items():
+            archive = self.archives[formula] = FingerprintArchive(fingerprints.shape[1])
+            for fingerprint in fingerprints:
+                archive.add(fingerprint)
+        self.archived = set(state['archived'])
+        self.checked = state['checked']
+        self.avoided = state['avoided']
@@ -5,15 +5,13 @@ from ase import Atom, Atoms
 from ase.visualize import view
 from ase.data import atomic_numbers, reference_states
 
-from structopt.tools import random_three_vector
-from structopt.common.crossmodule import get_particle_radius
+from structopt.common.crossmodule import get_particle_radius, random_points_in_ellipsoid
 
-def sphere(atomlist, fill_factor=0.74, radius=None, cell=None):
+def sphere(atomlist, fill_factor=0.74, radius=None, cell=None, min_dist=None):
     """Generates a random sphere of particles given an
     atomlist and radius. If radius is None, one is 
-    automatically estimated. min_dist and tries_b4_expand
-    are parameters that govern how stricly the proximity
-    of atoms are enforced.
+    automatically estimated. If min_dist is given, no two
+    atoms are placed closer than min_dist to each other.
     """
 
     if radius is None:
@@ -26,9 +24,7 @@ def sphere(atomlist, fill_factor=0.74, radius=None, cell=None):
 
     random.shuffle(chemical_symbols)
 
-    unit_vec = np.array([random_three_vector() for i in range(len(chemical_symbols))])
-    D = radius * np.random.sample(size=len(chemical_symbols)) ** (1.0/3.0)
-    positions = np.array([D]).T * unit_vec
+    positions = random_points_in_ellipsoid(len(chemical_symbols), [radius] * 3, min_dist)
 
     indiv = Atoms(symbols=chemical_symbols, positions=positions)
 
@@ -0,0 +1,67 @@
+"""A background thread for writing output files off the critical path."""
+
+import atexit
+import queue
+import threading
+
+
+class BackgroundWriter(object):
+    """Runs write tasks one at a time, in the order they were submitted, on a
+    background thread.
+
+    The queue of tasks is bounded, so if the files are written more slowly
+    than the tasks are submitted, :meth:`submit` blocks until there is room
+    instead of letting the snapshots pile up in memory. An exception raised
+    by a task is raised again in the submitting thread by the next call to
+    :meth:`submit`, :meth:`flush` or :meth:`close`, and the tasks after it are
+    skipped. The writer is flushed and closed when the interpreter exits.
+
+    Args:
+        maxsize (int): the maximum number of tasks waiting to be written
+    """
+
+    def __init__(self, maxsize=4):
+        self.queue = queue.Queue(maxsize)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name='BackgroundWriter', daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def _run(self):
+        while True:
+            task = self.queue.get()
+            try:
+                if task is None:
+                    return
+                function, args = task
+                if self.error is None:
+                    function(*args)
+            except BaseException as error:
+                self.error = error
+            finally:
+                self.queue.task_done()
+
+    def _raise(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def submit(self, function, *args):
+        """Queues `function(*args)` to be run on the background thread."""
+        self._raise()
+        if not self.thread.is_alive():
+            raise RuntimeError("The background writer has been closed")
+        self.queue.put((function, args))
+
+    def flush(self):
+        """Waits until every submitted task has been written."""
+        if self.thread.is_alive():
+            self.queue.join()
+        self._raise()
+
+    def close(self):
+        """Writes the remaining tasks and stops the background thread."""
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        self._raise()
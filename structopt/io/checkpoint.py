@@ -0,0 +1,96 @@
+"""Binary checkpoints of the state of an optimizer.
+
+A checkpoint holds everything needed to continue a run exactly where it
+stopped: the per-atom arrays, cell, pbc, fitnesses, flags and genealogy tags
+of every individual, the population's id counter, the generation, the timing,
+the run's seed, and the ``random`` and ``np.random`` states of every core.
+Optimizers add their own state (e.g. the best particles of a PSO) under the
+``optimizer`` key.
+
+Checkpoints are pickled dictionaries of plain Python objects and numpy
+arrays, so they are small and fast to read and write. They are written to a
+temporary file first and then renamed, so a job that is killed while writing
+a checkpoint leaves the previous one intact.
+"""
+
+import os
+import pickle
+import importlib
+
+import numpy as np
+
+import gparameters
+
+CHECKPOINT_FILENAME = 'checkpoint.pkl'
+
+# Attributes saved for every individual, in addition to the fitness modules
+INDIVIDUAL_ATTRIBUTES = ['_fitness', '_relaxed', '_fitted', 'fidelity', 'crossover_tag', 'mutation_tag', 'mutated_from']
+
+
+def checkpoint_filename(restart):
+    """Returns the checkpoint file to restart from, given either the file
+    itself or the logging directory of the run that wrote it. With islands,
+    each island restarts from the checkpoint in its own subdirectory."""
+    if os.path.isfile(restart):
+        return restart
+    if gparameters.get('islands') is not None:
+        restart = os.path.join(restart, 'island{}'.format(gparameters.mpi.island))
+    return os.path.join(restart, CHECKPOINT_FILENAME)
+
+
+def individual_state(individual):
+    """Returns the state of `individual` as a dictionary."""
+    attributes = {name: getattr(individual, name) for name in INDIVIDUAL_ATTRIBUTES if hasattr(individual, name)}
+    if individual.fitnesses is not None:
+        for module in individual.fitnesses.module_names:
+            attributes[module] = getattr(individual, module, None)
+    return {'id': individual.id,
+            'cell': np.array(individual.get_cell()),
+            'pbc': individual.get_pbc().copy(),
+            'arrays': {name: array.copy() for name, array in individual.arrays.items()},
+            'attributes': attributes}
+
+
+def restore_individual(state, parameters):
+    """Creates an individual from a state returned by individual_state."""
+    structure_type = parameters.structure_type.lower()
+    module = importlib.import_module('structopt.{}'.format(structure_type))
+    Structure = getattr(module, structure_type.title())
+    individual = Structure(id=state['id'],
+                           relaxation_parameters=parameters.relaxations,
+                           fitness_parameters=parameters.fitnesses,
+                           mutation_parameters=parameters.mutations,
+                           pso_moves_parameters=parameters.pso_moves,
+                           generator_parameters=None)
+    individual.set_cell(state['cell'])
+    individual.set_pbc(state['pbc'])
+    individual.arrays = {name: array.copy() for name, array in state['arrays'].items()}
+    for name, value in state['attributes'].items():
+        setattr(individual, name, value)
+    return individual
+
+
+def save_checkpoint(filename, checkpoint):
+    """Writes `checkpoint` to `filename`, replacing any previous checkpoint."""
+    os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+    tmp_filename = '{}.{}.tmp'.format(filename, os.getpid())
+    with open(tmp_filename, 'wb') as f:
+        pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_filename, filename)
+
+
+def load_checkpoint(filename):
+    """Reads a checkpoint written by save_checkpoint."""
+    with open(filename, 'rb') as f:
+        return pickle.load(f)
+
+
+def load_population(checkpoint, parameters):
+    """Creates the population saved in `checkpoint`."""
+    from structopt.common.population import Population
+
+    individuals = [restore_individual(state, parameters) for state in checkpoint['population']]
+    population = Population(parameters=parameters, individuals=individuals)
+    population._max_individual_id = checkpoint['max_individual_id']
+    population.initial_number_of_individuals = checkpoint['initial_number_of_individuals']
+    return population
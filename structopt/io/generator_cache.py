@@ -0,0 +1,36 @@
+import os
+import json
+import hashlib
+
+import numpy as np
+
+
+def generator_key(structure_type, generator, kwargs, seed):
+    """Returns the name of the cache entry for the structure made by
+    `generator` with `kwargs` from the random stream seeded with `seed`."""
+    description = json.dumps([structure_type, generator, kwargs, seed], sort_keys=True, default=str)
+    return '{}-{}'.format(generator, hashlib.sha1(description.encode()).hexdigest())
+
+
+def load_generated(directory, key):
+    """Loads the per-atom arrays, cell and pbc of a cached structure.
+
+    Returns:
+        dict: the arrays with 'cell' and 'pbc' added, or None if the entry does not exist
+    """
+    filename = os.path.join(directory, '{}.npz'.format(key))
+    if not os.path.exists(filename):
+        return None
+    with np.load(filename) as data:
+        return {name: data[name] for name in data.files}
+
+
+def save_generated(directory, key, atoms):
+    """Saves the per-atom arrays, cell and pbc of `atoms` as a cache entry."""
+    os.makedirs(directory, exist_ok=True)
+    filename = os.path.join(directory, '{}.npz'.format(key))
+    # Write to a temporary file first so that a core reading the cache
+    # never sees a partially written entry
+    tmp_filename = '{}.{}.tmp.npz'.format(filename[:-len('.npz')], os.getpid())
+    np.savez(tmp_filename, cell=np.array(atoms.get_cell()), pbc=atoms.get_pbc(), **atoms.arrays)
+    os.replace(tmp_filename, filename)
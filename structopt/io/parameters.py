@@ -10,7 +10,7 @@ import distutils.spawn
 from structopt.tools.dictionaryobject import DictionaryObject
 
 MODULES = ['relaxations', 'fitnesses', 'mutations', 'generators', 'crossovers', 'selections', 'predators', 'fingerprinters', 'pso_moves']
-EXCEPTION_FUNCTIONS = ['preserve_best', 'keep_original', 'keep_original_best', 'keep_best']
+EXCEPTION_FUNCTIONS = ['preserve_best', 'keep_original', 'keep_original_best', 'keep_best', 'overlap_cutoff']
 
 def read(input):
     """Sets StructOpt parameters from a dictionary or filename"""
@@ -102,11 +102,56 @@ def set_default(parameters):
     parameters.setdefault('post_processing', DictionaryObject({}))
     if 'post_processing' in parameters:
         parameters.post_processing.setdefault('XYZs', -1)
+        parameters.post_processing.setdefault('structures', 'xyz')
+        parameters.post_processing.setdefault('asynchronous', True)
     parameters.setdefault('fingerprinters', DictionaryObject({}))
     if 'convergence' in parameters:
         parameters.convergence.setdefault('max_generations', 10)
+        parameters.convergence.setdefault('stagnation_generations', None)
+        parameters.convergence.setdefault('stagnation_tolerance', 0.0)
+        parameters.convergence.setdefault('stagnation_top', 5)
+        parameters.convergence.setdefault('min_diversity', None)
+        parameters.convergence.setdefault('diversity_fingerprinter', None)
+        parameters.convergence.setdefault('max_hours', None)
+        parameters.convergence.setdefault('max_core_hours', None)
     if 'fingerprinters' in parameters:
         parameters.fingerprinters.setdefault('keep_best', False)
+    parameters.setdefault('pipeline', 'staged')
+    parameters.setdefault('checkpoint', None)
+    parameters.setdefault('tabu', None)
+    if parameters.tabu is not None:
+        parameters.tabu.setdefault('cutoff', 6.0)
+        parameters.tabu.setdefault('bins', 60)
+        parameters.tabu.setdefault('tolerance', 0.05)
+        parameters.tabu.setdefault('retries', 2)
+    parameters.setdefault('screening', None)
+    if parameters.screening is not None:
+        parameters.screening.setdefault('model', 'pair_potential')
+        parameters.screening.setdefault('kwargs', {})
+        parameters.screening.setdefault('fraction', 0.5)
+        parameters.screening.setdefault('exploration', 0.1)
+    parameters.setdefault('adaptive_operators', None)
+    if parameters.adaptive_operators is not None:
+        parameters.adaptive_operators.setdefault('method', 'probability_matching')
+        parameters.adaptive_operators.setdefault('floor', 0.05)
+        parameters.adaptive_operators.setdefault('ceiling', 0.9)
+        parameters.adaptive_operators.setdefault('decay', 0.3)
+        parameters.adaptive_operators.setdefault('exploration', 1.0)
+        parameters.adaptive_operators.setdefault('modules', ['mutations', 'crossovers', 'predators', 'fingerprinters'])
+    parameters.setdefault('restart', None)
+    parameters.setdefault('tracing', False)
+    parameters.setdefault('mpi_accounting', False)
+    parameters.setdefault('profiling', None)
+    if parameters.profiling is not None:
+        parameters.profiling.setdefault('cprofile', None)
+        parameters.profiling.setdefault('tracemalloc', None)
+        parameters.profiling.setdefault('subprocesses', False)
+    parameters.setdefault('islands', None)
+    if parameters.islands is not None:
+        parameters.islands.setdefault('number_of_islands', 1)
+        parameters.islands.setdefault('migration_interval', 5)
+        parameters.islands.setdefault('number_of_migrants', 1)
+        parameters.islands.setdefault('topology', 'ring')
 
 
     try:
@@ -119,6 +164,14 @@ def set_default(parameters):
         parameters.fitnesses.LAMMPS.normalize.setdefault('natoms', True)
     except:
         pass
+    try:
+        # The multi-fidelity schedule of the LAMMPS relaxation
+        if parameters.relaxations.LAMMPS.get('fidelity') is not None:
+            parameters.relaxations.LAMMPS.fidelity.setdefault('minimize', '1e-4 1e-4 100 1000')
+            parameters.relaxations.LAMMPS.fidelity.setdefault('top', 1)
+            parameters.relaxations.LAMMPS.fidelity.setdefault('margin', 0.0)
+    except:
+        pass
     try:
         # Set default STEM normalization to E = E/nprotons
         parameters.fitnesses.STEM.setdefault("normalize", {})
@@ -0,0 +1,175 @@
+"""An append-only, columnar binary store for the per-generation output of a run.
+
+The store lives in the ``store`` directory of the logging path, next to the
+text logs. It holds a number of tables, each a subdirectory with one raw
+binary file per column and a ``columns.json`` file with the names and numpy
+dtypes of the columns. Every call to :meth:`RunStore.append` adds the same
+number of rows to every column of a table, so a table can be read back with
+a single ``np.memmap`` per column instead of parsing the text logs. If a run
+is killed in the middle of an append, the columns are cut to their common
+length when they are read. String columns are stored as fixed-width bytes and
+are widened in place when a longer string is appended, so tags are never
+truncated.
+
+The genetic algorithms write these tables:
+
+``individuals``
+    One row per individual per generation: ``generation``, ``id``, the total
+    ``fitness``, one ``fitness.<module>`` column per fitness module, the
+    ``crossover`` tag with its parents ``parent1`` and ``parent2``, and the
+    ``mutation`` tag with the id it was ``mutated_from``. Missing tags are
+    empty strings and missing parents are -1.
+``timing``
+    One row per generation: ``generation`` and the time spent in each
+    operation.
+``operators``
+    With the ``adaptive_operators`` parameters, one row per generation:
+    ``generation`` and the probability of each adapted operator in a
+    ``<module>.<operator>`` column.
+"""
+
+import os
+import json
+
+import numpy as np
+
+STORE_DIRECTORY = 'store'
+# The minimum width of the string (tag) columns
+TAG_DTYPE = 'S16'
+
+
+class RunStore(object):
+    """Reads and appends to the columnar store of a run.
+
+    Args:
+        path (str): the logging directory of the run
+    """
+
+    def __init__(self, path):
+        self.path = os.path.join(path, STORE_DIRECTORY)
+
+    @staticmethod
+    def exists(path):
+        """Returns True if the run in the logging directory `path` has a store."""
+        return os.path.isdir(os.path.join(path, STORE_DIRECTORY))
+
+    def tables(self):
+        """Returns the names of the tables in the store."""
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(table for table in os.listdir(self.path)
+                      if os.path.exists(os.path.join(self.path, table, 'columns.json')))
+
+    def columns(self, table):
+        """Returns the (name, dtype) pairs of the columns of `table`."""
+        with open(os.path.join(self.path, table, 'columns.json')) as f:
+            return [(name, np.dtype(dtype)) for name, dtype in json.load(f)]
+
+    def append(self, table, columns):
+        """Appends rows to `table`, creating it if it does not exist.
+
+        Args:
+            table (str): the name of the table
+            columns (list): (name, values) pairs. Every column must have the
+                same number of values. The dtypes of the columns are fixed by
+                the first append to the table, except that string columns
+                are widened to fit longer strings.
+        """
+        directory = os.path.join(self.path, table)
+        names = [name for name, _ in columns]
+        values = [np.asarray(value) for _, value in columns]
+        if len(set(len(value) for value in values)) > 1:
+            raise ValueError("All of the columns appended to '{}' must have the same length".format(table))
+        values = [np.char.encode(value) if value.dtype.kind == 'U' else value for value in values]
+
+        if not os.path.exists(os.path.join(directory, 'columns.json')):
+            os.makedirs(directory, exist_ok=True)
+            schema = [(name, _string_dtype(value) if value.dtype.kind == 'S' else value.dtype.str)
+                      for name, value in zip(names, values)]
+            self._write_columns(table, schema)
+        schema = self.columns(table)
+        if [name for name, _ in schema] != names:
+            raise ValueError("Columns {} do not match the columns {} of table '{}'"
+                             .format(names, [name for name, _ in schema], table))
+
+        # Widen the string columns that are too narrow for the new values
+        # before anything is appended
+        widened = False
+        for i, ((name, dtype), value) in enumerate(zip(schema, values)):
+            if dtype.kind == 'S' and value.dtype.kind == 'S' and value.dtype.itemsize > dtype.itemsize:
+                schema[i] = (name, np.dtype(_string_dtype(value)))
+                self._widen(table, name, dtype, schema[i][1])
+                widened = True
+        if widened:
+            self._write_columns(table, [(name, dtype.str) for name, dtype in schema])
+
+        for (name, dtype), value in zip(schema, values):
+            with open(os.path.join(directory, '{}.bin'.format(name)), 'ab') as f:
+                f.write(value.astype(dtype).tobytes())
+
+    def _write_columns(self, table, schema):
+        with open(os.path.join(self.path, table, 'columns.json'), 'w') as f:
+            json.dump(schema, f)
+
+    def _widen(self, table, name, dtype, new_dtype):
+        """Rewrites the column `name` of `table` from `dtype` to the wider `new_dtype`."""
+        filename = os.path.join(self.path, table, '{}.bin'.format(name))
+        nrows = os.path.getsize(filename) // dtype.itemsize
+        values = np.fromfile(filename, dtype=dtype, count=nrows)
+        with open(filename + '.tmp', 'wb') as f:
+            f.write(values.astype(new_dtype).tobytes())
+        os.replace(filename + '.tmp', filename)
+
+    def read(self, table, columns=None):
+        """Reads columns of `table`.
+
+        Args:
+            table (str): the name of the table
+            columns (list): the names of the columns to read. By default every
+                column is read.
+
+        Returns:
+            dict: {name: np.ndarray} for every column. Numeric columns are
+                read-only memory maps of the files, and tag columns are
+                converted to str.
+        """
+        directory = os.path.join(self.path, table)
+        schema = self.columns(table)
+        nrows = min(os.path.getsize(os.path.join(directory, '{}.bin'.format(name))) // dtype.itemsize
+                    for name, dtype in schema)
+        data = {}
+        for name, dtype in schema:
+            if columns is not None and name not in columns:
+                continue
+            if nrows == 0:
+                values = np.empty(0, dtype=dtype)
+            else:
+                values = np.memmap(os.path.join(directory, '{}.bin'.format(name)), dtype=dtype, mode='r', shape=(nrows,))
+            if dtype.kind == 'S':
+                values = np.char.decode(np.asarray(values))
+            data[name] = values
+        return data
+
+
+def _string_dtype(value):
+    """Returns the dtype of a string column that fits the bytes in `value`."""
+    return 'S{}'.format(max(value.dtype.itemsize, np.dtype(TAG_DTYPE).itemsize))
+
+
+def split_tags(individual):
+    """Splits the genealogy tags of `individual`, e.g. 'cRo(3+5)' and
+    'mRat(4)', into their operators and parent ids.
+
+    Returns:
+        tuple: (crossover, parent1, parent2, mutation, mutated_from), with ''
+            for a missing tag and -1 for a missing parent
+    """
+    crossover, parent1, parent2 = '', -1, -1
+    if individual.crossover_tag:
+        crossover, parents = individual.crossover_tag[1:-1].split('(')
+        parent1, parent2 = (int(parent) for parent in parents.split('+'))
+    mutation, mutated_from = '', -1
+    if individual.mutation_tag:
+        mutation, parent = individual.mutation_tag[1:-1].split('(')
+        mutated_from = int(parent) if parent.isdigit() else -1
+    return crossover, parent1, parent2, mutation, mutated_from
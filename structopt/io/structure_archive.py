@@ -0,0 +1,156 @@
+"""A chunked binary archive of the structures of a run.
+
+By default the structure of every individual is written to its own
+``modelfiles/individual<id>.xyz`` file. With ``"structures": "archive"`` in
+the ``post_processing`` parameters the structures are instead appended to a
+single archive in the ``structures`` directory of the logging path, which
+keeps long runs from creating hundreds of thousands of small files.
+
+The archive consists of chunk files holding the positions (float64) and
+atomic numbers (int32) of many structures back to back, and an index with one
+record per structure: its id, the chunk and atom offset of its data, its
+number of atoms, and its cell and pbc. A new chunk is started once the
+positions of the current chunk exceed ``chunk_size`` bytes. The index record
+is written after the data, so an interrupted append never leaves a record
+pointing at missing data. The next append takes its offset from the last
+record and cuts the chunk files and the index back to the data of the
+records before writing, so anything left over by an interrupted append is
+overwritten. Structures are read through memory maps of the
+chunk files, so reading one structure does not read the rest of the archive.
+"""
+
+import os
+
+import numpy as np
+from ase import Atoms
+import ase.io
+
+import gparameters
+
+ARCHIVE_DIRECTORY = 'structures'
+INDEX_DTYPE = np.dtype([('id', '<i8'), ('chunk', '<i8'), ('offset', '<i8'), ('natoms', '<i8'),
+                        ('cell', '<f8', (3, 3)), ('pbc', '?', (3,))])
+
+
+def _append(filename, size, data):
+    """Cuts `filename` back to `size` bytes and appends `data` to it."""
+    with open(filename, 'ab') as f:
+        f.truncate(size)
+        f.write(data)
+
+
+def archiving():
+    """Returns True if the run writes its structures to the archive instead of to xyz files."""
+    return gparameters.get('post_processing', {}).get('structures', 'xyz') == 'archive'
+
+
+class StructureArchive(object):
+    """Appends structures to, and reads them from, the archive of a run.
+
+    Args:
+        path (str): the logging directory of the run
+        chunk_size (int): the size in bytes of the positions in a chunk
+            after which a new chunk is started
+    """
+
+    def __init__(self, path, chunk_size=2**28):
+        self.path = os.path.join(path, ARCHIVE_DIRECTORY)
+        self.chunk_size = chunk_size
+        self._index = np.empty(0, dtype=INDEX_DTYPE)
+        self._rows = {}
+        self._index_size = 0
+
+    @staticmethod
+    def exists(path):
+        """Returns True if the run in the logging directory `path` has an archive."""
+        return os.path.exists(os.path.join(path, ARCHIVE_DIRECTORY, 'index.bin'))
+
+    def _filename(self, chunk, name):
+        return os.path.join(self.path, 'chunk{:05d}.{}.bin'.format(chunk, name))
+
+    def _load_index(self):
+        """Reads the index again if another process has appended to it."""
+        filename = os.path.join(self.path, 'index.bin')
+        size = os.path.getsize(filename) if os.path.exists(filename) else 0
+        size -= size % INDEX_DTYPE.itemsize
+        if size != self._index_size:
+            self._index = np.fromfile(filename, dtype=INDEX_DTYPE, count=size // INDEX_DTYPE.itemsize)
+            self._rows = {id: row for row, id in enumerate(self._index['id'].tolist())}
+            self._index_size = size
+        return self._index
+
+    def ids(self):
+        """Returns the ids of the archived structures in the order they were added."""
+        return [int(id) for id in self._load_index()['id']]
+
+    def __contains__(self, id):
+        self._load_index()
+        return id in self._rows
+
+    def __len__(self):
+        return len(self._load_index())
+
+    def append(self, id, atoms):
+        """Adds the positions, atomic numbers, cell and pbc of `atoms` to the archive under `id`."""
+        os.makedirs(self.path, exist_ok=True)
+        index = self._load_index()
+        if len(index) > 0:
+            chunk = int(index['chunk'][-1])
+            offset = int(index['offset'][-1] + index['natoms'][-1])
+        else:
+            chunk = offset = 0
+        if offset * 24 >= self.chunk_size:
+            chunk += 1
+            offset = 0
+
+        _append(self._filename(chunk, 'positions'), offset * 24,
+                np.ascontiguousarray(atoms.get_positions(), dtype='<f8').tobytes())
+        _append(self._filename(chunk, 'numbers'), offset * 4,
+                np.ascontiguousarray(atoms.get_atomic_numbers(), dtype='<i4').tobytes())
+
+        record = np.zeros(1, dtype=INDEX_DTYPE)
+        record['id'] = id
+        record['chunk'] = chunk
+        record['offset'] = offset
+        record['natoms'] = len(atoms)
+        record['cell'] = np.array(atoms.get_cell())
+        record['pbc'] = atoms.get_pbc()
+        _append(os.path.join(self.path, 'index.bin'), self._index_size, record.tobytes())
+
+    def _record(self, id):
+        self._load_index()
+        if id not in self._rows:
+            raise KeyError(id)
+        return self._index[self._rows[id]]
+
+    def positions(self, id):
+        """Returns a read-only memory map of the positions of structure `id`."""
+        record = self._record(id)
+        return np.memmap(self._filename(record['chunk'], 'positions'), dtype='<f8', mode='r',
+                         offset=int(record['offset']) * 24, shape=(int(record['natoms']), 3))
+
+    def numbers(self, id):
+        """Returns a read-only memory map of the atomic numbers of structure `id`."""
+        record = self._record(id)
+        return np.memmap(self._filename(record['chunk'], 'numbers'), dtype='<i4', mode='r',
+                         offset=int(record['offset']) * 4, shape=(int(record['natoms']),))
+
+    def read(self, id):
+        """Returns structure `id` as an Atoms object."""
+        record = self._record(id)
+        if record['natoms'] == 0:
+            return Atoms(cell=record['cell'], pbc=record['pbc'])
+        return Atoms(numbers=np.array(self.numbers(id)), positions=np.array(self.positions(id)),
+                     cell=record['cell'], pbc=record['pbc'])
+
+    def export_xyz(self, filename, ids=None):
+        """Writes structures to an xyz file, one frame per structure.
+
+        Args:
+            filename (str): the xyz file to write
+            ids (list): the ids of the structures to write. By default all of
+                them are written.
+        """
+        if ids is None:
+            ids = self.ids()
+        ase.io.write(filename, [self.read(id) for id in ids], format='xyz', parallel=False)
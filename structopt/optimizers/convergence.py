@@ -0,0 +1,185 @@
+"""The convergence criteria of the optimizers.
+
+The ``convergence`` parameters can combine any of these criteria, and the run
+stops as soon as one of them is met:
+
+* ``max_generations``: the number of generations to run.
+* ``stagnation_generations``: stop when, in that many generations, neither
+  the best fitness nor the mean of the ``stagnation_top`` best fitnesses has
+  improved by more than ``stagnation_tolerance`` on the best values before
+  them.
+* ``min_diversity``: stop when the fraction of distinct structures in the
+  population falls below this. Two individuals are the same structure if the
+  ``diversity_fingerprinter`` (by default the first of the ``fingerprinters``
+  parameters, with its kwargs) says they are.
+* ``max_hours`` and ``max_core_hours``: stop before the wall time or the
+  core-hours (the wall time times the number of cores) of the run would
+  exceed the budget, assuming that the next generation takes as long as the
+  longest one so far. The time is counted from the start of the optimizer,
+  so a restarted run gets a new budget.
+
+The decision is made on the root and broadcast, so every core stops after
+the same generation. When the run stops before ``max_generations``, the
+genetic algorithm and the particle swarm optimization write a final
+checkpoint even if no ``checkpoint`` parameters are given, so the run can be
+continued with ``restart``. With islands, the islands stop together when any of
+them has converged.
+"""
+
+import time
+import logging
+from itertools import combinations
+
+import numpy as np
+
+import gparameters
+from structopt.tools import single_core, parallel, get_comm, disjoint_set_merge
+from structopt.tools.islands import first_island
+
+
+class Convergence(object):
+    """Decides when an optimizer has converged.
+
+    Args:
+        parameters (dict): the ``convergence`` parameters
+        population (Population): the population, whose fingerprinters are
+            used for the diversity
+    """
+
+    @single_core
+    def __init__(self, parameters, population):
+        self.parameters = parameters
+        self.max_generations = parameters['max_generations']
+        self.stagnation_generations = parameters.get('stagnation_generations')
+        self.stagnation_tolerance = parameters.get('stagnation_tolerance', 0.0)
+        self.stagnation_top = parameters.get('stagnation_top', 5)
+        self.min_diversity = parameters.get('min_diversity')
+        self.max_hours = parameters.get('max_hours')
+        self.max_core_hours = parameters.get('max_core_hours')
+
+        self.fingerprinter = None
+        if self.min_diversity is not None:
+            self.fingerprinter, self.fingerprinter_kwargs = self.load_fingerprinter(parameters.get('diversity_fingerprinter'), population)
+
+        self.ncores = gparameters.mpi.get('world_ncores', gparameters.mpi.ncores)
+        self._t_start = time.time()
+        self._t_last = self._t_start
+        self.longest_generation = 0.0
+
+        # The best fitness and the mean of the best fitnesses of each generation
+        self.best = []
+        self.top_mean = []
+        self.diversity = None
+        self.criterion = None
+        self.reason = None
+
+    @staticmethod
+    def load_fingerprinter(name, population):
+        """Returns the fingerprinter function `name` of the population and its
+        kwargs, or the first fingerprinter in the parameters if `name` is None."""
+        fingerprinters = getattr(population, 'fingerprinters', None)
+        parameters = population.parameters.get('fingerprinters') or {}
+        names = [fingerprinter for fingerprinter in parameters if fingerprinter != 'keep_best']
+        if fingerprinters is None or (name is None and not names):
+            raise ValueError("'min_diversity' in 'convergence' needs a fingerprinter, but none is given")
+        if name is None:
+            name = names[0]
+        kwargs = parameters[name].get('kwargs', {}) if name in parameters else {}
+        return getattr(fingerprinters, name), kwargs
+
+    @parallel
+    def check(self, population, fitnesses, serial=False):
+        """Returns the reason the optimizer should stop after this
+        generation, or None if it should go on. This must be called on every
+        core at the end of every generation, unless `serial` is True, in which
+        case nothing is communicated (e.g. on the coordinator of the
+        steady-state GA).
+
+        Args:
+            population (Population): the population at the end of the generation
+            fitnesses (list<float>): the fitnesses to check for stagnation
+            serial (bool): whether only this core is checking
+        """
+        if self.fingerprinter is not None and len(population) > 1:
+            self.diversity = self.measure_diversity(population, serial)
+        stop = None
+        if serial or gparameters.mpi.rank == 0:
+            stop = self.decide(fitnesses, self.diversity)
+        if not serial:
+            if gparameters.mpi.ncores > 1:
+                stop = get_comm().bcast(stop, root=0)
+            stop = first_island(stop)
+        self.criterion, self.reason = stop or (None, None)
+        if self.reason is not None:
+            message = "Stopping after generation {}: {}".format(gparameters.generation, self.reason)
+            logging.getLogger('default').info(message)
+            if gparameters.mpi.rank == 0:
+                print(message)
+        return self.reason
+
+    @parallel
+    def measure_diversity(self, population, serial=False):
+        """Returns the fraction of the individuals of `population` that are
+        distinct structures according to the fingerprinter. The pairs are
+        compared in parallel unless `serial` is True."""
+        if serial:
+            pairs = [pair for pair in combinations(population, 2) if self.fingerprinter(*pair, **self.fingerprinter_kwargs)]
+        else:
+            pairs = population.fingerprinters.get_equivalent_pairs(population, self.fingerprinter, self.fingerprinter_kwargs)
+        ids = [individual.id for individual in population]
+        distinct = disjoint_set_merge(ids, [(a.id, b.id) for a, b in pairs])
+        return len(distinct) / len(ids)
+
+    @single_core
+    def decide(self, fitnesses, diversity):
+        """Records the generation and returns the first criterion that is met
+        and the reason to stop, or None."""
+        t = time.time()
+        self.longest_generation = max(self.longest_generation, t - self._t_last)
+        self._t_last = t
+
+        fitnesses = np.sort([fitness for fitness in fitnesses if fitness is not None and np.isfinite(fitness)])
+        if len(fitnesses) > 0:
+            self.best.append(float(fitnesses[0]))
+            self.top_mean.append(float(fitnesses[:self.stagnation_top].mean()))
+
+        if gparameters.generation >= self.max_generations:
+            return 'max_generations', 'reached max_generations ({})'.format(self.max_generations)
+        if self.stagnation_generations is not None and self.stagnated():
+            return 'stagnation_generations', 'no improvement in {} generations'.format(self.stagnation_generations)
+        if self.min_diversity is not None and diversity is not None and diversity < self.min_diversity:
+            return 'min_diversity', 'the diversity ({:.3f}) fell below min_diversity ({})'.format(diversity, self.min_diversity)
+        hours = (t - self._t_start + self.longest_generation) / 3600
+        if self.max_hours is not None and hours > self.max_hours:
+            return 'max_hours', 'the next generation would exceed max_hours ({})'.format(self.max_hours)
+        if self.max_core_hours is not None and hours * self.ncores > self.max_core_hours:
+            return 'max_core_hours', 'the next generation would exceed max_core_hours ({})'.format(self.max_core_hours)
+        return None
+
+    @property
+    def stopped_early(self):
+        """True if the run stopped before max_generations."""
+        return self.criterion is not None and self.criterion != 'max_generations'
+
+    @single_core
+    def stagnated(self):
+        """Returns True if neither the best fitness nor the mean of the best
+        fitnesses of the last `stagnation_generations` generations improved by
+        more than the tolerance on the generations before them."""
+        n = self.stagnation_generations
+        if len(self.best) <= n:
+            return False
+        for history in (self.best, self.top_mean):
+            if min(history[-n:]) < min(history[:-n]) - self.stagnation_tolerance:
+                return False
+        return True
+
+    def state(self):
+        """Returns the history of the fitnesses for a checkpoint. The time
+        budgets start again when the run is restarted."""
+        return {'best': list(self.best), 'top_mean': list(self.top_mean)}
+
+    def restore(self, state):
+        """Restores the state returned by state()."""
+        self.best = list(state['best'])
+        self.top_mean = list(state['top_mean'])
@@ -2,6 +2,10 @@ import os
 import sys
 import logging
 import time
+import random
+
+import numpy as np
+from ase import Atoms
 
 import structopt
 import gparameters
@@ -9,19 +13,71 @@ import structopt.utilities
 import structopt.postprocessing
 from structopt.common.population import Population
 from structopt.tools.convert_time import convert_time
+from structopt.io.run_store import RunStore, split_tags
+from structopt.io.structure_archive import StructureArchive, archiving
+from structopt.io.background_writer import BackgroundWriter
+from structopt.io.checkpoint import CHECKPOINT_FILENAME, individual_state, save_checkpoint
+from structopt.common.population.pipeline import PIPELINES
+from structopt.common.population.screening import Screening
+from structopt.common.population.tabu import Tabu
+from structopt.common.population.adaptive import AdaptiveOperators
+from structopt.optimizers.convergence import Convergence
+from structopt.tools.islands import migrate
+from structopt.tools import get_comm, tracing, profiling, communication
+from structopt.tools.tracing import span
+from structopt.tools.random_streams import run_seed
 
 
 class GeneticAlgorithm(object):
     """Defines methods to run a genetic algorithm optimization using the functions in the rest of the library."""
 
-    def __init__(self, population, convergence):
+    def __init__(self, population, convergence, islands=None, pipeline='staged', checkpoint=None, screening=None, tabu=None, adaptive_operators=None):
         self.logger = logging.getLogger('default')
 
         self.population = population
         self.convergence = convergence
+        self.convergence_criteria = Convergence(convergence, population)
+        self.islands = islands
+        if pipeline not in PIPELINES:
+            raise ValueError("'pipeline' must be one of {}, got '{}'".format(PIPELINES, pipeline))
+        self.pipeline = pipeline
+
+        # Reject duplicates of evaluated structures and pre-screen the
+        # offspring with a cheap model before they are relaxed. The fused
+        # pipeline relaxes each child right after it is made, so there is no
+        # point at which all of the offspring can be checked.
+        self.tabu = None
+        if tabu is not None:
+            if pipeline == 'fused':
+                raise ValueError("'tabu' cannot be used with the fused pipeline")
+            self.tabu = Tabu(tabu)
+        self.screening = None
+        if screening is not None:
+            if pipeline == 'fused':
+                raise ValueError("'screening' cannot be used with the fused pipeline")
+            self.screening = Screening(screening)
+
+        # Adapt the probabilities of the operators to how much they improve
+        # the fitness per second
+        self.adaptive_operators = None
+        self.operator_probabilities = None
+        if adaptive_operators is not None:
+            self.adaptive_operators = AdaptiveOperators(adaptive_operators, population)
 
         gparameters.generation = 0
         self.converged = False
+        self.archive = None
+        self._saved = set()
+        self.communication = None
+
+        # Checkpoint every `generations` generations and/or `minutes` minutes
+        self.checkpoint_parameters = checkpoint
+        self._t_checkpoint = time.time()
+
+        # Write the output files on a background thread on the root
+        self.writer = None
+        if gparameters.mpi.rank == 0 and gparameters.get('post_processing', {}).get('asynchronous', True):
+            self.writer = BackgroundWriter()
 
         self.timing = {'step': [],
                        'fitness': [],
@@ -29,14 +85,18 @@ class GeneticAlgorithm(object):
                        'selection': [],
                        'crossover': [],
                        'mutation': [],
+                       'tabu': [],
+                       'screening': [],
                        'predator': [],
-                       'fingerprinter': []}
+                       'fingerprinter': [],
+                       'migration': []}
 
     def run(self):
         if gparameters.mpi.rank == 0:
             print("Starting main Optimizer loop!")
         while not self.converged:
-            self.step()
+            with span('generation', 'step'), profiling.generation():
+                self.step()
         if gparameters.mpi.rank == 0:
             print("Finished running GA!")
 
@@ -48,41 +108,100 @@ class GeneticAlgorithm(object):
             print('')
             print("Starting generation {}".format(gparameters.generation))
         sys.stdout.flush()
+        if self.islands is not None and gparameters.generation > 0 and gparameters.generation % self.islands.migration_interval == 0:
+            t_migration_0 = time.time()
+            with span('migration', 'phase'):
+                migrants = migrate(self.population)
+            if gparameters.mpi.rank == 0:
+                print("Received migrants:", migrants)
+            self.timing['migration'].append(time.time() - t_migration_0)
+        else:
+            self.timing['migration'].append(0)
+
+        if self.adaptive_operators is not None:
+            self.adaptive_operators.start_generation(self.population)
+
+        pipeline_timing = {}
         if gparameters.generation > 0:
             t_selection_0 = time.time()
-            parents = self.population.select()
+            with span('selection', 'phase'):
+                parents = self.population.select()
             self.timing['selection'].append(time.time() - t_selection_0)
 
+        if gparameters.generation > 0 and self.pipeline == 'fused':
+            # Each child is created, relaxed and evaluated on a single core,
+            # so the relax and fitness steps below only have to handle the
+            # initial population and migrants
+            with span('breed', 'phase'):
+                pipeline_timing = self.population.breed(parents)
+            self.timing['crossover'].append(pipeline_timing['crossover'])
+            self.timing['mutation'].append(pipeline_timing['mutation'])
+        elif gparameters.generation > 0:
             t_crossover_0 = time.time()
-            children = self.population.crossover(parents)
-            self.population.extend(children)
+            with span('crossover', 'phase'):
+                children = self.population.crossover(parents)
+                self.population.extend(children)
             self.timing['crossover'].append(time.time() - t_crossover_0)
 
             t_mutation_0 = time.time()
-            mutated_population = self.population.mutate()
-            self.population.replace(mutated_population)
+            with span('mutation', 'phase'):
+                mutated_population = self.population.mutate()
+                self.population.replace(mutated_population)
             self.timing['mutation'].append(time.time() - t_mutation_0)
         else:
             self.timing['selection'].append(0)
             self.timing['crossover'].append(0)
             self.timing['mutation'].append(0)
 
+        t_tabu_0 = time.time()
+        if self.tabu is not None and gparameters.generation > 0:
+            with span('tabu', 'phase'):
+                self.tabu.screen(self.population)
+        self.timing['tabu'].append(time.time() - t_tabu_0)
+
+        t_screening_0 = time.time()
+        if self.screening is not None and gparameters.generation > 0:
+            with span('screening', 'phase'):
+                self.screening.screen(self.population)
+        self.timing['screening'].append(time.time() - t_screening_0)
+
         t_relax_0 = time.time()
-        self.population.relax()
-        self.timing['relax'].append(time.time() - t_relax_0)
+        with span('relax', 'phase'):
+            self.population.relax()
+        self.timing['relax'].append(time.time() - t_relax_0 + pipeline_timing.get('relax', 0))
 
         t_fitness_0 = time.time()
-        fits = self.population.calculate_fitnesses()
+        with span('fitness', 'phase'):
+            fits = self.population.calculate_fitnesses()
         if gparameters.mpi.rank == 0:
             print("All fitnesses:\n  {}".format(fits))
-        self.timing['fitness'].append(time.time() - t_fitness_0)
+        self.timing['fitness'].append(time.time() - t_fitness_0 + pipeline_timing.get('fitness', 0))
+
+        if self.adaptive_operators is not None:
+            # Credit the offspring before any of them is killed
+            self.adaptive_operators.credit_offspring(self.population)
+
+        if self.screening is not None:
+            # Train the model on the new fitnesses before any individual is killed
+            t_screening_0 = time.time()
+            with span('screening', 'phase'):
+                self.screening.train(self.population)
+            self.timing['screening'][-1] += time.time() - t_screening_0
+
+        if self.tabu is not None:
+            t_tabu_0 = time.time()
+            with span('tabu', 'phase'):
+                self.tabu.update(self.population)
+            self.timing['tabu'][-1] += time.time() - t_tabu_0
         
         t_fingerprinter_0 = time.time()
-        killed_by_fingerprinters = self.population.apply_fingerprinters()
+        with span('fingerprinter', 'phase'):
+            killed_by_fingerprinters = self.population.apply_fingerprinters()
         self.timing['fingerprinter'].append(time.time() - t_fingerprinter_0)
         
         t_predator_0 = time.time()
-        killed_by_predators = self.population.kill()
+        with span('predator', 'phase'):
+            killed_by_predators = self.population.kill()
         self.timing['predator'].append(time.time() - t_predator_0)
 
         if gparameters.mpi.rank == 0:
@@ -90,60 +209,285 @@ class GeneticAlgorithm(object):
             print("Killed by predators:", killed_by_predators)
             print(self.population)
 
+        if self.adaptive_operators is not None:
+            self.operator_probabilities = self.adaptive_operators.update(self.population, self.timing)
+            self.adaptive_operators.log(self.operator_probabilities)
+
         self.check_convergence()
 
         self.timing['step'].append(time.time() - t_step_0)
+        self.communication = communication.collect()
         if gparameters.mpi.rank == 0:
-            self.post_processing_step()
+            with span('post_processing', 'phase'):
+                self.post_processing_step()
+        # The genealogy tags were logged by the root. Reset them on the other
+        # cores too, so that copies made there don't carry them forward.
+        self.population.set_column('crossover_tag', None)
+        self.population.set_column('mutation_tag', None)
         gparameters.generation += 1
 
+        if self.checkpoint_due():
+            self.checkpoint()
+
     def check_convergence(self):
-        if gparameters.generation >= self.convergence.max_generations:
-            self.converged = True
-        else:
-            self.converged = False
+        """Checks the convergence criteria at the end of a generation."""
+        fitnesses = [individual.fitness for individual in self.population]
+        self.converged = self.convergence_criteria.check(self.population, fitnesses) is not None
+
+    def checkpoint_due(self):
+        """Returns True if a checkpoint should be written after this
+        generation. The last generation is always checkpointed, and a run that
+        stops before max_generations is checkpointed even without the
+        checkpoint parameters. Whether enough time has passed is decided on
+        the root, so all of the cores agree."""
+        if self.converged and self.convergence_criteria.stopped_early:
+            return True
+        if self.checkpoint_parameters is None:
+            return False
+        if self.converged:
+            return True
+        generations = self.checkpoint_parameters.get('generations')
+        if generations and gparameters.generation % generations == 0:
+            return True
+        minutes = self.checkpoint_parameters.get('minutes')
+        if minutes:
+            return self.agree(time.time() - self._t_checkpoint >= 60 * minutes)
+        return False
+
+    def agree(self, value):
+        """Returns the root's `value` on every core."""
+        if gparameters.mpi.ncores > 1:
+            return get_comm().bcast(value, root=0)
+        return value
+
+    def gather_rng_states(self):
+        """Returns the ``random`` and ``np.random`` states of every core, on the root."""
+        rng_state = (random.getstate(), np.random.get_state())
+        if gparameters.mpi.ncores > 1:
+            return get_comm().gather(rng_state, root=0)
+        return [rng_state]
+
+    def select_rng_state(self, rng_states):
+        """Returns the ``random`` and ``np.random`` states this core restarts
+        with, from the states saved by gather_rng_states."""
+        if len(rng_states) == max(gparameters.mpi.ncores, 1):
+            return rng_states[gparameters.mpi.rank]
+        if gparameters.mpi.rank == 0:
+            self.logger.warning("The checkpoint was written by {} cores and is restarted on {}, "
+                                "so the run will not be reproduced exactly".format(len(rng_states), gparameters.mpi.ncores))
+        return rng_states[0]
+
+    @tracing.traced(category='io')
+    def checkpoint(self):
+        """Writes a checkpoint of the optimizer to the logging directory, from
+        which the run can be continued exactly with the ``restart``
+        parameter. The output of every generation so far is flushed first, so
+        the files match the checkpoint."""
+        self.flush()
+        rng_states = self.gather_rng_states()
+        seed = run_seed()
+        if gparameters.mpi.rank == 0:
+            checkpoint = {'generation': gparameters.generation,
+                          'seed': seed,
+                          'population': [individual_state(individual) for individual in self.population],
+                          'max_individual_id': self.population._max_individual_id,
+                          'initial_number_of_individuals': self.population.initial_number_of_individuals,
+                          'timing': self.timing,
+                          'rng_states': rng_states,
+                          'tabu': self.tabu.state() if self.tabu is not None else None,
+                          'screening': self.screening.state() if self.screening is not None else None,
+                          'adaptive_operators': self.adaptive_operators.state() if self.adaptive_operators is not None else None,
+                          'convergence': self.convergence_criteria.state(),
+                          'optimizer': self.checkpoint_state()}
+            save_checkpoint(os.path.join(gparameters.logging.path, CHECKPOINT_FILENAME), checkpoint)
+        self._t_checkpoint = time.time()
+
+    def checkpoint_state(self):
+        """Returns the state of the optimizer that is not in the population.
+        Subclasses with more state extend this and restore_state."""
+        return {}
+
+    def restore(self, checkpoint):
+        """Continues the run from `checkpoint`, which was read with
+        structopt.io.checkpoint.load_checkpoint. The population must be the
+        one returned by load_population for the same checkpoint."""
+        gparameters.generation = checkpoint['generation']
+        gparameters.seed = checkpoint['seed']
+        self.timing = {operation: list(checkpoint['timing'].get(operation, [])) for operation in self.timing}
+        python_state, numpy_state = self.select_rng_state(checkpoint['rng_states'])
+        random.setstate(python_state)
+        np.random.set_state(numpy_state)
+        if self.tabu is not None and checkpoint.get('tabu') is not None:
+            self.tabu.restore(checkpoint['tabu'])
+        if self.screening is not None and checkpoint.get('screening') is not None:
+            self.screening.restore(checkpoint['screening'])
+        if self.adaptive_operators is not None and checkpoint.get('adaptive_operators') is not None:
+            self.adaptive_operators.restore(checkpoint['adaptive_operators'])
+        if checkpoint.get('convergence') is not None:
+            self.convergence_criteria.restore(checkpoint['convergence'])
+        self.restore_state(checkpoint['optimizer'])
+        self._t_checkpoint = time.time()
+
+    def restore_state(self, state):
+        """Restores the state returned by checkpoint_state."""
+        pass
 
     def post_processing_step(self):
+        """Saves the fitnesses, structures, genealogy and timing of the
+        generation. Only a snapshot of the population is taken here; unless the
+        ``asynchronous`` post_processing parameter is turned off, the files are
+        written on a background thread while the next generation runs."""
+        snapshot = self.snapshot()
+        if self.writer is not None:
+            self.writer.submit(self.write_snapshot, snapshot)
+        else:
+            self.write_snapshot(snapshot)
+
+    def snapshot(self):
+        """Copies everything that post_processing_step writes out of the
+        population and resets the genealogy tags.
+
+        Returns:
+            dict: the snapshot, which write_snapshot turns into files
+        """
+        individuals = []
+        for individual in self.population:
+            tag = '{id}{ctag}{mtag}'.format(ctag=individual.crossover_tag or '', id=individual.id, mtag=individual.mutation_tag or '')
+            individuals.append({'id': individual.id,
+                                'fits': dict(individual.fits),
+                                'fitness': individual.fitness,
+                                'tag': tag,
+                                'fidelity': individual.fidelity,
+                                'genes': split_tags(individual)})
+            individual.crossover_tag = None
+            individual.mutation_tag = None
+
+        # Only the structures of new individuals are saved
+        structures = [(individual.id, Atoms(individual)) for individual in self.population
+                      if individual.id not in self._saved]
+        self._saved.update(id for id, _ in structures)
+
+        operations = ['selection', 'crossover', 'mutation',
+                      'relax', 'fitness', 'fingerprinter', 'predator', 'step']
+        if self.tabu is not None:
+            operations.insert(operations.index('relax'), 'tabu')
+        if self.screening is not None:
+            operations.insert(operations.index('relax'), 'screening')
+        if self.islands is not None:
+            operations.insert(0, 'migration')
+        timing = [(operation, self.timing[operation][-1], sum(self.timing[operation])) for operation in operations]
+
+        return {'generation': gparameters.generation,
+                'path': gparameters.logging.path,
+                'archive': archiving(),
+                'individuals': individuals,
+                'structures': structures,
+                'timing': timing,
+                'operators': self.operator_probabilities,
+                'communication': self.communication}
+
+    @tracing.traced(category='io')
+    def write_snapshot(self, snapshot):
+        """Writes a snapshot taken by snapshot() to the output files."""
+        generation = snapshot['generation']
+        individuals = snapshot['individuals']
+
         # Save the fitnesses for each individual
         fitness_logger = logging.getLogger('fitness')
-        for individual in self.population:
-            line = 'Generation {}, Individual {}:'.format(gparameters.generation, individual.id)
-            for module in individual.fits:
-                line += ' {}: {}'.format(module, individual.fits[module])
+        for individual in individuals:
+            line = 'Generation {}, Individual {}:'.format(generation, individual['id'])
+            for module in individual['fits']:
+                line += ' {}: {}'.format(module, individual['fits'][module])
             fitness_logger.info(line)
 
-        # Save the XYZ file for each individual.
-        for individual in self.population:
-            path = os.path.join(gparameters.logging.path, 'modelfiles')
+        # Save the structure of each new individual
+        if snapshot['archive']:
+            if self.archive is None:
+                self.archive = StructureArchive(snapshot['path'])
+            for id, atoms in snapshot['structures']:
+                if id not in self.archive:
+                    self.archive.append(id, atoms)
+        else:
+            path = os.path.join(snapshot['path'], 'modelfiles')
             os.makedirs(path, exist_ok=True)
-            filename = os.path.join(path, 'individual{}.xyz'.format(individual.id))
-            if not os.path.exists(filename):
-                individual.write(filename)
+            for id, atoms in snapshot['structures']:
+                filename = os.path.join(path, 'individual{}.xyz'.format(id))
+                if not os.path.exists(filename):
+                    # This only runs on the root, so don't let ASE synchronize the cores
+                    atoms.write(filename, parallel=False)
 
         # Save the genealogy
-        tags = ['' for _ in self.population]
-        for i, individual in enumerate(self.population):
-            tags[i] = '{id}{ctag}{mtag}'.format(ctag=individual.crossover_tag or '', id=individual.id, mtag=individual.mutation_tag or '')
-            individual.crossover_tag = None
-            individual.mutation_tag = None
         genealogy_logger = logging.getLogger('genealogy')
-        genealogy_logger.info('Generation {}: {}'.format(gparameters.generation, ' '.join(tags)))
+        genealogy_logger.info('Generation {}: {}'.format(generation, ' '.join(individual['tag'] for individual in individuals)))
 
         # Save the times
         timing_logger = logging.getLogger('timing')
         timing_logger.info('')
-        timing_logger.info('Generation {} (cumulative) timing information'.format(gparameters.generation))
-        for operation in ['selection', 'crossover', 'mutation',
-                          'relax', 'fitness', 'fingerprinter', 'predator', 'step']:
-            t, t_unit = convert_time(self.timing[operation][-1])
-            t_cum, t_cum_unit = convert_time(sum(self.timing[operation]))
+        timing_logger.info('Generation {} (cumulative) timing information'.format(generation))
+        for operation, t, t_cum in snapshot['timing']:
+            t, t_unit = convert_time(t)
+            t_cum, t_cum_unit = convert_time(t_cum)
             timing_logger.info('{:10s}: {:4.2f} {} ({:4.2f} {})'.format(operation, t, t_unit, t_cum, t_cum_unit))
 
+        # Save the MPI communication, summed over the cores
+        communicated = snapshot.get('communication')
+        if communicated:
+            sent, sent_unit = communication.convert_bytes(sum(row[3] for row in communicated))
+            received, received_unit = communication.convert_bytes(sum(row[4] for row in communicated))
+            timing_logger.info('Generation {} MPI communication: {:.1f} {} sent, {:.1f} {} received'.format(
+                               generation, sent, sent_unit, received, received_unit))
+            for site, call, calls, sent, received, t, t_max in communicated:
+                sent, sent_unit = communication.convert_bytes(sent)
+                received, received_unit = communication.convert_bytes(received)
+                timing_logger.info('  {} {} x{}: {:.1f} {} sent, {:.1f} {} received, {:.4f} s (max {:.4f} s)'.format(
+                                   site, call, calls, sent, sent_unit, received, received_unit, t, t_max))
+
+        # Save all of the above, except for the structures, to the columnar store
+        store = RunStore(snapshot['path'])
+        n = len(individuals)
+        columns = [('generation', np.full(n, generation, dtype=int)),
+                   ('id', np.array([individual['id'] for individual in individuals], dtype=int)),
+                   ('fitness', np.array([individual['fitness'] for individual in individuals], dtype=float))]
+        modules = list(individuals[0]['fits']) if n > 0 else []
+        for module in modules:
+            fits = [individual['fits'][module] for individual in individuals]
+            columns.append(('fitness.{}'.format(module), np.array(fits, dtype=float)))
+        genes = [individual['genes'] for individual in individuals]
+        crossovers, parents1, parents2, mutations, mutated_from = zip(*genes) if genes else ([],) * 5
+        columns += [('crossover', np.array(crossovers, dtype=str)),
+                    ('parent1', np.array(parents1, dtype=int)),
+                    ('parent2', np.array(parents2, dtype=int)),
+                    ('mutation', np.array(mutations, dtype=str)),
+                    ('mutated_from', np.array(mutated_from, dtype=int)),
+                    ('fidelity', np.array([individual['fidelity'] or '' for individual in individuals], dtype=str))]
+        store.append('individuals', columns)
+        store.append('timing', [('generation', np.array([generation], dtype=int))] +
+                               [(operation, np.array([t], dtype=float)) for operation, t, _ in snapshot['timing']])
+        operators = snapshot.get('operators')
+        if operators:
+            store.append('operators', [('generation', np.array([generation], dtype=int))] +
+                                      [('{}.{}'.format(module, name), np.array([operators[module][name]], dtype=float))
+                                       for module in sorted(operators) for name in sorted(operators[module])])
+
+    def flush(self):
+        """Waits until the output of every generation so far has been written."""
+        if self.writer is not None:
+            self.writer.flush()
+
     def __enter__(self):
         return self
 
     def __exit__(self, type, value, traceback):
-        pass
+        if self.writer is not None:
+            self.writer.close()
+        # Merging the traces waits for every core, which would hang if only
+        # some of them stopped with an exception
+        if type is None:
+            profiling.finish()
+            tracing.finish()
+        else:
+            profiling.flush()
+            tracing.flush()
 
 
 if __name__ == "__main__":
@@ -151,12 +495,26 @@ if __name__ == "__main__":
     import random
     import numpy as np
 
+    from structopt.io.checkpoint import checkpoint_filename, load_checkpoint, load_population
+
     parameters = structopt.setup(sys.argv[1])
     random.seed(parameters.seed)
     np.random.seed(parameters.seed)
 
-    population = Population(parameters=parameters)
+    if parameters.restart is not None:
+        checkpoint = load_checkpoint(checkpoint_filename(parameters.restart))
+        population = load_population(checkpoint, parameters)
+    else:
+        population = Population(parameters=parameters)
 
     with GeneticAlgorithm(population=population,
-                          convergence=parameters.convergence) as optimizer:
+                          convergence=parameters.convergence,
+                          islands=parameters.islands,
+                          pipeline=parameters.pipeline,
+                          checkpoint=parameters.checkpoint,
+                          screening=parameters.screening,
+                          tabu=parameters.tabu,
+                          adaptive_operators=parameters.adaptive_operators) as optimizer:
+        if parameters.restart is not None:
+            optimizer.restore(checkpoint)
         optimizer.run()
@@ -1,30 +1,43 @@
 import os
 import sys
+import time
 import random
 import logging
 
+import numpy as np
+
 import structopt
 import gparameters
 from structopt.common.population import Population
+from structopt.io.checkpoint import CHECKPOINT_FILENAME, individual_state, restore_individual, save_checkpoint
+from structopt.tools import get_comm, tracing, profiling
+from structopt.tools.tracing import span
+from structopt.optimizers.convergence import Convergence
 
 
 class ParticleSwarmOptimization(object):
     """Defines methods to run a particle swarm optimization using the functions in the rest of the library."""
 
-    def __init__(self, population, convergence):
+    def __init__(self, population, convergence, checkpoint=None):
         self.logger = logging.getLogger('default')
 
         self.population = population
         self.convergence = convergence
+        self.convergence_criteria = Convergence(convergence, population)
         gparameters.generation = 0
         self.converged = False
 
+        # Checkpoint every `generations` generations and/or `minutes` minutes
+        self.checkpoint_parameters = checkpoint
+        self._t_checkpoint = time.time()
+
 
     def run(self):
         if gparameters.mpi.rank == 0:
             print("Starting main Optimizer loop!")
         while not self.converged:
-            self.step()
+            with span('generation', 'step'), profiling.generation():
+                self.step()
         if gparameters.mpi.rank == 0:
             print("Finished!")
 
@@ -62,12 +75,74 @@ class ParticleSwarmOptimization(object):
         self.post_processing_step()
         gparameters.generation += 1
 
+        if self.checkpoint_due():
+            self.checkpoint()
+
 
     def check_convergence(self):
-        if gparameters.generation >= self.convergence.max_generations:
-            self.converged = True
+        """Checks the convergence criteria, with the fitnesses of the best
+        position of each particle."""
+        fitnesses = [individual._fitness for individual in self.best_particles]
+        self.converged = self.convergence_criteria.check(self.population, fitnesses) is not None
+
+    def checkpoint_due(self):
+        """Returns True if a checkpoint should be written after this generation."""
+        if self.converged and self.convergence_criteria.stopped_early:
+            return True
+        if self.checkpoint_parameters is None:
+            return False
+        if self.converged:
+            return True
+        generations = self.checkpoint_parameters.get('generations')
+        if generations and gparameters.generation % generations == 0:
+            return True
+        minutes = self.checkpoint_parameters.get('minutes')
+        if minutes:
+            due = time.time() - self._t_checkpoint >= 60 * minutes
+            if gparameters.mpi.ncores > 1:
+                due = get_comm().bcast(due, root=0)
+            return due
+        return False
+
+    def checkpoint(self):
+        """Writes a checkpoint of the swarm, including the best particles, to
+        the logging directory."""
+        rng_state = (random.getstate(), np.random.get_state())
+        if gparameters.mpi.ncores > 1:
+            rng_states = get_comm().gather(rng_state, root=0)
         else:
-            self.converged = False
+            rng_states = [rng_state]
+        if gparameters.mpi.rank == 0:
+            checkpoint = {'generation': gparameters.generation,
+                          'seed': gparameters.seed,
+                          'population': [individual_state(individual) for individual in self.population],
+                          'max_individual_id': self.population._max_individual_id,
+                          'initial_number_of_individuals': self.population.initial_number_of_individuals,
+                          'rng_states': rng_states,
+                          'optimizer': {'best_swarm': individual_state(self.best_swarm),
+                                        'best_particles': [individual_state(individual) for individual in self.best_particles],
+                                        'convergence': self.convergence_criteria.state()}}
+            save_checkpoint(os.path.join(gparameters.logging.path, CHECKPOINT_FILENAME), checkpoint)
+        self._t_checkpoint = time.time()
+
+    def restore(self, checkpoint):
+        """Continues the run from `checkpoint`. The population must be the one
+        returned by load_population for the same checkpoint."""
+        gparameters.generation = checkpoint['generation']
+        gparameters.seed = checkpoint['seed']
+        rng_states = checkpoint['rng_states']
+        if len(rng_states) == max(gparameters.mpi.ncores, 1):
+            python_state, numpy_state = rng_states[gparameters.mpi.rank]
+        else:
+            python_state, numpy_state = rng_states[0]
+        random.setstate(python_state)
+        np.random.set_state(numpy_state)
+        parameters = self.population.parameters
+        self.best_swarm = restore_individual(checkpoint['optimizer']['best_swarm'], parameters)
+        self.best_particles = [restore_individual(state, parameters) for state in checkpoint['optimizer']['best_particles']]
+        if checkpoint['optimizer'].get('convergence') is not None:
+            self.convergence_criteria.restore(checkpoint['optimizer']['convergence'])
+        self._t_checkpoint = time.time()
 
     def post_processing_step(self):
         if not self._is_best_swarm_updated:
@@ -81,21 +156,35 @@ class ParticleSwarmOptimization(object):
 
 
     def __exit__(self, type, value, traceback):
-        pass
+        # Merging the traces waits for every core, which would hang if only
+        # some of them stopped with an exception
+        if type is None:
+            profiling.finish()
+            tracing.finish()
+        else:
+            profiling.flush()
+            tracing.flush()
 
 
 if __name__ == "__main__":
-    import numpy as np
+    from structopt.io.checkpoint import checkpoint_filename, load_checkpoint, load_population
 
     parameters = structopt.setup(sys.argv[1])
 
     random.seed(parameters.seed)
     np.random.seed(parameters.seed)
 
-    population = Population(parameters=parameters)
+    if parameters.restart is not None:
+        checkpoint = load_checkpoint(checkpoint_filename(parameters.restart))
+        population = load_population(checkpoint, parameters)
+    else:
+        population = Population(parameters=parameters)
 
     with ParticleSwarmOptimization(population=population,
-                                   convergence=parameters.convergence
+                                   convergence=parameters.convergence,
+                                   checkpoint=parameters.checkpoint
                                    ) as optimizer:
+        if parameters.restart is not None:
+            optimizer.restore(checkpoint)
         optimizer.run()
 
@@ -0,0 +1,385 @@
+import sys
+import time
+import random
+import logging
+
+import numpy as np
+
+import structopt
+import gparameters
+from structopt.common.population import Population
+from structopt.optimizers.genetic import GeneticAlgorithm
+from structopt.tools import get_comm
+from structopt.tools.random_streams import seeded, stream_seed, run_seed
+
+TASK_TAG = 1
+RESULT_TAG = 2
+STOP_TAG = 3
+
+# The most ids a task can use: two crossover children and their mutated copies
+IDS_PER_TASK = 4
+
+
+def modified(original, copy):
+    """Returns True if the atoms of `copy` differ from those of `original`."""
+    return (len(original) != len(copy)
+            or not np.array_equal(original.get_atomic_numbers(), copy.get_atomic_numbers())
+            or not np.array_equal(original.get_positions(), copy.get_positions()))
+
+
+class SteadyStateGeneticAlgorithm(GeneticAlgorithm):
+    """Defines methods to run an asynchronous, steady-state genetic algorithm.
+
+    Rank 0 is the coordinator and every other rank is a worker. The
+    coordinator selects two parents from the population and hands them to an
+    idle worker as a task. The worker creates offspring from them with the
+    crossovers and mutations, relaxes the offspring and calculates their
+    fitnesses, and sends them back. Each task is bred with its own random
+    stream (seeded by the run's seed, the generation and the number of the
+    task), so the offspring do not depend on which worker ran the task. As
+    soon as a result comes back, the coordinator inserts the offspring into
+    the population, removes duplicates with the fingerprinter, applies the predator, and gives the worker a new task. No
+    rank ever waits on a collective, so a slow relaxation only holds up the
+    worker running it.
+
+    There are no generations in a steady-state GA, so for logging and
+    convergence a "generation" is counted every time as many offspring have
+    been evaluated as there are individuals in the initial population. At
+    that point the population is logged to fitnesses.log, genealogy.log and
+    timing.log in the same formats as GeneticAlgorithm, so the output can be
+    read with the DataExplorer.
+
+    Checkpoints are written by the coordinator at the end of a generation,
+    like GeneticAlgorithm's. The offspring that are still being evaluated at
+    that point are not in the checkpoint, so a restarted run creates new
+    offspring in their place and does not reproduce the interrupted run
+    exactly.
+
+    With a single core the coordinator runs the tasks itself.
+    """
+
+    def __init__(self, population, convergence, checkpoint=None, screening=None, tabu=None):
+        # The offspring are relaxed one task at a time, so there is no point
+        # at which a generation of them can be screened or checked for
+        # duplicates
+        if screening is not None:
+            raise ValueError("'screening' cannot be used with the steady-state optimizer")
+        if tabu is not None:
+            raise ValueError("'tabu' cannot be used with the steady-state optimizer")
+        super().__init__(population, convergence, checkpoint=checkpoint)
+        self.generation_size = population.initial_number_of_individuals
+        self.nevaluated = 0
+        self.ntasks = 0
+        self._restored = False
+        self._t_generation_0 = None
+        self._reset_timing()
+
+    def _reset_timing(self):
+        self._timing = {operation: 0.0 for operation in self.timing}
+
+    def run(self):
+        comm = get_comm() if gparameters.mpi.ncores > 1 else None
+        # Without a seed in the parameters, the run's seed is broadcast from
+        # the root the first time it is needed. Do that while all of the
+        # cores are still in step, since only the workers use it later.
+        run_seed()
+        if gparameters.mpi.rank == 0:
+            print("Starting main Optimizer loop!")
+            self.initialize()
+            if comm is None:
+                self.run_serial()
+            else:
+                self.run_coordinator(comm)
+            print("Finished running steady-state GA!")
+        else:
+            self.initialize()
+            self.run_worker(comm)
+
+    def initialize(self):
+        """Relaxes and evaluates the initial population on all cores and logs
+        it as generation 0. A restarted population has already been evaluated."""
+        self._t_generation_0 = time.time()
+        if self._restored:
+            return
+        t_relax_0 = time.time()
+        self.population.relax()
+        self._timing['relax'] += time.time() - t_relax_0
+
+        t_fitness_0 = time.time()
+        self.population.calculate_fitnesses()
+        self._timing['fitness'] += time.time() - t_fitness_0
+
+        if gparameters.mpi.rank == 0:
+            self.end_generation()
+
+    def run_serial(self):
+        while not self.converged:
+            self.insert(self.breed(*self.make_task()))
+
+    def run_coordinator(self, comm):
+        from mpi4py import MPI
+
+        busy = set()
+        for worker in range(1, comm.Get_size()):
+            comm.send(self.make_task(), dest=worker, tag=TASK_TAG)
+            busy.add(worker)
+
+        status = MPI.Status()
+        while busy:
+            result = comm.recv(source=MPI.ANY_SOURCE, tag=RESULT_TAG, status=status)
+            worker = status.Get_source()
+            busy.remove(worker)
+            if self.converged:
+                continue  # Collect the outstanding results but don't use them
+            self.insert(result)
+            if not self.converged:
+                comm.send(self.make_task(), dest=worker, tag=TASK_TAG)
+                busy.add(worker)
+
+        for worker in range(1, comm.Get_size()):
+            comm.send(None, dest=worker, tag=STOP_TAG)
+
+    def run_worker(self, comm):
+        from mpi4py import MPI
+
+        status = MPI.Status()
+        while True:
+            task = comm.recv(source=0, tag=MPI.ANY_TAG, status=status)
+            if status.Get_tag() == STOP_TAG:
+                break
+            comm.send(self.breed(*task), dest=0, tag=RESULT_TAG)
+
+    def make_task(self):
+        """Selects two parents from the population for the next task.
+
+        The ids the offspring will get are handed out with the task, since
+        the relaxations and fitnesses name their files by id. Ids that the
+        task does not use are skipped.
+
+        Returns:
+            tuple: the generation, the number of the task, the two parents and
+                the ids for the offspring
+        """
+        population = self.population
+        t_selection_0 = time.time()
+        pairs = []
+        if getattr(population, 'selections', None) is not None:
+            population.selections.select_selection()
+            pairs = population.selections.select(population, npairs=1)
+        if pairs:
+            parent1, parent2 = pairs[0]
+        else:
+            parent1, parent2 = random.sample(list(population), 2)
+        self._timing['selection'] += time.time() - t_selection_0
+
+        task = self.ntasks
+        self.ntasks += 1
+        ids = [population.get_new_id() for _ in range(IDS_PER_TASK)]
+        return gparameters.generation, task, parent1, parent2, ids
+
+    def breed(self, generation, task, parent1, parent2, ids):
+        """Creates offspring from the parents of a task with the task's random
+        stream, then relaxes them and calculates their fitnesses.
+
+        Returns:
+            tuple: the offspring and the time spent on each operation, for
+                the coordinator to log
+        """
+        gparameters.generation = generation
+        timing = {'crossover': 0.0, 'mutation': 0.0, 'relax': 0.0, 'fitness': 0.0}
+        with seeded(stream_seed(run_seed(), generation, 'steady_state', task)):
+            offspring = self.make_offspring(parent1, parent2, ids, timing)
+
+        for individual in offspring:
+            t_relax_0 = time.time()
+            if individual.relaxations is not None:
+                individual.relax()
+            individual._relaxed = True
+            t_fitness_0 = time.time()
+            individual.calculate_fitness()
+            timing['relax'] += t_fitness_0 - t_relax_0
+            timing['fitness'] += time.time() - t_fitness_0
+        return offspring, timing
+
+    def make_offspring(self, parent1, parent2, ids, timing):
+        """Creates one or two children from the parents with a crossover
+        and/or mutations and gives them ids from `ids`. Keeps trying until at
+        least one of the operators has modified the parents, so a mutation
+        that fails never sends an unmodified copy to be evaluated.
+
+        Returns:
+            list<Individual>: the children
+        """
+        population = self.population
+        for _ in range(100):
+            t_crossover_0 = time.time()
+            children = []
+            if getattr(population, 'crossovers', None) is not None:
+                population.crossovers.select_crossover()
+                crossover = population.crossovers.selected_crossover
+                if crossover is not None:
+                    kwargs = population.crossovers.kwargs[crossover]
+                    children = population.crossovers._crossover(parent1, parent2, crossover, kwargs)
+                    children = [child for child in children if child is not None]
+            for child, id in zip(children, ids):
+                child.id = id
+            timing['crossover'] += time.time() - t_crossover_0
+
+            # Without a crossover, the child is a mutated copy of the first parent
+            t_mutation_0 = time.time()
+            crossed = bool(children)
+            offspring = []
+            for k, child in enumerate(children or [parent1]):
+                if child.mutations is not None:
+                    child.mutations.select_mutation()
+                if child.mutations is None or child.mutations.selected_mutation is None:
+                    if crossed:
+                        offspring.append(child)
+                    continue
+                mutated = child.copy()
+                mutated.mutated_from = child.id
+                mutated.mutations.selected_mutation = child.mutations.selected_mutation
+                child.mutations.selected_mutation = None
+                mutated.mutate(select_new=False)
+                if not modified(child, mutated):
+                    # The mutation failed. Don't evaluate an unmodified copy:
+                    # keep the crossover child or try again
+                    if crossed:
+                        offspring.append(child)
+                    continue
+                mutated.id = ids[2 + k]
+                offspring.append(mutated)
+            timing['mutation'] += time.time() - t_mutation_0
+
+            if offspring:
+                return offspring
+        raise ValueError("The crossovers and mutations did not create any offspring in 100 attempts. "
+                         "Check that their probabilities are not all zero.")
+
+    def insert(self, result):
+        """Adds the evaluated offspring of a task to the population, applies
+        the fingerprinter and the predator, and logs a generation when one is
+        complete."""
+        population = self.population
+        offspring, timing = result
+        for operation, t in timing.items():
+            self._timing[operation] += t
+
+        for child in offspring:
+            population.add(child)
+
+            t_fingerprinter_0 = time.time()
+            self.remove_duplicates_of(child)
+            self._timing['fingerprinter'] += time.time() - t_fingerprinter_0
+
+            t_predator_0 = time.time()
+            if len(population) > self.generation_size:
+                population.predators.select_predator()
+                population.predators.kill(population, nkeep=self.generation_size)
+            self._timing['predator'] += time.time() - t_predator_0
+
+            self.nevaluated += 1
+            if self.nevaluated % self.generation_size == 0:
+                self.end_generation()
+                if self.converged:
+                    return
+
+    def remove_duplicates_of(self, individual):
+        """Compares `individual` against the rest of the population with the
+        selected fingerprinter. If it has a duplicate, the one with the worse
+        fitness is removed (never the best individual if keep_best is set)."""
+        population = self.population
+        fingerprinters = getattr(population, 'fingerprinters', None)
+        if fingerprinters is None or individual.id not in population:
+            return
+        fingerprinters.select_fingerprinter()
+        fingerprinter = fingerprinters.selected_fingerprinter
+        if fingerprinter is None:
+            return
+        kwargs = fingerprinters.function_kwargs[fingerprinter]
+        keep_best = self.population.parameters.fingerprinters.keep_best
+        best = min(population, key=lambda other: other.fitness)
+
+        for other in list(population):
+            if other is individual or not fingerprinter(individual, other, **kwargs):
+                continue
+            if keep_best and other is best:
+                worse = individual
+            elif keep_best and individual is best:
+                worse = other
+            else:
+                worse = max(individual, other, key=lambda i: i.fitness)
+            population.remove(worse)
+            logger = logging.getLogger("output")
+            logger.info("Generation {}: Fingerprinter killed: {}".format(gparameters.generation, worse))
+            if worse is individual:
+                return
+
+    def check_convergence(self):
+        """Checks the convergence criteria on the coordinator, without
+        communicating with the workers."""
+        fitnesses = [individual.fitness for individual in self.population]
+        self.converged = self.convergence_criteria.check(self.population, fitnesses, serial=True) is not None
+
+    def end_generation(self):
+        """Logs the current population as a completed generation."""
+        for operation in self.timing:
+            self.timing[operation].append(self._timing[operation])
+        self.timing['step'][-1] = time.time() - self._t_generation_0
+        self._reset_timing()
+        self._t_generation_0 = time.time()
+
+        print("Finished generation {} ({} offspring evaluated)".format(gparameters.generation, self.nevaluated))
+        print(self.population)
+        sys.stdout.flush()
+        self.check_convergence()
+        self.post_processing_step()
+        gparameters.generation += 1
+
+        if self.checkpoint_due():
+            self.checkpoint()
+
+    # Only the coordinator writes checkpoints and only it draws from the
+    # global random states; the workers breed with the streams of the tasks
+
+    def agree(self, value):
+        return value
+
+    def gather_rng_states(self):
+        return [(random.getstate(), np.random.get_state())]
+
+    def select_rng_state(self, rng_states):
+        return rng_states[0]
+
+    def checkpoint_state(self):
+        return {'nevaluated': self.nevaluated, 'ntasks': self.ntasks}
+
+    def restore_state(self, state):
+        self.nevaluated = state['nevaluated']
+        self.ntasks = state['ntasks']
+        self._restored = True
+
+
+if __name__ == "__main__":
+    import structopt
+
+    from structopt.io.checkpoint import checkpoint_filename, load_checkpoint, load_population
+
+    parameters = structopt.setup(sys.argv[1])
+    random.seed(parameters.seed)
+    np.random.seed(parameters.seed)
+
+    if parameters.restart is not None:
+        checkpoint = load_checkpoint(checkpoint_filename(parameters.restart))
+        population = load_population(checkpoint, parameters)
+    else:
+        population = Population(parameters=parameters)
+
+    with SteadyStateGeneticAlgorithm(population=population,
+                                     convergence=parameters.convergence,
+                                     checkpoint=parameters.checkpoint,
+                                     screening=parameters.screening,
+                                     tabu=parameters.tabu) as optimizer:
+        if parameters.restart is not None:
+            optimizer.restore(checkpoint)
+        optimizer.run()
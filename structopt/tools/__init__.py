@@ -1,5 +1,6 @@
-from .parallel import root, single_core, parallel, allgather, parse_MPMD_cores_per_structure, get_rank, get_size
+from .parallel import root, single_core, parallel, allgather, map_round_robin, parse_MPMD_cores_per_structure, get_rank, get_size, get_comm, set_comm
 from .random_three_vector import random_three_vector
 from .sorted_dict import SortedDict
+from .indexed_dict import IndexedDict
 from .rotation_matrix import rotation_matrix
 from .disjoint_set_merge import disjoint_set_merge
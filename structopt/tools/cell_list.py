@@ -0,0 +1,93 @@
+"""A vectorized cell list for finding pairs of points closer than a cutoff.
+
+The points are binned into cubic cells with the width of the cutoff, so two
+points closer than the cutoff are always in the same or in adjacent cells.
+The points are sorted by their flat cell index, and the points in each of the
+27 neighboring cells are looked up for all of the query points at once, from a
+table of where each cell starts or, for very sparse grids, with
+``np.searchsorted``.
+"""
+
+import itertools
+
+import numpy as np
+
+OFFSETS = np.array(list(itertools.product((-1, 0, 1), repeat=3)))
+# Grids with up to this many cells (or 8 per point) get a lookup table
+DENSE_CELLS = 2**20
+
+
+def pairs_within(positions, cutoff, others=None):
+    """Finds the pairs of points that are closer than `cutoff`.
+
+    Parameters
+    ----------
+    positions : np.ndarray
+        An (N, 3) array of points.
+    cutoff : float
+        The distance below which two points are paired.
+    others : np.ndarray
+        An optional (M, 3) array of points. If given, the pairs are between
+        `positions` and `others`; otherwise they are between the points in
+        `positions` themselves, and every pair is returned once with i < j.
+
+    Returns
+    -------
+    tuple of np.ndarray
+        The indices (i, j) of the pairs, where i indexes `positions` and j
+        indexes `others` (or `positions`), and their distances.
+    """
+    positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+    same = others is None
+    others = positions if same else np.asarray(others, dtype=float).reshape(-1, 3)
+    empty = np.array([], dtype=int)
+    if len(positions) == 0 or len(others) == 0:
+        return empty, empty, np.array([])
+
+    origin = np.minimum(positions.min(axis=0), others.min(axis=0))
+    query_cells = np.floor((positions - origin) / cutoff).astype(int)
+    other_cells = np.floor((others - origin) / cutoff).astype(int)
+    shape = np.maximum(query_cells.max(axis=0), other_cells.max(axis=0)) + 1
+
+    other_keys = np.ravel_multi_index(other_cells.T, shape)
+    order = np.argsort(other_keys, kind='stable')
+    sorted_keys = other_keys[order]
+    ncells = int(np.prod(shape))
+    if ncells <= max(8 * len(others), DENSE_CELLS):
+        # Look up the first point of every cell in a table instead of searching
+        cell_starts = np.zeros(ncells + 1, dtype=int)
+        np.cumsum(np.bincount(other_keys, minlength=ncells), out=cell_starts[1:])
+    else:
+        cell_starts = None
+
+    pairs_i, pairs_j = [], []
+    for offset in OFFSETS:
+        cells = query_cells + offset
+        inside = np.flatnonzero(((cells >= 0) & (cells < shape)).all(axis=1))
+        keys = np.ravel_multi_index(cells[inside].T, shape)
+        if cell_starts is not None:
+            starts = cell_starts[keys]
+            counts = cell_starts[keys + 1] - starts
+        else:
+            starts = np.searchsorted(sorted_keys, keys, side='left')
+            counts = np.searchsorted(sorted_keys, keys, side='right') - starts
+        total = np.sum(counts)
+        if total == 0:
+            continue
+        # Expand each query point into one entry per point in the neighboring cell
+        i = np.repeat(inside, counts)
+        first = np.cumsum(counts) - counts
+        j = order[np.repeat(starts, counts) + np.arange(total) - np.repeat(first, counts)]
+        pairs_i.append(i)
+        pairs_j.append(j)
+
+    if not pairs_i:
+        return empty, empty, np.array([])
+    i = np.concatenate(pairs_i)
+    j = np.concatenate(pairs_j)
+    if same:
+        upper = i < j
+        i, j = i[upper], j[upper]
+    distances = np.linalg.norm(positions[i] - others[j], axis=1)
+    close = distances < cutoff
+    return i[close], j[close], distances[close]
@@ -0,0 +1,187 @@
+"""Instrumentation of the MPI calls made through :func:`structopt.tools.get_comm`.
+
+While tracing (see :mod:`structopt.tools.tracing`) or MPI accounting is on,
+``get_comm()`` returns the communicator wrapped in an
+:class:`InstrumentedComm`. Its calls in MPI_CALLS are recorded as ``mpi``
+spans when tracing, and when the ``mpi_accounting`` parameter is on every
+call is accounted for with
+
+* its call site, the module and function outside of
+  :mod:`structopt.tools.parallel` that made it (for a ``@root`` function,
+  the function itself),
+* the MPI call, e.g. ``allgather``,
+* the size of the pickled data the core sent and received, and
+* the time it took.
+
+The accounts of all of the cores are summed up once per generation by
+:func:`collect`, and the genetic algorithm writes the totals to
+``timing.log``.
+
+Measuring the payloads pickles the data a second time, so accounting is
+meant for finding out which phase to optimize, not for production runs.
+"""
+
+import sys
+import time
+import pickle
+import functools
+from contextlib import contextmanager
+from collections import defaultdict
+
+from . import tracing
+
+# The MPI calls of a communicator that are instrumented
+MPI_CALLS = {'allgather', 'allreduce', 'alltoall', 'bcast', 'gather', 'scatter', 'reduce',
+             'Barrier', 'barrier', 'send', 'recv', 'sendrecv'}
+# Modules that are skipped when looking for the call site
+WRAPPER_MODULES = {'structopt.tools.parallel', 'structopt.tools.communication', 'structopt.tools.tracing'}
+
+_accounts = None
+_site = None
+
+
+def payload_size(data):
+    """Returns the size in bytes of `data` once it is pickled by mpi4py."""
+    if data is None:
+        return 0
+    try:
+        return len(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 0
+
+
+def convert_bytes(n):
+    """Returns `n` bytes as a (value, unit) pair, like convert_time."""
+    for unit in ['B', 'kB', 'MB']:
+        if n < 1024:
+            return n, unit
+        n /= 1024
+    return n, 'GB'
+
+
+def call_site():
+    """Returns the module and function that called into the communicator."""
+    if _site is not None:
+        return _site
+    frame = sys._getframe(2)
+    while frame is not None and frame.f_globals.get('__name__') in WRAPPER_MODULES:
+        frame = frame.f_back
+    if frame is None:
+        return 'unknown'
+    return '{}:{}'.format(frame.f_globals.get('__name__'), frame.f_code.co_name)
+
+
+@contextmanager
+def site(name):
+    """Attributes the MPI calls inside the block to `name` instead of to the
+    function that made them."""
+    global _site
+    previous, _site = _site, name
+    try:
+        yield
+    finally:
+        _site = previous
+
+
+def account(where, call, sent, received, elapsed):
+    """Adds an MPI call made at `where` to the accounts of this core."""
+    totals = _accounts[(where, call)]
+    totals[0] += 1
+    totals[1] += sent
+    totals[2] += received
+    totals[3] += elapsed
+
+
+class InstrumentedComm(object):
+    """Wraps the MPI communicator `comm`. Its calls in MPI_CALLS are traced
+    and accounted for; everything else is passed through to `comm`."""
+
+    def __init__(self, comm):
+        self.comm = comm
+
+    def __getattr__(self, name):
+        attribute = getattr(self.comm, name)
+        if name not in MPI_CALLS:
+            return attribute
+
+        @functools.wraps(attribute)
+        def call(*args, **kwargs):
+            if _accounts is None:
+                with tracing.span('MPI.{}'.format(name), 'mpi'):
+                    return attribute(*args, **kwargs)
+            where = call_site()
+            data = args[0] if args else kwargs.get('obj', kwargs.get('sendobj'))
+            if name == 'bcast' and self.comm.Get_rank() != kwargs.get('root', args[1] if len(args) > 1 else 0):
+                data = None  # only the root sends
+            sent = payload_size(data)
+            start = time.time()
+            with tracing.span('MPI.{}'.format(name), 'mpi', site=where):
+                result = attribute(*args, **kwargs)
+            elapsed = time.time() - start
+            received = 0
+            if name not in ('send', 'Barrier', 'barrier') and not (name == 'bcast' and data is not None):
+                received = payload_size(result)
+            account(where, name, sent, received, elapsed)
+            return result
+        return call
+
+
+def instrument(comm):
+    """Returns `comm`, wrapped in an InstrumentedComm if tracing or MPI
+    accounting is on."""
+    if comm is None or (_accounts is None and not tracing.enabled()):
+        return comm
+    return InstrumentedComm(comm)
+
+
+def enable():
+    """Turns MPI accounting on for this core."""
+    global _accounts
+    _accounts = defaultdict(lambda: [0, 0, 0, 0.0])
+
+
+def enabled():
+    """Returns True if MPI accounting is on."""
+    return _accounts is not None
+
+
+def collect():
+    """Sums up the MPI calls of every core since the last time collect was
+    called. This must be called on every core at the same point.
+
+    Returns:
+        list: on the root, a (site, call, calls, sent, received, time,
+            max time) tuple for every call site, where ``calls`` is the
+            most calls made by a core, ``sent`` and ``received`` are
+            the bytes summed over the cores, ``time`` is the mean time per
+            core and ``max time`` is the time of the slowest core, sorted by
+            the max time. None on the other cores and if accounting is off.
+    """
+    global _accounts
+    if _accounts is None:
+        return None
+    import gparameters
+    accounts = dict(_accounts)
+    enable()
+    if gparameters.mpi.ncores > 1:
+        from .parallel import get_comm
+        comm = get_comm()
+        if isinstance(comm, InstrumentedComm):
+            comm = comm.comm  # The accounts themselves are not accounted for
+        all_accounts = comm.gather(accounts, root=0)
+        if comm.Get_rank() != 0:
+            return None
+    else:
+        all_accounts = [accounts]
+
+    keys = sorted(set(key for accounts in all_accounts for key in accounts))
+    totals = []
+    for key in keys:
+        rows = [accounts.get(key, [0, 0, 0, 0.0]) for accounts in all_accounts]
+        times = [row[3] for row in rows]
+        totals.append(key + (max(row[0] for row in rows),
+                             sum(row[1] for row in rows),
+                             sum(row[2] for row in rows),
+                             sum(times) / len(times),
+                             max(times)))
+    return sorted(totals, key=lambda total: -total[-1])
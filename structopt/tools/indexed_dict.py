@@ -0,0 +1,201 @@
+from bisect import insort
+from collections.abc import MutableMapping, KeysView, ItemsView, ValuesView
+from reprlib import recursive_repr as _recursive_repr
+from operator import eq as _eq
+
+
+class IndexedDict(dict):
+    'Dictionary that preserves order by key and supports O(1) access by position'
+    # An inherited dict maps keys to values.
+    # The inherited dict provides __getitem__, __len__, __contains__, and get.
+    # The remaining methods are order-aware.
+
+    # self.__keys is a python list of the keys in sorted order. In StructOpt
+    # keys are individual ids, which are handed out in increasing order, so
+    # almost every insertion is an O(1) append to the end of the list.
+    # self.__slots maps each key to its position in self.__keys. It is rebuilt
+    # lazily (in O(n)) the first time a position is requested after a key has
+    # been inserted into or deleted from the middle of the list.
+
+    def __init__(*args, **kwds):
+        '''Initialize an indexed dictionary. The signature is the same as
+        regular dictionaries.
+        '''
+        if not args:
+            raise TypeError("descriptor '__init__' of 'IndexedDict' object "
+                            "needs an argument")
+        self, *args = args
+        if len(args) > 1:
+            raise TypeError('expected at most 1 arguments, got %d' % len(args))
+        try:
+            self.__keys
+        except AttributeError:
+            self.__keys = []
+            self.__slots = {}
+            self.__slots_valid = True
+        self.__update(*args, **kwds)
+
+    def __setitem__(self, key, value, dict_setitem=dict.__setitem__):
+        'od.__setitem__(i, y) <==> od[i]=y'
+        if key not in self:
+            keys = self.__keys
+            if not keys or keys[-1] < key:
+                keys.append(key)
+                if self.__slots_valid:
+                    self.__slots[key] = len(keys) - 1
+            else:
+                insort(keys, key)
+                self.__slots_valid = False
+        dict_setitem(self, key, value)
+
+    def __delitem__(self, key, dict_delitem=dict.__delitem__):
+        'od.__delitem__(y) <==> del od[y]'
+        dict_delitem(self, key)
+        position = IndexedDict.position(self, key)
+        del self.__keys[position]
+        del self.__slots[key]
+        if position != len(self.__keys):
+            self.__slots_valid = False
+
+    def __iter__(self):
+        'od.__iter__() <==> iter(od)'
+        return iter(self.__keys)
+
+    def __reversed__(self):
+        'od.__reversed__() <==> reversed(od)'
+        return reversed(self.__keys)
+
+    def position(self, key):
+        'Returns the position of `key` in the dictionary. Raises KeyError if `key` is not present.'
+        if not self.__slots_valid:
+            self.__slots = {k: i for i, k in enumerate(self.__keys)}
+            self.__slots_valid = True
+        return self.__slots[key]
+
+    def key_at(self, position):
+        'Returns the key at position `position`.'
+        return self.__keys[position]
+
+    def clear(self):
+        'od.clear() -> None.  Remove all items from od.'
+        self.__keys.clear()
+        self.__slots.clear()
+        self.__slots_valid = True
+        dict.clear(self)
+
+    def popitem(self, last=True):
+        '''od.popitem() -> (k, v), return and remove a (key, value) pair.
+        Pairs are returned in LIFO order if last is true or FIFO order if false.
+
+        '''
+        if not self:
+            raise KeyError('dictionary is empty')
+        key = self.__keys[-1] if last else self.__keys[0]
+        value = self[key]
+        del self[key]
+        return key, value
+
+    update = __update = MutableMapping.update
+
+    def keys(self):
+        "D.keys() -> a set-like object providing a view on D's keys"
+        return _IndexedDictKeysView(self)
+
+    def items(self):
+        "D.items() -> a set-like object providing a view on D's items"
+        return _IndexedDictItemsView(self)
+
+    def values(self):
+        "D.values() -> an object providing a view on D's values"
+        return _IndexedDictValuesView(self)
+
+    __ne__ = MutableMapping.__ne__
+
+    __marker = object()
+
+    def pop(self, key, default=__marker):
+        '''od.pop(k[,d]) -> v, remove specified key and return the corresponding
+        value.  If key is not found, d is returned if given, otherwise KeyError
+        is raised.
+
+        '''
+        if key in self:
+            result = self[key]
+            del self[key]
+            return result
+        if default is self.__marker:
+            raise KeyError(key)
+        return default
+
+    def setdefault(self, key, default=None):
+        'od.setdefault(k[,d]) -> od.get(k,d), also set od[k]=d if k not in od'
+        if key in self:
+            return self[key]
+        self[key] = default
+        return default
+
+    @_recursive_repr()
+    def __repr__(self):
+        'od.__repr__() <==> repr(od)'
+        if not self:
+            return '%s()' % (self.__class__.__name__,)
+        return '%s(%r)' % (self.__class__.__name__, list(self.items()))
+
+    def __reduce__(self):
+        'Return state information for pickling'
+        inst_dict = vars(self).copy()
+        for k in vars(IndexedDict()):
+            inst_dict.pop(k, None)
+        return self.__class__, (), inst_dict or None, None, iter(self.items())
+
+    def copy(self):
+        'od.copy() -> a shallow copy of od'
+        return self.__class__(self)
+
+    @classmethod
+    def fromkeys(cls, iterable, value=None):
+        '''OD.fromkeys(S[, v]) -> New indexed dictionary with keys from S.
+        If not specified, the value defaults to None.
+
+        '''
+        self = cls()
+        for key in iterable:
+            self[key] = value
+        return self
+
+    def __eq__(self, other):
+        '''od.__eq__(y) <==> od==y.  Comparison to another IndexedDict is order-sensitive
+        while comparison to a regular mapping is order-insensitive.
+
+        '''
+        if isinstance(other, IndexedDict):
+            return dict.__eq__(self, other) and all(map(_eq, IndexedDict.__iter__(self), IndexedDict.__iter__(other)))
+        return dict.__eq__(self, other)
+
+
+# The views iterate over the keys with IndexedDict.__iter__ directly so that
+# subclasses (e.g. Population) are free to override __iter__ to yield values.
+
+class _IndexedDictKeysView(KeysView):
+
+    def __iter__(self):
+        return IndexedDict.__iter__(self._mapping)
+
+    def __reversed__(self):
+        return IndexedDict.__reversed__(self._mapping)
+
+
+class _IndexedDictItemsView(ItemsView):
+
+    def __iter__(self):
+        mapping = self._mapping
+        for key in IndexedDict.__iter__(mapping):
+            yield (key, dict.__getitem__(mapping, key))
+
+
+class _IndexedDictValuesView(ValuesView):
+
+    def __iter__(self):
+        mapping = self._mapping
+        for key in IndexedDict.__iter__(mapping):
+            yield dict.__getitem__(mapping, key)
@@ -0,0 +1,159 @@
+"""Island-model parallelization of the genetic algorithm.
+
+If the parameters contain an ``islands`` section, MPI.COMM_WORLD is split into
+``number_of_islands`` sub-communicators of (nearly) equal size. Each island
+evolves its own Population with the usual operators, and all of the
+population-level collectives run over the island's communicator only (see
+:func:`structopt.tools.parallel.get_comm`). Every ``migration_interval``
+generations, the root of each island sends copies of its
+``number_of_migrants`` best individuals to another island. Which island is
+determined by the ``topology``:
+
+* ``"ring"``: island *i* sends to island *i + 1* and receives from island *i - 1*.
+* ``"random"``: the islands are randomly paired up again at every migration
+  (no island sends to itself).
+
+Each island writes its output to an ``island<i>`` subdirectory of the logging
+directory, in the same formats as a run without islands.
+"""
+
+import os
+import logging
+import numpy as np
+
+import gparameters
+from .parallel import parallel, single_core, get_comm, set_comm
+from .communication import instrument
+
+TOPOLOGIES = ['ring', 'random']
+
+# Communicator between the root ranks of the islands. It is None without
+# islands and MPI.COMM_NULL on ranks that are not the root of an island.
+_migration_comm = None
+
+
+@parallel
+def split_islands(parameters):
+    """Splits MPI.COMM_WORLD into islands and updates `parameters` for the
+    island this rank belongs to. Afterwards, ``parameters.mpi.rank`` and
+    ``parameters.mpi.ncores`` refer to the island's communicator, and
+    ``parameters.mpi.world_rank``, ``parameters.mpi.world_ncores`` and
+    ``parameters.mpi.island`` are set.
+
+    Args:
+        parameters (DictionaryObject): the parameters, with the ``islands``
+            section filled in by ``structopt.io.parameters.set_default``
+    """
+    global _migration_comm
+    from mpi4py import MPI
+
+    world = MPI.COMM_WORLD
+    world_rank = world.Get_rank()
+    world_ncores = world.Get_size()
+    nislands = parameters.islands.number_of_islands
+    if not 1 <= nislands <= world_ncores:
+        raise ValueError("'number_of_islands' must be between 1 and the number of cores ({}), got {}".format(world_ncores, nislands))
+    if parameters.islands.topology not in TOPOLOGIES:
+        raise ValueError("'topology' must be one of {}, got '{}'".format(TOPOLOGIES, parameters.islands.topology))
+
+    # Neighboring ranks are usually on the same node, so give each island a
+    # contiguous block of ranks
+    island = world_rank * nislands // world_ncores
+    comm = world.Split(island, world_rank)
+    set_comm(comm)
+    color = 0 if comm.Get_rank() == 0 else MPI.UNDEFINED
+    _migration_comm = world.Split(color, world_rank)
+
+    parameters.mpi.world_rank = world_rank
+    parameters.mpi.world_ncores = world_ncores
+    parameters.mpi.island = island
+    parameters.mpi.rank = comm.Get_rank()
+    parameters.mpi.ncores = comm.Get_size()
+    parameters.logging.path = os.path.join(parameters.logging.path, 'island{}'.format(island))
+    if parameters.seed is not None:
+        parameters.seed += island
+    return parameters
+
+
+@single_core
+def get_neighbors(island, nislands, topology, comm=None):
+    """Returns the islands that `island` sends migrants to and receives them from.
+
+    Args:
+        island (int): the island
+        nislands (int): the number of islands
+        topology (str): 'ring' or 'random'
+        comm (MPI.Comm): for the random topology, the communicator between
+            the island roots, used to agree on the pairing
+    """
+    if topology == 'ring':
+        return (island + 1) % nislands, (island - 1) % nislands
+
+    destinations = None
+    if island == 0:
+        destinations = np.arange(nislands)
+        while (destinations == np.arange(nislands)).any():
+            destinations = np.random.permutation(nislands)
+        destinations = destinations.tolist()
+    if comm is not None:
+        destinations = comm.bcast(destinations, root=0)
+    return destinations[island], destinations.index(island)
+
+
+@parallel
+def migrate(population):
+    """Sends copies of the best individuals in this island's population to
+    another island and adds the individuals received from a third island to
+    the population. The migrants keep their fitnesses and get new ids.
+
+    Args:
+        population (Population): the population of this island
+
+    Returns:
+        list<Individual>: the individuals that were received
+    """
+    comm = get_comm()
+    islands = gparameters.islands
+    received_ids = []
+    if _migration_comm is not None and comm.Get_rank() == 0 and _migration_comm.Get_size() > 1:
+        nislands = _migration_comm.Get_size()
+        island = _migration_comm.Get_rank()
+        destination, source = get_neighbors(island, nislands, islands.topology, _migration_comm)
+
+        fits = population.get_column('_fitness')
+        best = np.argsort(fits, kind='stable')[:islands.number_of_migrants]
+        migrants = [population.get_by_position(position) for position in best]
+
+        received = instrument(_migration_comm).sendrecv(migrants, dest=destination, source=source)
+        original_ids = [individual.id for individual in received]
+        for individual in received:
+            individual.id = None
+            population.add(individual)
+        received_ids = [individual.id for individual in received]
+
+        logger = logging.getLogger('output')
+        logger.info("Generation {}: Sent {} to island {}; received {} from island {} as {}".format(
+                    gparameters.generation, [individual.id for individual in migrants],
+                    destination, original_ids, source, received_ids))
+
+    population.bcast()
+    received_ids = comm.bcast(received_ids, root=0)
+    return [population[id] for id in received_ids]
+
+
+@parallel
+def first_island(value):
+    """Returns the first `value` of the islands that is not None, on every
+    core of every island, so that the islands can agree to stop together.
+    Without islands, `value` is returned. This must be called on every core.
+
+    Args:
+        value: this island's value, which must be the same on all of its cores
+    """
+    if _migration_comm is None:
+        return value
+    comm = get_comm()
+    if comm.Get_rank() == 0 and _migration_comm.Get_size() > 1:
+        values = instrument(_migration_comm).allgather(value)
+        value = next((value for value in values if value is not None), None)
+    return comm.bcast(value, root=0)
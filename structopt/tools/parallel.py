@@ -1,19 +1,39 @@
 import sys
 import functools
 
+from . import tracing, communication
+
+# The communicator that the population-level collectives run over. It is
+# MPI.COMM_WORLD unless COMM_WORLD has been split, e.g. into islands.
+_comm = None
+
+
+def get_comm():
+    """Returns the MPI communicator that the population is distributed over.
+    Its MPI calls are recorded when tracing or MPI accounting is on."""
+    comm = _comm
+    if comm is None:
+        from mpi4py import MPI
+        comm = MPI.COMM_WORLD
+    return communication.instrument(comm)
+
+
+def set_comm(comm):
+    """Sets the MPI communicator that the population is distributed over."""
+    global _comm
+    _comm = comm
+
 
 def get_rank():
     if 'mpi4py' in sys.modules:
-        from mpi4py import MPI
-        return MPI.COMM_WORLD.Get_rank()
+        return get_comm().Get_rank()
     else:
         return 0
 
 
 def get_size():
     if 'mpi4py' in sys.modules:
-        from mpi4py import MPI
-        return MPI.COMM_WORLD.Get_size()
+        return get_comm().Get_size()
     else:
         return 0
 
@@ -29,17 +49,19 @@ def root(method=None, broadcast=True):
         return functools.partial(root, broadcast=broadcast)
 
     @functools.wraps(method)
+    @tracing.traced(name=method.__qualname__, category='root')
     def wrapper(*args, **kwargs):
         if broadcast and 'mpi4py' in sys.modules:
-            from mpi4py import MPI
-            if MPI.COMM_WORLD.Get_rank() == 0:
+            comm = get_comm()
+            if comm.Get_rank() == 0:
                 data = method(*args, **kwargs)
             else:
                 data = None
-            if hasattr(data, 'bcast'):
-                data.bcast()
-            else:
-                data = MPI.COMM_WORLD.bcast(data, root=0)
+            with communication.site('{}:{}'.format(method.__module__, method.__qualname__)):
+                if hasattr(data, 'bcast'):
+                    data.bcast()
+                else:
+                    data = comm.bcast(data, root=0)
         else:
             data = method(*args, **kwargs)
         return data
@@ -52,6 +74,7 @@ def parallel(method):
     designed to run in parallel.
     """
     @functools.wraps(method)
+    @tracing.traced(name=method.__qualname__, category='parallel')
     def wrapper(*args, **kwargs):
         return method(*args, **kwargs)
     wrapper.__doc__ += ("\n\n(@parallel) Designed to run code that runs differently on different cores.\n"
@@ -105,14 +128,13 @@ def allgather(stuff, stuffs_per_core):
     if hasattr(stuff, 'allgather'):
         raise TypeError('instance of {} has an `allgather` function that should be used instead'.format(stuff.__class__.__name__))
 
-    from mpi4py import MPI
     # The lists in stuffs_per_core all need to be of the same length
     max_stuffs_per_core = max(len(stuffs) for stuffs in stuffs_per_core.values())
     for rank, stuffs in stuffs_per_core.items():
         while len(stuffs) < max_stuffs_per_core:
             stuffs.append(None)
 
-    all_stuffs_per_core = MPI.COMM_WORLD.allgather(stuff)
+    all_stuffs_per_core = get_comm().allgather(stuff)
     correct_stuff = [None for _ in range(len(stuff))]
     for rank, indices in stuffs_per_core.items():
         for index in indices:
@@ -127,6 +149,19 @@ def allgather(stuff, stuffs_per_core):
     return correct_stuff
 
 
+@parallel
+def map_round_robin(function, items):
+    """Returns ``[function(item) for item in items]`` on every core, with the
+    items divided round-robin over the cores and the results allgathered."""
+    import gparameters
+    ncores = gparameters.mpi.ncores
+    rank = gparameters.mpi.rank
+    results = [(i, function(item)) for i, item in enumerate(items) if i % ncores == rank]
+    if ncores > 1:
+        results = [result for results in get_comm().allgather(results) for result in results]
+    return [value for _, value in sorted(results, key=lambda result: result[0])]
+
+
 def parse_MPMD_cores_per_structure(value):
     """Converts an input ``value`` from a value in the parameter file into a ``{'min': ..., 'max': ...}`` dictionary."""
     if isinstance(value, int):
@@ -136,8 +171,7 @@ def parse_MPMD_cores_per_structure(value):
             return {'min': value, 'max': value}
     elif isinstance(value, str):
         if value == 'any':
-            from mpi4py import MPI
-            return {'min': 1, 'max': MPI.COMM_WORLD.Get_size()}
+            return {'min': 1, 'max': get_comm().Get_size()}
         elif '-' not in value:
             value = int(value)
             return {'min': value, 'max': value}
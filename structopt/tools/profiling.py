@@ -0,0 +1,268 @@
+"""Profiling of a run, turned on from the ``profiling`` parameters.
+
+Three profilers can be turned on independently, on every core:
+
+* ``cprofile``: the generations listed in ``generations`` (every generation
+  by default) are run under :mod:`cProfile`. Each core writes its profile to
+  ``profiling/rank<r>.pstats`` in the logging directory, and when the
+  optimizer exits the root merges them into ``profiling/merged.pstats`` and
+  writes the ``top`` functions by cumulative time to
+  ``profiling/merged.txt``.
+* ``tracemalloc``: memory allocations are traced with :mod:`tracemalloc`, and
+  every ``interval`` generations the current and peak traced memory and the
+  ``top`` lines by allocated memory, and by growth since the last snapshot,
+  are appended to ``profiling/tracemalloc-rank<r>.log``.
+* ``subprocesses``: the wall time and the CPU time of every LAMMPS and FEMSIM
+  process started by a core is appended to
+  ``profiling/subprocesses-rank<r>.log``, and the root sums them up per
+  generation in ``profiling/subprocesses.log``. FEMSIM is spawned through
+  MPI rather than as a child process, so only its wall time is known.
+
+When profiling is off, :func:`generation` and :func:`subprocess` return a
+shared no-op context manager.
+"""
+
+import os
+import time
+import glob
+import pstats
+import cProfile
+import resource
+import tracemalloc
+from collections import defaultdict
+
+PROFILING_DIRECTORY = 'profiling'
+
+_profiler = None
+
+
+class _NoProfile(object):
+    __slots__ = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        pass
+
+
+_NO_PROFILE = _NoProfile()
+
+
+class Profiler(object):
+    """The profilers of one core.
+
+    Args:
+        parameters (dict): the ``profiling`` parameters
+        path (str): the logging directory
+        rank (int): the rank of the core
+    """
+
+    def __init__(self, parameters, path, rank):
+        self.parameters = parameters
+        self.path = os.path.join(path, PROFILING_DIRECTORY)
+        self.rank = rank
+        os.makedirs(self.path, exist_ok=True)
+
+        self.cprofile = parameters.get('cprofile')
+        self.profile = cProfile.Profile() if self.cprofile is not None else None
+        self.profiled = False
+
+        self.tracemalloc = parameters.get('tracemalloc')
+        self.snapshot = None
+        if self.tracemalloc is not None:
+            tracemalloc.start(self.tracemalloc.get('frames', 1))
+
+        self.subprocesses = []
+        if parameters.get('subprocesses'):
+            self.subprocess_filename = os.path.join(self.path, 'subprocesses-rank{}.log'.format(rank))
+            with open(self.subprocess_filename, 'w') as f:
+                f.write('{:>10s} {:>12s} {:>12s} {:>12s} {:>12s}\n'.format('generation', 'name', 'wall', 'user', 'sys'))
+
+    def profiles(self, generation):
+        """Returns True if `generation` is run under cProfile."""
+        if self.profile is None:
+            return False
+        generations = self.cprofile.get('generations')
+        return generations is None or generation in generations
+
+    def start_generation(self, generation):
+        if self.profiles(generation):
+            self.profile.enable()
+            self.profiled = True
+
+    def end_generation(self, generation):
+        if self.profiles(generation):
+            self.profile.disable()
+        interval = self.tracemalloc.get('interval', 1) if self.tracemalloc is not None else None
+        if interval and generation % interval == 0:
+            self.write_tracemalloc(generation)
+        self.write_subprocesses()
+
+    def write_tracemalloc(self, generation):
+        """Appends the memory use of `generation` to the tracemalloc log of the core."""
+        top = self.tracemalloc.get('top', 20)
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>')])
+        current, peak = tracemalloc.get_traced_memory()
+        with open(os.path.join(self.path, 'tracemalloc-rank{}.log'.format(self.rank)), 'a') as f:
+            f.write('Generation {}: current {:.1f} MB, peak {:.1f} MB\n'.format(generation, current / 2**20, peak / 2**20))
+            f.write('  Top {} lines\n'.format(top))
+            for statistic in snapshot.statistics('lineno')[:top]:
+                f.write('    {}\n'.format(statistic))
+            if self.snapshot is not None:
+                f.write('  Top {} differences since the last snapshot\n'.format(top))
+                for statistic in snapshot.compare_to(self.snapshot, 'lineno')[:top]:
+                    f.write('    {}\n'.format(statistic))
+            f.write('\n')
+        self.snapshot = snapshot
+
+    def record_subprocess(self, name, generation, wall, user, sys):
+        if self.parameters.get('subprocesses'):
+            self.subprocesses.append((generation, name, wall, user, sys))
+
+    def write_subprocesses(self):
+        if self.subprocesses:
+            with open(self.subprocess_filename, 'a') as f:
+                for generation, name, wall, user, sys in self.subprocesses:
+                    f.write('{:10d} {:>12s} {:12.4f} {:12.4f} {:12.4f}\n'.format(generation, name, wall, user, sys))
+            self.subprocesses = []
+
+    def flush(self):
+        """Writes the profile and the subprocess times of the core."""
+        if self.profiled:
+            self.profile.dump_stats(os.path.join(self.path, 'rank{}.pstats'.format(self.rank)))
+        self.write_subprocesses()
+
+
+class _Subprocess(object):
+    """Times an external process, which must have finished (been waited for)
+    when the block exits for its CPU time to be counted."""
+
+    __slots__ = ['name', 'generation', 'start', 'usage']
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        import gparameters
+        self.generation = gparameters.get('generation', 0)
+        self.usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        self.start = time.time()
+        return self
+
+    def __exit__(self, type, value, traceback):
+        wall = time.time() - self.start
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        if _profiler is not None:
+            _profiler.record_subprocess(self.name, self.generation, wall,
+                                        usage.ru_utime - self.usage.ru_utime,
+                                        usage.ru_stime - self.usage.ru_stime)
+
+
+class _Generation(object):
+    __slots__ = ['generation']
+
+    def __enter__(self):
+        import gparameters
+        self.generation = gparameters.generation
+        if _profiler is not None:
+            _profiler.start_generation(self.generation)
+        return self
+
+    def __exit__(self, type, value, traceback):
+        if _profiler is not None:
+            _profiler.end_generation(self.generation)
+
+
+def enable(parameters, path, rank=0):
+    """Turns on the profilers in the ``profiling`` `parameters` for this core."""
+    global _profiler
+    _profiler = Profiler(parameters, path, rank)
+
+
+def enabled():
+    """Returns True if profiling is on."""
+    return _profiler is not None
+
+
+def generation():
+    """Returns a context manager to run a generation of the optimizer in."""
+    if _profiler is None:
+        return _NO_PROFILE
+    return _Generation()
+
+
+def subprocess(name):
+    """Returns a context manager that times the external process `name`
+    (e.g. LAMMPS) started and waited for inside it."""
+    if _profiler is None or not _profiler.parameters.get('subprocesses'):
+        return _NO_PROFILE
+    return _Subprocess(name)
+
+
+def flush():
+    """Writes the profiles of this core."""
+    if _profiler is not None:
+        _profiler.flush()
+
+
+def finish():
+    """Writes the profiles of every core and, on the root, merges them. This
+    must be called on every core. Profiling is turned off afterwards."""
+    global _profiler
+    if _profiler is None:
+        return
+    import gparameters
+    profiler, _profiler = _profiler, None
+    profiler.flush()
+    if profiler.tracemalloc is not None:
+        tracemalloc.stop()
+    if gparameters.mpi.ncores > 1:
+        from .parallel import get_comm
+        get_comm().Barrier()
+    if profiler.rank == 0:
+        merge_profiles(profiler.path, profiler.cprofile.get('top', 50) if profiler.cprofile is not None else 50)
+        merge_subprocesses(profiler.path)
+
+
+def merge_profiles(path, top=50):
+    """Merges the profiles of the cores in the profiling directory `path`
+    into merged.pstats, and writes the `top` functions to merged.txt."""
+    filenames = sorted(glob.glob(os.path.join(path, 'rank*.pstats')))
+    if not filenames:
+        return None
+    with open(os.path.join(path, 'merged.txt'), 'w') as f:
+        stats = pstats.Stats(*filenames, stream=f)
+        stats.dump_stats(os.path.join(path, 'merged.pstats'))
+        stats.sort_stats('cumulative').print_stats(top)
+    return stats
+
+
+def merge_subprocesses(path):
+    """Sums up the subprocess times of the cores in the profiling directory
+    `path` per generation and name, and writes them to subprocesses.log."""
+    filenames = sorted(glob.glob(os.path.join(path, 'subprocesses-rank*.log')))
+    if not filenames:
+        return None
+    totals = defaultdict(lambda: [0, 0.0, 0.0, 0.0, 0.0])
+    for filename in filenames:
+        with open(filename) as f:
+            next(f)
+            for line in f:
+                generation, name, wall, user, sys = line.split()
+                total = totals[(int(generation), name)]
+                total[0] += 1
+                total[1] += float(wall)
+                total[2] = max(total[2], float(wall))
+                total[3] += float(user)
+                total[4] += float(sys)
+    with open(os.path.join(path, 'subprocesses.log'), 'w') as f:
+        f.write('{:>10s} {:>12s} {:>8s} {:>12s} {:>12s} {:>12s} {:>12s}\n'.format(
+            'generation', 'name', 'calls', 'wall', 'max wall', 'user', 'sys'))
+        for (generation, name), (calls, wall, max_wall, user, sys) in sorted(totals.items()):
+            f.write('{:10d} {:>12s} {:8d} {:12.4f} {:12.4f} {:12.4f} {:12.4f}\n'.format(
+                generation, name, calls, wall, max_wall, user, sys))
+    return totals
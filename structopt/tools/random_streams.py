@@ -0,0 +1,61 @@
+"""Deterministic random number streams for work that is spread over cores.
+
+Operators draw from the global ``random`` and ``np.random`` states. When the
+individuals of a population are divided among the cores, the numbers an
+individual gets from those global states depend on how many cores there are
+and which individuals each core handled before it. Running the work for each
+individual inside ``seeded(stream_seed(...))`` instead gives it its own
+stream, determined only by the keys (e.g. the run's seed, the generation and
+the individual's id), so the results do not depend on the number of cores.
+"""
+
+import random
+import hashlib
+from contextlib import contextmanager
+
+import numpy as np
+
+from .parallel import root
+
+
+def stream_seed(*keys):
+    """Returns a 32-bit seed determined by `keys`, a sequence of ints or strings."""
+    digest = hashlib.sha1(repr(keys).encode()).hexdigest()
+    return int(digest[:8], 16)
+
+
+@contextmanager
+def seeded(seed):
+    """Seeds ``random`` and ``np.random`` with `seed` inside the block and
+    restores their previous states afterwards."""
+    python_state = random.getstate()
+    numpy_state = np.random.get_state()
+    random.seed(seed)
+    np.random.seed(seed)
+    try:
+        yield
+    finally:
+        random.setstate(python_state)
+        np.random.set_state(numpy_state)
+
+
+@root
+def _draw_seed():
+    """Draws a seed for the run from the global random state."""
+    return random.getrandbits(32)
+
+
+_run_seed = None
+
+
+def run_seed():
+    """Returns the seed of the run, which is the same on every core. If the
+    parameters do not set a seed, one is drawn on the root and broadcast the
+    first time this is called."""
+    global _run_seed
+    import gparameters
+    if gparameters.get('seed') is not None:
+        return gparameters.seed
+    if _run_seed is None:
+        _run_seed = _draw_seed()
+    return _run_seed
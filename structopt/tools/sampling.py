@@ -0,0 +1,203 @@
+"""Vectorized sampling kernels used by the selection and predator operators.
+
+All of the functions work on positions (0 ... N-1) into fitness arrays and draw
+their random numbers from numpy's global random state, so runs seeded with
+``np.random.seed`` stay reproducible.
+"""
+
+import numpy as np
+
+
+def ordinal_ranks(fits):
+    """Returns the 0-based ordinal rank of each fitness. Ties are broken by
+    position, which is the same as ``scipy.stats.rankdata(fits, method='ordinal') - 1``.
+    """
+    order = np.argsort(fits, kind='stable')
+    ranks = np.empty(len(order), dtype=int)
+    ranks[order] = np.arange(len(order))
+    return ranks
+
+
+def distinct_rows(n, k, rows):
+    """Returns a (rows, k) array of integers in [0, n) with no integer repeated
+    within a row. Each row is a uniformly random k-subset of range(n).
+    """
+    if k * k > n:
+        # Collisions are likely, so shuffle the whole (small) range per row
+        return np.argsort(np.random.random_sample((rows, n)), axis=1)[:, :k]
+
+    samples = np.random.randint(0, n, size=(rows, k))
+    while True:
+        ordered = np.sort(samples, axis=1)
+        repeats = np.flatnonzero((ordered[:, 1:] == ordered[:, :-1]).any(axis=1))
+        if len(repeats) == 0:
+            return samples
+        samples[repeats] = np.random.randint(0, n, size=(len(repeats), k))
+
+
+def weighted_pairs(p, npairs, unique_pairs=False, unique_parents=False):
+    """Draws `npairs` pairs of positions. The first member of each pair is
+    chosen with probability `p` and the second with `p` renormalized over every
+    position except the first. If all of the remaining probability is zero the
+    choice is made uniformly instead.
+
+    Parameters
+    ----------
+    p : np.ndarray
+        The probability of choosing each position.
+    npairs : int
+        The number of pairs to draw.
+    unique_pairs : bool
+        If True, no two pairs contain the same two positions.
+    unique_parents : bool
+        If True, every position appears in at most one pair.
+
+    Returns
+    -------
+    np.ndarray
+        A (npairs, 2) integer array.
+    """
+    p = np.asarray(p, dtype=float)
+    N = len(p)
+    if np.sum(p) <= 0:
+        p = np.ones(N)
+    p = p / np.sum(p)
+
+    if unique_parents:
+        # Drawing fathers and mothers one at a time without replacement is
+        # successive sampling without replacement of 2*npairs positions
+        nonzero = np.count_nonzero(p)
+        ndraw = 2 * npairs
+        if nonzero >= ndraw:
+            drawn = np.random.choice(N, ndraw, replace=False, p=p)
+        else:
+            weighted = np.random.choice(N, nonzero, replace=False, p=p)
+            rest = np.random.permutation(np.flatnonzero(p == 0))[:ndraw - nonzero]
+            drawn = np.append(weighted, rest)
+        return drawn.reshape(npairs, 2)
+
+    cdf = np.cumsum(p)
+    cdf /= cdf[-1]
+    u = np.random.random_sample((npairs, 2))
+    fathers = cdf[:-1].searchsorted(u[:, 0], side='right')
+
+    # Sample the mother from the cdf with the father's slice cut out: values
+    # below the start of the father's slice map directly, the others are
+    # shifted past it
+    p_father = p[fathers]
+    before = cdf[fathers] - p_father
+    rest = 1.0 - p_father
+    x = u[:, 1] * rest
+    mothers = np.where(x < before,
+                       cdf[:-1].searchsorted(x, side='right'),
+                       cdf[:-1].searchsorted(x + p_father, side='right'))
+    clash = mothers == fathers  # only possible through round-off
+    mothers[clash] = cdf[:-1].searchsorted(x[clash], side='right')
+
+    # Fathers that hold all of the probability get a uniformly chosen mother
+    uniform = np.flatnonzero(rest <= 1e-12)
+    if len(uniform) > 0:
+        others = np.random.randint(0, N - 1, size=len(uniform))
+        others[others >= fathers[uniform]] += 1
+        mothers[uniform] = others
+
+    pairs = np.column_stack((fathers, mothers))
+    if unique_pairs:
+        redraw_repeated_pairs(pairs, N, lambda father, excluded: _weighted_excluding(p, excluded))
+    return pairs
+
+
+def _weighted_excluding(p, excluded):
+    """Chooses a position with probability `p` renormalized over the positions
+    not in `excluded`, or uniformly if none of them has a nonzero probability.
+    """
+    p = p.copy()
+    p[excluded] = 0.0
+    if np.sum(p) > 0:
+        return np.random.choice(len(p), p=p / np.sum(p))
+    allowed = np.setdiff1d(np.arange(len(p)), excluded)
+    return np.random.choice(allowed)
+
+
+def redraw_repeated_pairs(pairs, N, draw_mother):
+    """Walks through the (npairs, 2) array `pairs` of positions in [0, N) in
+    order and redraws, in place, the mother of any pair that repeats an earlier
+    (unordered) pair. `draw_mother(father, excluded)` must return a position
+    that is not in the list `excluded`.
+    """
+    seen = set()
+    partners = {}
+    for i, (father, mother) in enumerate(pairs.tolist()):
+        if (min(father, mother), max(father, mother)) in seen:
+            excluded = [father] + sorted(partners.get(father, ()))
+            if len(excluded) < N:
+                mother = int(draw_mother(father, excluded))
+                pairs[i, 1] = mother
+        seen.add((min(father, mother), max(father, mother)))
+        partners.setdefault(father, set()).add(mother)
+        partners.setdefault(mother, set()).add(father)
+
+
+def tournament_winners(ranks, candidates):
+    """Runs one tournament per row of `candidates` (a 2D array of positions)
+    and returns the position with the best (lowest) rank from each row.
+    """
+    best = np.argmin(ranks[candidates], axis=1)
+    return candidates[np.arange(len(candidates)), best]
+
+
+def sequential_tournaments(ranks, nwinners, tournament_size, removed=None):
+    """Runs `nwinners` tournaments one after the other, removing the winner of
+    each tournament from the pool before the next one is held. A tournament
+    draws `tournament_size` distinct positions from the pool; once the pool is
+    no larger than that, the remaining positions win in rank order.
+
+    Tournaments are drawn in batches from the current pool. A batch is
+    accepted up to (not including) the first tournament that contains the
+    winner of an earlier tournament in the same batch, which gives the same
+    result as redrawing that tournament from the reduced pool.
+
+    Parameters
+    ----------
+    ranks : np.ndarray
+        Ordinal ranks of the positions (lower is better).
+    nwinners : int
+        The number of tournaments to hold.
+    tournament_size : int
+        The number of positions in each tournament.
+    removed : np.ndarray
+        Optional boolean mask of positions that are not in the pool. It is
+        updated in place with the winners.
+
+    Returns
+    -------
+    np.ndarray
+        The positions of the winners in the order they won.
+    """
+    N = len(ranks)
+    if removed is None:
+        removed = np.zeros(N, dtype=bool)
+    winners = []
+    while len(winners) < nwinners:
+        need = nwinners - len(winners)
+        pool = np.flatnonzero(~removed)
+        if len(pool) <= tournament_size:
+            rest = pool[np.argsort(ranks[pool])][:need]
+            removed[rest] = True
+            winners.extend(rest.tolist())
+            break
+
+        batch = min(need, int(np.sqrt(len(pool) / tournament_size)) + 1)
+        candidates = pool[distinct_rows(len(pool), tournament_size, batch)]
+        won = tournament_winners(ranks, candidates)
+
+        # Row at which each position first won in this batch
+        first_win = np.full(N, batch, dtype=int)
+        first_win[won[::-1]] = np.arange(batch)[::-1]
+        conflicts = (first_win[candidates] < np.arange(batch)[:, np.newaxis]).any(axis=1)
+        naccept = np.argmax(conflicts) if conflicts.any() else batch
+
+        won = won[:naccept]
+        removed[won] = True
+        winners.extend(won.tolist())
+    return np.array(winners, dtype=int)
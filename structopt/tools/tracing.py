@@ -0,0 +1,302 @@
+"""Per-core tracing of where the time of a run goes.
+
+When the ``tracing`` parameter is on, every core records a span (a name, a
+category, a start time and a duration) for each phase of a generation, each
+``@root`` and ``@parallel`` function, each MPI call made through
+:func:`structopt.tools.get_comm` (see :mod:`structopt.tools.communication`),
+each LAMMPS subprocess and the file I/O around it, and the expensive STEM
+calls. Spans are buffered in memory and appended to ``trace/rank<r>.jsonl``
+in the logging directory. When the optimizer exits, the root merges the
+files of all of the cores into ``trace.json``, which can be opened with
+``chrome://tracing`` or https://ui.perfetto.dev, and writes a per-generation
+summary of the load imbalance between the cores to ``load_imbalance.log``.
+
+The categories of the spans are
+
+* ``step`` and ``phase``: a whole generation and each of its phases
+  (selection, crossover, ...),
+* ``root`` and ``parallel``: the decorated functions,
+* ``mpi``: time spent inside MPI calls, i.e. waiting for the other cores,
+* ``subprocess``: time spent waiting for external codes such as LAMMPS,
+* ``io``: reading and writing files,
+* anything else (e.g. ``STEM``): Python.
+
+When tracing is off, :func:`span` returns a shared no-op context manager, so
+the instrumentation costs one global lookup per call.
+"""
+
+import os
+import json
+import glob
+import time
+import functools
+import threading
+from collections import defaultdict
+
+TRACE_DIRECTORY = 'trace'
+TRACE_FILENAME = 'trace.json'
+IMBALANCE_FILENAME = 'load_imbalance.log'
+
+# Categories that are reported separately in the load imbalance summary;
+# the rest of the time of a generation is counted as Python
+WAIT_CATEGORIES = ['mpi', 'subprocess', 'io']
+# The buffer of a core is written to its file when it has this many spans
+BUFFER_SIZE = 10000
+
+_tracer = None
+
+
+class Tracer(object):
+    """Records the spans of one core.
+
+    Args:
+        path (str): the logging directory
+        rank (int): the rank of the core
+        origin (float): the time (from ``time.time()``) that the timestamps
+            are relative to, which must be the same on every core
+    """
+
+    def __init__(self, path, rank, origin):
+        self.path = path
+        self.rank = rank
+        self.origin = origin
+        self.filename = os.path.join(path, TRACE_DIRECTORY, 'rank{}.jsonl'.format(rank))
+        self.events = []
+        self.threads = {threading.get_ident(): 0}
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+        with open(self.filename, 'w') as f:
+            f.write(json.dumps({'name': 'process_name', 'ph': 'M', 'pid': rank, 'tid': 0,
+                                'args': {'name': 'rank {}'.format(rank)}}) + '\n')
+
+    def record(self, name, category, start, end, generation, args=None):
+        """Records a span of `generation` that started at `start` and ended
+        at `end`."""
+        event = {'name': name, 'cat': category, 'ph': 'X',
+                 'ts': round((start - self.origin) * 1e6, 1),
+                 'dur': round((end - start) * 1e6, 1),
+                 'pid': self.rank,
+                 'tid': self._thread(),
+                 'args': {'generation': generation}}
+        if args:
+            event['args'].update(args)
+        with self.lock:
+            self.events.append(event)
+            full = len(self.events) >= BUFFER_SIZE
+        if full:
+            self.flush()
+
+    def _thread(self):
+        ident = threading.get_ident()
+        with self.lock:
+            if ident not in self.threads:
+                self.threads[ident] = len(self.threads)
+            return self.threads[ident]
+
+    def flush(self):
+        """Appends the buffered spans to the file of the core."""
+        with self.lock:
+            events, self.events = self.events, []
+        if events:
+            with open(self.filename, 'a') as f:
+                for event in events:
+                    f.write(json.dumps(event) + '\n')
+
+
+class Span(object):
+    """A context manager that records the time spent inside it."""
+
+    __slots__ = ['name', 'category', 'args', 'start', 'generation']
+
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        import gparameters
+        self.generation = gparameters.get('generation', 0)
+        self.start = time.time()
+        return self
+
+    def __exit__(self, type, value, traceback):
+        if _tracer is not None:
+            _tracer.record(self.name, self.category, self.start, time.time(), self.generation, self.args)
+
+
+class _NoSpan(object):
+    __slots__ = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+def enabled():
+    """Returns True if tracing is on."""
+    return _tracer is not None
+
+
+def span(name, category='python', **args):
+    """Returns a context manager that records the time spent inside it as a
+    span, or does nothing if tracing is off. `args` are shown with the span
+    in the trace viewer."""
+    if _tracer is None:
+        return _NO_SPAN
+    return Span(name, category, args)
+
+
+def traced(name=None, category='python'):
+    """A decorator that records every call of the function as a span named
+    `name`, by default the qualified name of the function."""
+    def decorator(function):
+        span_name = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return function(*args, **kwargs)
+            with Span(span_name, category, None):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def enable(path, rank=0, ncores=1):
+    """Turns tracing on for this core. This must be called on every core at
+    the same time, because the cores agree on the origin of the timestamps."""
+    global _tracer
+    origin = time.time()
+    if ncores > 1:
+        from .parallel import get_comm
+        origin = get_comm().bcast(origin, root=0)
+    _tracer = Tracer(path, rank, origin)
+
+
+def flush():
+    """Writes the buffered spans of this core to its file."""
+    if _tracer is not None:
+        _tracer.flush()
+
+
+def finish():
+    """Writes the buffered spans of every core and, on the root, merges them
+    into trace.json and load_imbalance.log. This must be called on every core.
+    Tracing is turned off afterwards."""
+    global _tracer
+    if _tracer is None:
+        return
+    import gparameters
+    tracer, _tracer = _tracer, None
+    tracer.flush()
+    if gparameters.mpi.ncores > 1:
+        from .parallel import get_comm
+        get_comm().Barrier()
+    if tracer.rank == 0:
+        events = merge(tracer.path)
+        write_load_imbalance(os.path.join(tracer.path, IMBALANCE_FILENAME), events)
+
+
+def merge(path):
+    """Merges the span files of all of the cores in the logging directory
+    `path` into a Chrome trace, ``trace.json``, and returns its events."""
+    events = []
+    for filename in sorted(glob.glob(os.path.join(path, TRACE_DIRECTORY, 'rank*.jsonl'))):
+        with open(filename) as f:
+            events.extend(json.loads(line) for line in f if line.strip())
+    with open(os.path.join(path, TRACE_FILENAME), 'w') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+    return events
+
+
+def _covered(intervals):
+    """Returns the total length of the union of (start, end) `intervals`."""
+    total = 0.0
+    end = None
+    for start, stop in sorted(intervals):
+        if end is None or start > end:
+            total += stop - start
+            end = stop
+        elif stop > end:
+            total += stop - end
+            end = stop
+    return total
+
+
+def load_imbalance(events):
+    """Summarizes the load imbalance between the cores in each generation.
+
+    For every phase of a generation, the busy time of a core is the time it
+    spent in the phase minus the time it spent waiting in MPI calls. The
+    imbalance of a phase is ``max / mean - 1`` of the busy times, i.e. the
+    fraction of the phase the average core spent waiting for the slowest.
+
+    Args:
+        events (list): the events of a merged trace
+
+    Returns:
+        dict: {generation: {'phases': {phase: {rank: (busy, wait)}},
+            'ranks': {rank: {'total': ..., 'mpi': ..., 'subprocess': ...,
+            'io': ..., 'python': ...}}}}, with the times in seconds
+    """
+    # Only the main thread of each core takes part in the collectives
+    spans = defaultdict(list)
+    for event in events:
+        if event.get('ph') == 'X' and event.get('tid', 0) == 0:
+            start = event['ts'] * 1e-6
+            spans[event['pid']].append((start, start + event['dur'] * 1e-6, event['cat'], event['name'],
+                                        event['args'].get('generation', 0)))
+
+    summary = defaultdict(lambda: {'phases': defaultdict(dict), 'ranks': {}})
+    for rank, rank_spans in spans.items():
+        waits = {category: [(start, end) for start, end, cat, _, _ in rank_spans if cat == category]
+                 for category in WAIT_CATEGORIES}
+        for start, end, category, name, generation in rank_spans:
+            if category not in ('step', 'phase'):
+                continue
+            clipped = {cat: [(max(s, start), min(e, end)) for s, e in intervals if s < end and e > start]
+                       for cat, intervals in waits.items()}
+            inside = {cat: _covered(intervals) for cat, intervals in clipped.items()}
+            if category == 'phase':
+                phases = summary[generation]['phases'][name]
+                busy, wait = phases.get(rank, (0.0, 0.0))
+                phases[rank] = (busy + end - start - inside['mpi'], wait + inside['mpi'])
+            else:
+                times = {'total': end - start}
+                times.update(inside)
+                # e.g. an MPI call inside a file write is not counted twice
+                times['python'] = times['total'] - _covered([interval for intervals in clipped.values() for interval in intervals])
+                summary[generation]['ranks'][rank] = times
+    return summary
+
+
+def write_load_imbalance(filename, events):
+    """Writes the summary returned by load_imbalance to `filename`."""
+    summary = load_imbalance(events)
+    with open(filename, 'w') as f:
+        for generation in sorted(summary):
+            f.write('Generation {}\n'.format(generation))
+            f.write('  {:16s} {:>10s} {:>10s} {:>10s} {:>8s} {:>10s} {:>10s}\n'.format(
+                'phase', 'busy mean', 'busy max', 'imbalance', 'slowest', 'wait mean', 'wait max'))
+            for phase, ranks in summary[generation]['phases'].items():
+                busy = {rank: times[0] for rank, times in ranks.items()}
+                wait = [times[1] for times in ranks.values()]
+                mean = sum(busy.values()) / len(busy)
+                slowest = max(busy, key=busy.get)
+                imbalance = busy[slowest] / mean - 1 if mean > 0 else 0.0
+                f.write('  {:16s} {:9.3f}s {:9.3f}s {:9.1f}% {:>8d} {:9.3f}s {:9.3f}s\n'.format(
+                    phase, mean, busy[slowest], 100 * imbalance, slowest, sum(wait) / len(wait), max(wait)))
+            ranks = summary[generation]['ranks']
+            if ranks:
+                f.write('  {:16s} {:>10s} {:>10s} {:>10s} {:>10s} {:>10s}\n'.format(
+                    'rank', 'total', 'mpi', 'subprocess', 'io', 'python'))
+                for rank in sorted(ranks):
+                    times = ranks[rank]
+                    f.write('  {:<16d} {:9.3f}s {:9.3f}s {:9.3f}s {:9.3f}s {:9.3f}s\n'.format(
+                        rank, times['total'], times['mpi'], times['subprocess'], times['io'], times['python']))
+            f.write('\n')
@@ -1,16 +1,17 @@
 import os
 import sys
-import json
 import re
 import importlib
 import weakref
-from collections import defaultdict, Counter
+from collections import Counter
 import numpy as np
 import warnings
 
 from .common import lazy, lazyproperty
+from .index import RunIndex
 
 from structopt.io import read_xyz
+from structopt.io.structure_archive import StructureArchive
 from structopt.tools.dictionaryobject import DictionaryObject
 
 
@@ -23,54 +24,40 @@ def parse_gene(gene):
 
 class DataExplorer(object):
     def __init__(self, dir):
+        self.dir = dir
         self.genealogy_file = os.path.join(dir, 'genealogy.log')
         self.fitnesses_file = os.path.join(dir, 'fitnesses.log')
         self.output_file = os.path.join(dir, 'output.log')
         self._icache = {}
-        self._created_killed = None
+        self.archive = StructureArchive(dir) if StructureArchive.exists(dir) else None
+
+    @lazyproperty
+    def index(self):
+        return RunIndex(self.dir)
 
     @lazyproperty
     def generations(self):
-        return Generations(self.genealogy_file, self)
+        return Generations(self)
 
     @lazyproperty
     def parameters(self):
-        parameters = []
-        start_flag = False
-        for line in open(self.output_file):
-            if 'Current parameters:' in line:
-                start_flag = True
-                continue
-            if start_flag:
-                if 'INFO : {' in line:
-                    line = line.split('INFO : ')[1]
-                parameters.append(line)
-            if line == '}\n':
-                start_flag = False
-                break
-        parameters = ''.join(parameters)
-        parameters = DictionaryObject(json.loads(parameters))
+        parameters = DictionaryObject(self.index.parameters)
         sys.modules['gparameters'] = parameters
         return parameters
 
-    @lazyproperty
-    def _fitnesses(self):
-        fitnesses = {}
-        for line in open(self.fitnesses_file):
-            firsthalf = re.compile(".+ : INFO : Generation (\d+), Individual (\d+):(.*)")
-            secondhalf = re.compile("([\w]+): ([-\d]+.\d+|inf)")
-            generation, id, fitness_str = firsthalf.findall(line)[0]
-            fitnesses[int(id)] = {fit: float(value) for fit, value in secondhalf.findall(fitness_str)}
-        return fitnesses
-
     def _get_fitness(self, id):
-        fits = self._fitnesses[id]
-        weights = {name: module.weight for name, module in self.parameters.fitnesses.items()}
-        fitness = sum(fits[module]*weights[module] for module in fits)
-        return fitness
+        return self.index.fitness(id)
 
     def _get_module_fitness(self, id, module):
-        return self._fitnesses[id][module]
+        return self.index.fitness(id, module)
+
+    def get_min_fitnesses(self):
+        """
+        Returns
+        -------
+            np.ndarray : The minimum fitness of every generation.
+        """
+        return np.array(self.index.min_fitness)
 
     def __getitem__(self, index):
         return self.generations[index]
@@ -91,36 +78,30 @@ class DataExplorer(object):
         -------
             tuple<int, int> : (created_on, killed_on)
         """
-        if self._created_killed is None:
-            created_killed = defaultdict(lambda: [np.inf, -np.inf])
-            for generation, population in enumerate(self):
-                for id_ in population.keys():
-                    if generation < created_killed[id_][0]:
-                        created_killed[id_][0] = generation
-                    if generation > created_killed[id_][1]:
-                        created_killed[id_][1] = generation + 1
-            self._created_killed = created_killed
-        return self._created_killed[id]
+        return self.index.created_killed(id)
 
 
 class Generations(object):
-    def __init__(self, genealogy_filename, dataexplorer):
+    def __init__(self, dataexplorer):
         self._dataexplorer = weakref.ref(dataexplorer)
-        generations = open(genealogy_filename).readlines()
-        self._data = [line.strip().split(' : INFO : ')[-1] for line in generations]
+        self._data = {}
 
     def __getitem__(self, index):
-        if isinstance(self._data[index], Population):
-            return self._data[index]
-        else:
-            generation, data = self._data[index].split(": ")  # Split at : in "Generation n: ..."
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        if index not in self._data:
+            line = self._dataexplorer().index.genealogy_line(index)
+            line = line.strip().split(' : INFO : ')[-1]
+            generation, data = line.split(":", 1)  # Split at : in "Generation n: ..."
             generation = int(generation.split(" ")[-1])  # Get n from "Generation n"
             assert generation == index
-            self._data[index] = Population(generation, data, self._dataexplorer())
-            return self._data[index]
+            self._data[index] = Population(generation, data.strip(), self._dataexplorer())
+        return self._data[index]
 
     def __len__(self):
-        return len(self._data)
+        return self._dataexplorer().index.ngenerations
 
 
 class Population(dict):
@@ -277,6 +258,20 @@ class Individual(object):
         self.structure_type = parameters.structure_type.lower()
         module = importlib.import_module('structopt.{}'.format(self.structure_type))
         Structure = getattr(module, self.structure_type.title())
+        archive = self._dataexplorer().archive
+        if filename is None and archive is not None and self.id in archive:
+            atoms = archive.read(self.id)
+            self._structure = Structure(id=self.id,
+                                  relaxation_parameters=parameters.relaxations,
+                                  fitness_parameters=parameters.fitnesses,
+                                  mutation_parameters=parameters.mutations,
+                                  pso_moves_parameters=parameters.pso_moves,
+                                  generator_parameters=None)
+            self._structure.extend(atoms)
+            self._structure.set_cell(atoms.get_cell())
+            self._structure.set_pbc(atoms.get_pbc())
+            self._loaded = True
+            return self._structure
         if filename is None:
             filename = os.path.join(self._dataexplorer().parameters.logging.path, 'modelfiles', 'individual{}.xyz'.format(self.id))
         generator_parameters = {"read_xyz": {"filename": filename}}
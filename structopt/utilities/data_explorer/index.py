@@ -0,0 +1,239 @@
+"""An on-disk index of a log directory for the DataExplorer.
+
+The index is built the first time a log directory is opened and saved next
+to the logs in the ``explorer_index`` directory, so the logs only have to be
+parsed once. It is rebuilt if the logs have changed since, e.g. because the
+run was still going. The index holds
+
+* the byte offset of every generation in ``genealogy.log``, so a generation
+  is read with a single seek,
+* the ids of all of the individuals, sorted, with the generations they were
+  created and killed on and their fitnesses,
+* the minimum fitness of every generation, and
+* the parameters of the run from ``output.log``.
+
+The arrays are saved as ``.npy`` files and memory mapped when they are read,
+and an individual is looked up by a binary search of the sorted ids.
+"""
+
+import os
+import re
+import json
+import shutil
+import warnings
+
+import numpy as np
+
+from structopt.io.run_store import RunStore
+
+INDEX_DIRECTORY = 'explorer_index'
+INDEX_VERSION = 1
+ARRAYS = ['generation_offsets', 'ids', 'created', 'killed', 'fitness', 'min_fitness']
+
+GENE = re.compile(r'(\d+)(?:c\w+\(\d+\+\d+\))?(?:m\w+\(\d+\))?')
+FITNESS_LINE = re.compile(r".+ : INFO : Generation (\d+), Individual (\d+):(.*)")
+MODULE_FITNESS = re.compile(r"([\w]+): ([-\d]+.\d+|inf)")
+
+
+def read_parameters(output_file):
+    """Returns the JSON block of parameters logged to `output_file`, or None."""
+    if not os.path.exists(output_file):
+        return None
+    parameters = []
+    start_flag = False
+    for line in open(output_file):
+        if 'Current parameters:' in line:
+            start_flag = True
+            continue
+        if start_flag:
+            if 'INFO : {' in line:
+                line = line.split('INFO : ')[1]
+            parameters.append(line)
+        if line == '}\n':
+            break
+    if not parameters:
+        return None
+    return json.loads(''.join(parameters))
+
+
+class RunIndex(object):
+    """Builds or loads the index of the log directory `dir`.
+
+    Parameters
+    ----------
+    dir : str
+        The log directory of a run.
+    """
+
+    def __init__(self, dir):
+        self.dir = dir
+        self.path = os.path.join(dir, INDEX_DIRECTORY)
+        self.genealogy_file = os.path.join(dir, 'genealogy.log')
+        self.fitnesses_file = os.path.join(dir, 'fitnesses.log')
+        self.output_file = os.path.join(dir, 'output.log')
+
+        sources = self._sources()
+        meta = self._read_meta()
+        if meta is not None and meta['version'] == INDEX_VERSION and meta['sources'] == sources:
+            self.meta = meta
+            self.parameters = meta['parameters']
+            self.arrays = {name: np.load(os.path.join(self.path, '{}.npy'.format(name)), mmap_mode='r')
+                           for name in ARRAYS}
+        else:
+            self.build(sources)
+
+    def _sources(self):
+        """Returns the sizes of the files the index is built from."""
+        filenames = [self.genealogy_file, self.fitnesses_file, self.output_file,
+                     os.path.join(self.dir, 'store', 'individuals', 'id.bin')]
+        return {os.path.basename(filename): os.path.getsize(filename) if os.path.exists(filename) else None
+                for filename in filenames}
+
+    def _read_meta(self):
+        try:
+            with open(os.path.join(self.path, 'meta.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def build(self, sources):
+        """Parses the logs and saves the index."""
+        self.parameters = read_parameters(self.output_file)
+
+        # One pass over the genealogy for the generation offsets and the
+        # generations every individual was alive in
+        offsets = [0]
+        created_killed = {}
+        generation = 0
+        with open(self.genealogy_file, 'rb') as f:
+            for line in f:
+                offsets.append(offsets[-1] + len(line))
+                genes = line.decode().strip().split(' : INFO : ')[-1]
+                if genes.startswith('Generation '):
+                    genes = genes.split(': ', 1)[1] if ': ' in genes else ''
+                for id in GENE.findall(genes):
+                    id = int(id)
+                    if id not in created_killed:
+                        created_killed[id] = [generation, generation + 1]
+                    else:
+                        created_killed[id][1] = generation + 1
+                generation += 1
+        ngenerations = generation
+
+        ids = np.array(sorted(created_killed), dtype=np.int64)
+        created = np.array([created_killed[id][0] for id in ids.tolist()], dtype=np.int64)
+        killed = np.array([created_killed[id][1] for id in ids.tolist()], dtype=np.int64)
+
+        modules, fitness, min_fitness = self._build_fitnesses(ids, ngenerations)
+        arrays = {'generation_offsets': np.array(offsets, dtype=np.int64),
+                  'ids': ids,
+                  'created': created,
+                  'killed': killed,
+                  'fitness': fitness,
+                  'min_fitness': min_fitness}
+        meta = {'version': INDEX_VERSION,
+                'sources': sources,
+                'modules': modules,
+                'parameters': self.parameters}
+        self.meta = meta
+        self.arrays = arrays
+
+        tmp_path = '{}.{}.tmp'.format(self.path, os.getpid())
+        try:
+            os.makedirs(tmp_path, exist_ok=True)
+            for name, array in arrays.items():
+                np.save(os.path.join(tmp_path, '{}.npy'.format(name)), array)
+            # The meta file is written last, so an incomplete index is never loaded
+            with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+                json.dump(meta, f)
+            if os.path.exists(self.path):
+                shutil.rmtree(self.path)
+            os.replace(tmp_path, self.path)
+        except OSError as error:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            warnings.warn("Could not save the index of {}, so it will be built again next time: {}".format(self.dir, error))
+
+    def _build_fitnesses(self, ids, ngenerations):
+        """Returns the fitness modules, the (total, *modules) fitnesses of
+        every individual in `ids` and the minimum fitness of every
+        generation."""
+        if RunStore.exists(self.dir):
+            data = RunStore(self.dir).read('individuals')
+            modules = [name[len('fitness.'):] for name in data if name.startswith('fitness.')]
+            generations = np.asarray(data['generation'], dtype=np.int64)
+            row_ids = np.asarray(data['id'], dtype=np.int64)
+            columns = [np.asarray(data['fitness'], dtype=float)]
+            columns += [np.asarray(data['fitness.{}'.format(module)], dtype=float) for module in modules]
+        else:
+            weights = {}
+            if self.parameters is not None:
+                weights = {name: module['weight'] for name, module in self.parameters['fitnesses'].items()}
+            generations, row_ids, rows = [], [], []
+            for line in open(self.fitnesses_file):
+                generation, id, fitness_str = FITNESS_LINE.findall(line)[0]
+                generations.append(int(generation))
+                row_ids.append(int(id))
+                rows.append({module: float(value) for module, value in MODULE_FITNESS.findall(fitness_str)})
+            modules = sorted(set(module for fits in rows for module in fits))
+            generations = np.array(generations, dtype=np.int64)
+            row_ids = np.array(row_ids, dtype=np.int64)
+            columns = [np.array([sum(fits[module] * weights.get(module, 1.0) for module in fits) for fits in rows])]
+            columns += [np.array([fits.get(module, np.nan) for fits in rows]) for module in modules]
+
+        fitness = np.full((len(ids), len(modules) + 1), np.nan)
+        if len(row_ids) > 0:
+            # The last row of an individual has its final fitnesses
+            unique, last = np.unique(row_ids[::-1], return_index=True)
+            rows = len(row_ids) - 1 - last
+            found = np.searchsorted(ids, unique)
+            known = (found < len(ids)) & (ids[np.minimum(found, len(ids) - 1)] == unique)
+            for column, values in enumerate(columns):
+                fitness[found[known], column] = values[rows[known]]
+
+        size = max(ngenerations, int(generations.max()) + 1 if len(generations) > 0 else 0)
+        min_fitness = np.full(size, np.inf)
+        if len(generations) > 0:
+            np.minimum.at(min_fitness, generations, columns[0])
+        return modules, fitness, min_fitness
+
+    @property
+    def ngenerations(self):
+        return len(self.arrays['generation_offsets']) - 1
+
+    def genealogy_line(self, generation):
+        """Returns the line of `generation` in genealogy.log."""
+        offsets = self.arrays['generation_offsets']
+        start, end = int(offsets[generation]), int(offsets[generation + 1])
+        with open(self.genealogy_file, 'rb') as f:
+            f.seek(start)
+            return f.read(end - start).decode()
+
+    def _row(self, id):
+        ids = self.arrays['ids']
+        row = int(np.searchsorted(ids, id))
+        if row == len(ids) or ids[row] != id:
+            return None
+        return row
+
+    def created_killed(self, id):
+        """Returns the generation `id` was created on and the generation after
+        it was last alive, or (inf, -inf) if it never made it into the logs."""
+        row = self._row(id)
+        if row is None:
+            return np.inf, -np.inf
+        return int(self.arrays['created'][row]), int(self.arrays['killed'][row])
+
+    def fitness(self, id, module=None):
+        """Returns the total fitness of `id`, or that of fitness `module`."""
+        row = self._row(id)
+        if module is not None and module not in self.meta['modules']:
+            raise KeyError(module)
+        column = 0 if module is None else self.meta['modules'].index(module) + 1
+        if row is None or np.isnan(self.arrays['fitness'][row, column]):
+            raise KeyError(id)
+        return float(self.arrays['fitness'][row, column])
+
+    @property
+    def min_fitness(self):
+        """The minimum fitness of every generation."""
+        return self.arrays['min_fitness']
@@ -89,9 +89,17 @@ class JobManager(object):
 
         self.parameters.update(parameters)
 
-    def restart(self): # TODO
-        """Loads up the last generation of a previous run and modifies 
-        the self.parameters to load up those structures on the next run"""
+    def restart(self):
+        """Modifies the self.parameters to continue the previous run on the
+        next run. If the previous run wrote a checkpoint, the next run
+        continues exactly from it. Otherwise the structures of the last
+        generation are loaded and have to be relaxed and evaluated again."""
+
+        checkpoint = os.path.join(self.log_dir, 'checkpoint.pkl')
+        if os.path.exists(checkpoint) or os.path.exists(os.path.join(self.log_dir, 'island0', 'checkpoint.pkl')):
+            self.parameters.update({'restart': self.log_dir})
+            self.status = 'initialized'
+            return
 
         XYZs_dir = os.path.join(self.log_dir, 'XYZs/generation{}'.format(self.generations[-1]))
         fnames = [os.path.join(XYZs_dir, f) for f in os.listdir(XYZs_dir) if f.endswith('.xyz')]
@@ -15,6 +15,7 @@ import ase
 
 import structopt.utilities
 from ..common.individual import Individual
+from ..io.run_store import RunStore
 from .exceptions import StructOptUnknownState, StructOptRunning, StructOptQueued, StructOptSubmitted
 
 class StructOpt(object):
@@ -94,9 +95,17 @@ class StructOpt(object):
 
         self.parameters.update(parameters)
 
-    def restart(self): # TODO
-        """Loads up the last generation of a previous run and modifies 
-        the self.parameters to load up those structures on the next run"""
+    def restart(self):
+        """Modifies the self.parameters to continue the previous run on the
+        next run. If the previous run wrote a checkpoint, the next run
+        continues exactly from it. Otherwise the structures of the last
+        generation are loaded and have to be relaxed and evaluated again."""
+
+        checkpoint = os.path.join(self.log_dir, 'checkpoint.pkl')
+        if os.path.exists(checkpoint) or os.path.exists(os.path.join(self.log_dir, 'island0', 'checkpoint.pkl')):
+            self.parameters.update({'restart': self.log_dir})
+            self.status = 'initialized'
+            return
 
         XYZs_dir = os.path.join(self.log_dir, 'XYZs/generation{}'.format(self.generations[-1]))
         fnames = [os.path.join(XYZs_dir, f) for f in os.listdir(XYZs_dir) if f.endswith('.xyz')]
@@ -512,6 +521,19 @@ class StructOpt(object):
                     tag = (getattr(getattr(module, attr), 'tag'))
                     crossover_tags[tag] = attr
 
+        if RunStore.exists(self.log_dir):
+            data = RunStore(self.log_dir).read('individuals', ['generation', 'crossover', 'mutation'])
+            generations = np.unique(data['generation'])
+            generation_index = np.searchsorted(generations, data['generation'])
+            for column, tags, counts in [('crossover', crossover_tags, crossovers),
+                                         ('mutation', mutation_tags, mutations)]:
+                for tag in np.unique(data[column][data[column] != '']):
+                    used = generation_index[data[column] == tag]
+                    counts[tags[tag]] = np.bincount(used, minlength=len(generations)).tolist()
+            self.mutations = mutations
+            self.crossovers = crossovers
+            return
+
         with open(os.path.join(self.log_dir, 'genealogy.log')) as geneology_file:
             for i, line in enumerate(geneology_file):
 
@@ -565,6 +587,22 @@ class StructOpt(object):
         current_fitnesses = deepcopy(all_fitnesses)
         all_ids = deepcopy(all_fitnesses)
 
+        if RunStore.exists(self.log_dir):
+            data = RunStore(self.log_dir).read('individuals')
+            _, sizes = np.unique(data['generation'], return_counts=True)
+            splits = np.cumsum(sizes)[:-1]
+            for id in data['id'].tolist():
+                self.individuals.setdefault(id, None)
+            for module in modules + ['total']:
+                fitness = data['fitness' if module == 'total' else 'fitness.{}'.format(module)]
+                # Sort each generation by fitness
+                order = np.lexsort((fitness, data['generation']))
+                all_fitnesses[module] = [tuple(fits.tolist()) for fits in np.split(fitness[order], splits)]
+                all_ids[module] = [tuple(ids.tolist()) for ids in np.split(data['id'][order], splits)]
+            self.fitness = {module: np.array(all_fitnesses[module]) for module in all_fitnesses}
+            self.ids = all_ids
+            return
+
         current_generation = 0
         ids = []
         with open(os.path.join(self.log_dir, 'fitnesses.log')) as fitness_file:
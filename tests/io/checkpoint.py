@@ -0,0 +1,51 @@
+import os
+import random
+import numpy as np
+import structopt
+import gparameters
+from structopt.tools.dictionaryobject import DictionaryObject
+from structopt.common.population import Population
+from structopt.optimizers.genetic import GeneticAlgorithm
+from structopt.io.checkpoint import checkpoint_filename, load_checkpoint, load_population
+
+parameters = structopt.setup(DictionaryObject({
+    "structure_type": "cluster",
+    "seed": 3,
+    "generators": {"sphere": {"number_of_individuals": 4,
+                              "kwargs": {"atomlist": [["Au", 13]], "cell": [20, 20, 20]}}},
+    "convergence": {"max_generations": 10},
+    "checkpoint": {"generations": 1},
+}))
+population = Population(parameters=parameters)
+population.set_column('_fitness', [2.0, 1.0, 4.0, 3.0])
+population.set_column('_relaxed', [True, True, False, True])
+population.set_column('_fitted', [True, False, False, True])
+population.set_column('mutation_tag', [None, 'mRat(1)', None, None])
+population._max_individual_id += 5
+
+optimizer = GeneticAlgorithm(population=population, convergence=parameters.convergence,
+                             checkpoint=parameters.checkpoint)
+gparameters.generation = 3
+random.seed(11)
+np.random.seed(11)
+optimizer.checkpoint()
+expected = (random.random(), np.random.random())
+
+# Restore into a fresh optimizer with different random states
+random.seed(0)
+np.random.seed(0)
+checkpoint = load_checkpoint(checkpoint_filename(parameters.logging.path))
+restored = load_population(checkpoint, parameters)
+optimizer = GeneticAlgorithm(population=restored, convergence=parameters.convergence,
+                             checkpoint=parameters.checkpoint)
+optimizer.restore(checkpoint)
+
+assert gparameters.generation == 3
+assert list(restored.keys()) == list(population.keys())
+assert restored._max_individual_id == population._max_individual_id
+for name in ['_fitness', '_relaxed', '_fitted', 'mutation_tag']:
+    assert restored.get_column(name).tolist() == population.get_column(name).tolist(), name
+for a, b in zip(restored, population):
+    assert np.allclose(a.get_positions(), b.get_positions())
+    assert a.get_chemical_symbols() == b.get_chemical_symbols()
+assert (random.random(), np.random.random()) == expected
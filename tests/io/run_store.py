@@ -0,0 +1,28 @@
+import os
+import tempfile
+import numpy as np
+from structopt.io.run_store import RunStore
+
+with tempfile.TemporaryDirectory() as path:
+    store = RunStore(path)
+    store.append('individuals', [('id', np.array([1, 2])), ('crossover', ['cRo', ''])])
+
+    # A tag longer than the column is stored whole, and the column is widened
+    long_tag = 'cSomeVeryLongCrossoverName'
+    store.append('individuals', [('id', np.array([3])), ('crossover', [long_tag])])
+    data = RunStore(path).read('individuals')
+    assert data['id'].tolist() == [1, 2, 3]
+    assert data['crossover'].tolist() == ['cRo', '', long_tag]
+
+    # A run killed in the middle of an append leaves some columns longer than
+    # others. They are cut to their common length when they are read.
+    store.append('timing', [('generation', np.arange(3)), ('step', np.array([1.5, 2.5, 3.5]))])
+    with open(os.path.join(store.path, 'timing', 'generation.bin'), 'ab') as f:
+        f.write(np.array([3], dtype=np.int64).tobytes()[:5])
+    with open(os.path.join(store.path, 'timing', 'step.bin'), 'ab') as f:
+        f.write(np.array([4.5]).tobytes())
+    data = store.read('timing')
+    assert data['generation'].tolist() == [0, 1, 2]
+    assert data['step'].tolist() == [1.5, 2.5, 3.5]
+    assert store.tables() == ['individuals', 'timing']
+    assert store.read('timing', ['step']).keys() == {'step'}
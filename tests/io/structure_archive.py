@@ -0,0 +1,45 @@
+import os
+import tempfile
+import numpy as np
+from ase import Atoms
+from structopt.io.structure_archive import StructureArchive
+
+np.random.seed(0)
+
+structures = {id: Atoms(numbers=np.random.randint(1, 80, size=n), positions=np.random.random((n, 3)),
+                        cell=[10, 11, 12], pbc=[True, False, True])
+              for id, n in zip([3, 7, 8, 20], [5, 0, 13, 40])}
+
+with tempfile.TemporaryDirectory() as path:
+    archive = StructureArchive(path, chunk_size=200)
+    for id, atoms in structures.items():
+        archive.append(id, atoms)
+
+    archive = StructureArchive(path)
+    assert archive.ids() == [3, 7, 8, 20]
+    assert 8 in archive and 9 not in archive
+    assert len(set(archive._index['chunk'].tolist())) > 1
+    for id, atoms in structures.items():
+        read = archive.read(id)
+        assert np.allclose(read.positions, atoms.positions)
+        assert (read.numbers == atoms.numbers).all()
+        assert np.allclose(read.cell, atoms.cell)
+        assert (read.pbc == atoms.pbc).all()
+
+# An append that was interrupted after writing some of the positions, or
+# part of the index record, is overwritten by the next append
+with tempfile.TemporaryDirectory() as path:
+    archive = StructureArchive(path)
+    archive.append(3, structures[3])
+    with open(archive._filename(0, 'positions'), 'ab') as f:
+        f.write(np.zeros((2, 3)).tobytes())
+    with open(os.path.join(archive.path, 'index.bin'), 'ab') as f:
+        f.write(b'\0' * 10)
+    archive.append(8, structures[8])
+
+    archive = StructureArchive(path)
+    assert archive.ids() == [3, 8]
+    for id in [3, 8]:
+        read = archive.read(id)
+        assert np.allclose(read.positions, structures[id].positions)
+        assert (read.numbers == structures[id].numbers).all()
@@ -0,0 +1,30 @@
+import structopt
+import gparameters
+from structopt.tools.dictionaryobject import DictionaryObject
+from structopt.optimizers.convergence import Convergence
+
+gparameters.mpi = DictionaryObject({'rank': 0, 'ncores': 1})
+
+# Stops when neither the best nor the mean of the top 2 improves by more
+# than the tolerance in 3 generations
+convergence = Convergence({'max_generations': 100, 'stagnation_generations': 3,
+                           'stagnation_tolerance': 0.01, 'stagnation_top': 2}, population=None)
+history = [[3.0, 4.0], [2.0, 4.0], [2.0, 3.0], [2.0, 3.0], [1.995, 3.0], [2.0, 3.0]]
+reasons = []
+for generation, fitnesses in enumerate(history):
+    gparameters.generation = generation
+    reasons.append(convergence.check(None, fitnesses, serial=True))
+assert reasons[:5] == [None] * 5, reasons
+assert convergence.criterion == 'stagnation_generations' and convergence.stopped_early
+
+# A restored history is checked as if the run had not been interrupted
+restored = Convergence({'max_generations': 100, 'stagnation_generations': 3,
+                        'stagnation_tolerance': 0.01, 'stagnation_top': 2}, population=None)
+restored.restore(convergence.state())
+assert restored.stagnated()
+
+# max_generations is not an early stop
+convergence = Convergence({'max_generations': 2}, population=None)
+gparameters.generation = 2
+assert convergence.check(None, [1.0], serial=True) is not None
+assert convergence.criterion == 'max_generations' and not convergence.stopped_early
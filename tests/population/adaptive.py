@@ -0,0 +1,27 @@
+import numpy as np
+from structopt.common.population import adaptive
+from structopt.common.population.adaptive import project, weights
+
+# Every share gets the floor plus its part of the rest
+shares = project([0.5, 0.5, 0.0], floor=0.1, ceiling=0.9)
+assert np.allclose(shares, [0.45, 0.45, 0.1])
+
+# The excess above the ceiling goes to the other shares, which stay above the floor
+shares = project([1.0, 0.0, 0.0], floor=0.05, ceiling=0.8)
+assert np.isclose(shares.sum(), 1.0)
+assert np.isclose(shares[0], 0.8)
+assert np.all(shares >= 0.05)
+
+# The select_* methods get the adaptive probabilities by operator name, and
+# the probability that no operator is chosen does not change
+def rattle(individual):
+    pass
+
+def twist(individual):
+    pass
+
+operators = {rattle: 0.4, twist: 0.4, None: 0.2}
+assert weights('mutations', operators) is operators
+adaptive._probabilities['mutations'] = {'rattle': 0.7, 'twist': 0.1}
+assert weights('mutations', operators) == {rattle: 0.7, twist: 0.1, None: 0.2}
+adaptive._probabilities.clear()
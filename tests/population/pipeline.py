@@ -0,0 +1,49 @@
+import numpy as np
+import structopt
+import gparameters
+from structopt.tools.dictionaryobject import DictionaryObject
+from structopt.common.population import Population
+from structopt.common.individual import Individual
+
+
+def mean_distance(individual):
+    """Stands in for a fitness module."""
+    individual._fitness = float(individual.get_all_distances().mean())
+    individual._fitted = True
+    return individual._fitness
+
+Individual.calculate_fitness = mean_distance
+
+
+# The staged and fused pipelines create the same offspring from the same seed
+parameters = structopt.setup(DictionaryObject({
+    "structure_type": "cluster",
+    "seed": 7,
+    "generators": {"sphere": {"number_of_individuals": 8,
+                              "kwargs": {"atomlist": [["Au", 13]], "cell": [20, 20, 20]}}},
+    "mutations": {"rattle": {"probability": 0.5}},
+    "crossovers": {"rotate": {"probability": 0.7, "kwargs": {}}},
+}))
+
+populations = []
+for pipeline in ['staged', 'fused']:
+    gparameters.generation = 1
+    population = Population(parameters=parameters)
+    for individual in population:
+        individual.calculate_fitness()
+    ids = list(population.keys())
+    pairs = [[population[ids[i]], population[ids[j]]] for i, j in [(0, 1), (2, 5), (3, 4), (6, 7)]]
+    if pipeline == 'staged':
+        population.extend(population.crossover(pairs))
+        population.replace(population.mutate())
+    else:
+        population.breed(pairs)
+    populations.append(population)
+
+staged, fused = populations
+assert list(staged.keys()) == list(fused.keys())
+assert len(staged) > 8
+for a, b in zip(staged, fused):
+    assert a.crossover_tag == b.crossover_tag
+    assert a.mutation_tag == b.mutation_tag
+    assert np.allclose(a.get_positions(), b.get_positions())
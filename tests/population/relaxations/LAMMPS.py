@@ -0,0 +1,41 @@
+from structopt.common.population.relaxations.LAMMPS import tighten
+
+
+class Stub(object):
+    """A relaxed individual of 10 atoms with a LAMMPS energy (per atom, since
+    LAMMPS is not a fitness module here) and a fidelity."""
+    fitnesses = None
+
+    def __init__(self, name, energy, fidelity):
+        self.name = name
+        self.LAMMPS = None if energy is None else 10 * energy
+        self.fidelity = fidelity
+
+    def __len__(self):
+        return 10
+
+
+class Stubs(list):
+    initial_number_of_individuals = 4
+
+
+population = Stubs([Stub('A', -5.0, 'tight'), Stub('C', -4.5, 'loose'), Stub('D', -3.0, 'loose'),
+                    Stub('B', -4.0, 'tight'), Stub('E', -3.9, 'loose'), Stub('F', -2.0, 'loose'),
+                    Stub('G', None, 'loose')])
+
+
+def names(fidelity):
+    return [individual.name for individual in tighten(population, fidelity)]
+
+
+# The predators would keep A, C, B and E, so E sets the cutoff. The loose
+# survivors C and E are tightened, in population order.
+assert names({'top': 1, 'margin': 0.0}) == ['C', 'E']
+assert names({'top': 0, 'margin': 0.0}) == ['C', 'E']
+# D is within the margin of the cutoff
+assert names({'top': 1, 'margin': 1.0}) == ['C', 'D', 'E']
+# The top loose individuals are tightened regardless of the cutoff
+assert names({'top': 4, 'margin': 0.0}) == ['C', 'D', 'E', 'F']
+# An individual without an energy is never within the margin
+assert names({'top': 0, 'margin': 100.0}) == ['C', 'D', 'E', 'F']
+assert tighten(Stubs([Stub('A', -5.0, 'tight')]), {'top': 1, 'margin': 0.0}) == []
@@ -0,0 +1,23 @@
+import numpy as np
+from ase import Atoms
+from structopt.common.population.screening import pair_distances, PairPotential
+
+np.random.seed(0)
+
+# Every pair is counted once, with or without periodic images
+cluster = Atoms('Au20', positions=np.random.uniform(0, 8, size=(20, 3)))
+distances, weights = pair_distances(cluster, 4.0)
+all_distances = cluster.get_all_distances()[np.triu_indices(20, k=1)]
+assert np.isclose(np.sum(weights), np.sum(all_distances < 4.0))
+
+crystal = Atoms('Au20', positions=np.random.uniform(0, 10, size=(20, 3)), cell=[10, 10, 10], pbc=True)
+distances, weights = pair_distances(crystal, 4.0)
+all_distances = crystal.get_all_distances(mic=True)[np.triu_indices(20, k=1)]
+assert np.isclose(np.sum(weights), np.sum(all_distances < 4.0))
+
+# A compact cluster scores better than the same atoms spread out
+model = PairPotential(sigma=2.6)
+compact = Atoms('Au2', positions=[[0, 0, 0], [2.6 * 2 ** (1 / 6.), 0, 0]])
+spread = Atoms('Au2', positions=[[0, 0, 0], [5.0, 0, 0]])
+assert np.isclose(model.score(compact), -0.4 / 2)
+assert model.score(compact) < model.score(spread)
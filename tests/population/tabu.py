@@ -0,0 +1,61 @@
+import numpy as np
+from ase import Atoms
+from structopt.common.population.tabu import fingerprint, FingerprintArchive
+
+np.random.seed(0)
+
+atoms = Atoms('Au10Cu10', positions=np.random.uniform(0, 8, size=(20, 3)))
+reference = fingerprint(atoms, 6.0, 30)
+assert reference.shape == (3 * 30,)
+
+# Rotating, translating and reordering the atoms does not change the
+# fingerprint. The rotation is done with an explicit matrix, since the
+# signature of Atoms.rotate differs between ASE versions.
+moved = atoms.copy()
+theta = np.radians(37)
+R = np.array([[np.cos(theta), -np.sin(theta), 0],
+              [np.sin(theta), np.cos(theta), 0],
+              [0, 0, 1]])
+c = moved.get_positions().mean(axis=0)
+moved.set_positions(np.dot(moved.get_positions() - c, R.T) + c)
+moved.translate([1.0, -2.0, 0.5])
+order = np.concatenate([np.random.permutation(10), 10 + np.random.permutation(10)])
+moved = moved[order]
+assert np.allclose(fingerprint(moved, 6.0, 30), reference)
+
+# A different structure is far away in the archive
+archive = FingerprintArchive(len(reference))
+for _ in range(40):  # More than the initial capacity
+    other = Atoms('Au10Cu10', positions=np.random.uniform(0, 8, size=(20, 3)))
+    archive.add(fingerprint(other, 6.0, 30))
+assert archive.distance(reference) > 0.05
+archive.add(reference)
+assert archive.distance(fingerprint(moved, 6.0, 30)) < 1e-5
+
+# Screening only checks the unrelaxed individuals against each other. They
+# are archived, before and after their relaxation, once they are evaluated.
+import structopt
+from structopt.tools.dictionaryobject import DictionaryObject
+from structopt.common.population import Population
+from structopt.common.population.tabu import Tabu
+
+parameters = structopt.setup(DictionaryObject({
+    "structure_type": "cluster",
+    "generators": {"sphere": {"number_of_individuals": 3,
+                              "kwargs": {"atomlist": [["Au", 13]], "cell": [20, 20, 20]}}},
+}))
+population = Population(parameters=parameters)
+tabu = Tabu({'cutoff': 6.0, 'bins': 30, 'tolerance': 1e-3, 'retries': 0})
+assert tabu.screen(population) == []
+assert tabu.archives == {}
+
+evaluated, failed, _ = population
+evaluated.rattle(0.1)
+evaluated._relaxed = evaluated._fitted = True
+failed._relaxed = True
+tabu.update(population)
+assert tabu.archived == {evaluated.id}
+archive = tabu.archives[evaluated.get_chemical_formula()]
+assert archive.count == 2
+assert archive.distance(tabu.fingerprint(evaluated)) < 1e-5
+assert archive.distance(tabu.fingerprint(failed)) > 1e-3
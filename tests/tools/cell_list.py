@@ -0,0 +1,16 @@
+import numpy as np
+from scipy.spatial.distance import cdist
+from structopt.tools.cell_list import pairs_within
+
+np.random.seed(0)
+
+positions = np.random.uniform(0, 10, size=(500, 3))
+i, j, d = pairs_within(positions, 1.5)
+dists = cdist(positions, positions)
+expected = set(zip(*np.nonzero(np.triu(dists < 1.5, k=1))))
+assert set(zip(i.tolist(), j.tolist())) == expected
+assert np.allclose(d, dists[i, j])
+
+others = np.random.uniform(-2, 8, size=(200, 3))
+i, j, d = pairs_within(positions, 1.5, others)
+assert set(zip(i.tolist(), j.tolist())) == set(zip(*np.nonzero(cdist(positions, others) < 1.5)))
@@ -0,0 +1,37 @@
+import pickle
+from structopt.tools import IndexedDict
+
+d = IndexedDict()
+for key in [3, 1, 7, 5]:
+    d[key] = str(key)
+assert list(d) == [1, 3, 5, 7]
+assert [d.position(key) for key in d] == [0, 1, 2, 3]
+assert [d.key_at(i) for i in range(len(d))] == [1, 3, 5, 7]
+
+d[9] = '9'
+assert d.position(9) == 4
+
+del d[3]
+assert list(d) == [1, 5, 7, 9]
+assert d.position(7) == 2 and d.key_at(2) == 7
+
+assert list(d.items()) == [(1, '1'), (5, '5'), (7, '7'), (9, '9')]
+assert pickle.loads(pickle.dumps(d)) == d
+
+# Population overrides position() to take an individual, so deleting by id
+# must not go through the override
+import structopt
+from structopt.tools.dictionaryobject import DictionaryObject
+from structopt.common.population import Population
+
+parameters = structopt.setup(DictionaryObject({
+    "structure_type": "cluster",
+    "generators": {"sphere": {"number_of_individuals": 4,
+                              "kwargs": {"atomlist": [["Au", 13]], "cell": [20, 20, 20]}}},
+}))
+population = Population(parameters=parameters)
+ids = list(population.keys())
+del population[ids[0]]
+population.remove(population[ids[1]])
+assert list(population.keys()) == ids[2:]
+assert [population.position(individual) for individual in population] == [0, 1]
@@ -0,0 +1,82 @@
+import numpy as np
+import structopt
+import gparameters
+from structopt.tools.dictionaryobject import DictionaryObject
+from structopt.common.population import Population
+from structopt.tools import islands
+from structopt.tools.islands import TOPOLOGIES, get_neighbors, migrate, first_island
+
+
+class Roots(object):
+    """Stands in for the communicator between the island roots, as seen from
+    the root of island 0 of `nislands` islands."""
+
+    def __init__(self, nislands, received=None, values=None):
+        self.nislands = nislands
+        self.received = received
+        self.values = values
+        self.value = None
+
+    def Get_rank(self):
+        return 0
+
+    def Get_size(self):
+        return self.nislands
+
+    def bcast(self, value, root=0):
+        if value is not None:
+            self.value = value
+        return self.value
+
+    def sendrecv(self, sendobj, dest, source):
+        self.sent = sendobj
+        return self.received
+
+    def allgather(self, value):
+        return [value] + self.values
+
+
+# Every island sends to and receives from exactly one other island
+np.random.seed(0)
+for nislands in [2, 3, 5, 8]:
+    for topology in TOPOLOGIES:
+        comm = Roots(nislands)
+        neighbors = [get_neighbors(island, nislands, topology, comm) for island in range(nislands)]
+        destinations = [destination for destination, _ in neighbors]
+        assert sorted(destinations) == list(range(nislands))
+        assert all(destination != island for island, destination in enumerate(destinations))
+        assert all(destinations[source] == island for island, (_, source) in enumerate(neighbors))
+
+
+parameters = structopt.setup(DictionaryObject({
+    "structure_type": "cluster",
+    "generators": {"sphere": {"number_of_individuals": 4,
+                              "kwargs": {"atomlist": [["Au", 13]], "cell": [20, 20, 20]}}},
+    "islands": {"number_of_islands": 1, "number_of_migrants": 2},
+}))
+gparameters.generation = 0
+population = Population(parameters=parameters)
+population.set_column('_fitness', [3.0, 1.0, 4.0, 2.0])
+ids = list(population.keys())
+
+# The migrants from the other island have ids that are already taken here
+other = Population(parameters=parameters)
+other.set_column('_fitness', [0.5, 0.25, 5.0, 6.0])
+migrants = [other.get_by_position(0).copy(), other.get_by_position(1).copy()]
+for migrant, id in zip(migrants, ids[:2]):
+    migrant.id = id
+islands._migration_comm = Roots(2, received=migrants)
+
+received = migrate(population)
+assert [individual.id for individual in islands._migration_comm.sent] == [ids[1], ids[3]]
+assert len(population) == 6
+assert [individual.id for individual in received] == list(population.keys())[4:]
+assert all(individual.id > max(ids) for individual in received)
+assert [individual.fitness for individual in received] == [0.5, 0.25]
+
+# The islands stop together on the first island's reason to stop
+islands._migration_comm = Roots(3, values=[None, 'stagnation'])
+assert first_island(None) == 'stagnation'
+assert first_island('max_hours') == 'max_hours'
+islands._migration_comm = None
+assert first_island(None) is None
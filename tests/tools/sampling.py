@@ -0,0 +1,19 @@
+import numpy as np
+from structopt.tools.sampling import ordinal_ranks, distinct_rows, weighted_pairs, sequential_tournaments
+
+np.random.seed(0)
+
+assert ordinal_ranks([0.5, 0.1, 0.5, 0.2]).tolist() == [2, 0, 3, 1]
+
+rows = distinct_rows(100, 5, 1000)
+assert rows.shape == (1000, 5)
+assert all(len(set(row)) == 5 for row in rows.tolist())
+
+pairs = weighted_pairs(np.ones(10), 5)
+assert (pairs[:, 0] != pairs[:, 1]).all()
+pairs = weighted_pairs(np.ones(10), 5, unique_parents=True)
+assert sorted(pairs.ravel().tolist()) == list(range(10))
+
+winners = sequential_tournaments(np.arange(1000), 500, 5)
+assert len(set(winners.tolist())) == 500
+assert sequential_tournaments(np.arange(10), 10, 20).tolist() == list(range(10))
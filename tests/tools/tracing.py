@@ -0,0 +1,29 @@
+from structopt.tools.tracing import load_imbalance
+
+
+def event(rank, name, category, start, duration, generation=0):
+    return {'name': name, 'cat': category, 'ph': 'X', 'ts': start * 1e6, 'dur': duration * 1e6,
+            'pid': rank, 'tid': 0, 'args': {'generation': generation}}
+
+# Rank 1 relaxes for 3 s while rank 0 relaxes for 1 s and waits 2 s in the allgather
+events = [event(0, 'generation', 'step', 0, 4),
+          event(0, 'relax', 'phase', 0, 3),
+          event(0, 'LAMMPS.run', 'subprocess', 0, 0.5),
+          event(0, 'MPI.allgather', 'mpi', 1, 2),
+          event(1, 'generation', 'step', 0, 4),
+          event(1, 'relax', 'phase', 0, 3),
+          event(1, 'LAMMPS.run', 'subprocess', 0, 2.5),
+          event(1, 'write_snapshot', 'io', 3, 0.5),
+          event(1, 'MPI.allgather', 'mpi', 3, 0.001)]
+summary = load_imbalance(events)[0]
+
+relax = summary['phases']['relax']
+assert abs(relax[0][0] - 1) < 1e-6 and abs(relax[0][1] - 2) < 1e-6
+assert abs(relax[1][0] - 3) < 1e-6 and relax[1][1] == 0
+
+ranks = summary['ranks']
+assert abs(ranks[0]['mpi'] - 2) < 1e-6 and abs(ranks[0]['subprocess'] - 0.5) < 1e-6
+assert abs(ranks[0]['python'] - 1.5) < 1e-6
+# The allgather on rank 1 is inside the write, so it is not counted twice
+assert abs(ranks[1]['io'] - 0.5) < 1e-6
+assert abs(ranks[1]['python'] - 1.0) < 1e-6
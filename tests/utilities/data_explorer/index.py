@@ -0,0 +1,49 @@
+import os
+import tempfile
+import numpy as np
+from structopt.utilities.data_explorer.index import RunIndex, INDEX_DIRECTORY
+
+PREFIX = '2017-01-01 00:00:00,000 : INFO : '
+genealogy = ['Generation 0: 0 1 2 3',
+             'Generation 1: 0 2 4cRo(0+1) 6mRat(1)',
+             'Generation 2: 0 4cRo(0+1) 7cRo(4+6)mRat(5) 8mRat(2)']
+fitnesses = {0: {0: -1.5, 1: -1.0, 2: -2.0, 3: -0.5},
+             1: {0: -1.5, 2: -2.0, 4: -2.5, 6: -1.25},
+             2: {0: -1.5, 4: -2.5, 7: -3.0, 8: -2.25}}
+
+with tempfile.TemporaryDirectory() as path:
+    with open(os.path.join(path, 'genealogy.log'), 'w') as f:
+        for line in genealogy:
+            f.write(PREFIX + line + '\n')
+    with open(os.path.join(path, 'fitnesses.log'), 'w') as f:
+        for generation, fits in fitnesses.items():
+            for id, fit in fits.items():
+                f.write(PREFIX + 'Generation {}, Individual {}: LAMMPS: {}\n'.format(generation, id, fit))
+
+    index = RunIndex(path)
+    assert os.path.exists(os.path.join(path, INDEX_DIRECTORY, 'meta.json'))
+    assert index.ngenerations == 3
+    assert index.genealogy_line(1) == PREFIX + genealogy[1] + '\n'
+
+    # Only the leading id of each gene is an individual; the ids of the
+    # parents in the tags are not
+    assert index.arrays['ids'].tolist() == [0, 1, 2, 3, 4, 6, 7, 8]
+    assert index.created_killed(0) == (0, 3)
+    assert index.created_killed(1) == (0, 1)
+    assert index.created_killed(2) == (0, 2)
+    assert index.created_killed(6) == (1, 2)
+    assert index.created_killed(7) == (2, 3)
+    assert index.created_killed(5) == (np.inf, -np.inf)
+
+    assert index.fitness(7) == -3.0
+    assert index.fitness(6, 'LAMMPS') == -1.25
+    assert index.min_fitness.tolist() == [-2.0, -2.5, -3.0]
+
+    # The saved index is loaded, and rebuilt when the logs have grown
+    assert RunIndex(path).arrays['ids'].tolist() == index.arrays['ids'].tolist()
+    with open(os.path.join(path, 'genealogy.log'), 'a') as f:
+        f.write(PREFIX + 'Generation 3: 0 9cRo(0+4)\n')
+    index = RunIndex(path)
+    assert index.ngenerations == 4
+    assert index.created_killed(9) == (3, 4)
+    assert index.created_killed(4) == (1, 3)